@@ -1,13 +1,30 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from backend.app.models.schema import Product, SearchRequest, ChatRequest, ChatResponse, SearchResponse
+import io
+import json
+import logging
+import uuid
+import zipfile
+from typing import List, Union
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from backend.app.core.config import settings
+from backend.app.models.schema import Product, SearchRequest, ChatRequest, ChatResponse, SearchResponse, BatchSearchRequest, BatchSearchResponse, ProductImport, BulkImportItem, BulkImportResponse
 from backend.app.services.search import SearchService
 from backend.app.services.chat import ChatService
+from backend.app.services.embeddings import get_embedding_stats
+from backend.app.services.catalog_index import get_catalog_index
+from backend.app.services.concurrency import limiter_stats, run_blocking
+from backend.app.services.serp_service import search_products_online, serp_stats
+from backend.app.services.llm import get_llm_client
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # Instantiate services once (singleton-ish)
 search_service = SearchService()
 chat_service = ChatService()
+catalog_index = get_catalog_index()
 
 @router.post("/search", response_model=SearchResponse)
 async def search(request: SearchRequest):
@@ -15,34 +32,39 @@ async def search(request: SearchRequest):
     Search for products by text query or image description.
     """
     if request.image_data:
-        products, desc = search_service.search_by_image(request.image_data)
+        products, desc = await search_service.search_by_image_async(request.image_data, mode=request.image_mode)
         return SearchResponse(products=products, ai_description=desc)
         
     if request.query:
-        products = search_service.search_products(request.query)
+        products = await search_service.search_products_async(request.query, mode=request.mode)
         return SearchResponse(products=products, ai_description=None)
         
     return SearchResponse(products=[], ai_description=None)
 
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(request: BatchSearchRequest):
+    """
+    Run many text searches in one request (catalog QA, recommendation backfills).
+    Query count and per-query limit are validated by BatchSearchRequest.
+    """
+    batch = await search_service.search_products_batch_async(request.queries, request.limit, request.mode)
+    return BatchSearchResponse(results=[SearchResponse(products=products, ai_description=None) for products in batch])
+
+def _source_dicts(sources: List[dict]) -> List[dict]:
+    # Only expose the fields the frontend renders
+    return [{"product_name": s.get("product_name"), "chunk_id": s.get("chunk_id")} for s in sources]
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
     RAG Chat with product manuals.
     """
     try:
-        response_text, sources, visual_url = chat_service.chat(request.message, request.history)
+        response_text, sources, visual_url = await chat_service.chat_async(request.message, request.history)
         
-        # Convert sources to dicts if they aren't already
-        source_dicts = []
-        for s in sources:
-            source_dicts.append({
-                "product_name": s.get("product_name"),
-                "chunk_id": s.get("chunk_id")
-            })
-    
         return ChatResponse(
             response=response_text,
-            sources=source_dicts,
+            sources=_source_dicts(sources),
             visual_aid_url=visual_url
         )
     except Exception as e:
@@ -50,16 +72,80 @@ async def chat(request: ChatRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    RAG Chat streamed as Server-Sent Events.
+    Events: sources, token (repeated), visual_aid (optional), done, or error.
+    """
+    async def event_stream():
+        try:
+            async for event, data in chat_service.chat_stream_async(request.message, request.history):
+                if event == "sources":
+                    data = {"sources": _source_dicts(data["sources"])}
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            logger.error(f"Chat stream failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stats")
+async def stats():
+    """
+    Cache and index statistics for monitoring.
+    """
+    return {
+        "embeddings": get_embedding_stats(),
+        "image_descriptions": search_service.image_cache.stats() if search_service.image_cache else {},
+        "comparisons": compare_service.cache.stats(),
+        "eco_scores": sustainability_service.store.stats(),
+        "image_fetch": search_service.images.stats(),
+        "external_search": serp_stats(),
+        "llm": get_llm_client().stats(),
+        # Every service limiter, including those owned outside this router (e.g. price in main.py)
+        "concurrency": limiter_stats(),
+    }
+
+@router.get("/products/{product_id}")
+async def get_product(product_id: str, request: Request):
+    """
+    Full product record by id, cacheable via ETag / If-None-Match.
+    """
+    etag = catalog_index.etag(product_id)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    headers = {"ETag": f'"{etag}"', "Cache-Control": f"public, max-age={settings.PRODUCT_CACHE_MAX_AGE}"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=catalog_index.get(product_id), headers=headers)
+
+def _resolve_products(items: List[Union[str, dict]]) -> List[dict]:
+    # Ids are looked up in the catalog; full dicts are still accepted for products outside it
+    products = []
+    for item in items:
+        if isinstance(item, dict):
+            products.append(item)
+            continue
+        product = catalog_index.get(item)
+        if product is None:
+            raise HTTPException(status_code=404, detail=f"Product not found: {item}")
+        products.append(product)
+    return products
+
 @router.post("/external-search")
 async def external_search(request: SearchRequest):
     """
-    Search for products online via SerpApi.
+    Search for products online via SerpApi (cached; identical concurrent queries share one call).
     """
-    from backend.app.services.serp_service import search_products_online
-    
     # We use the 'query' field from SearchRequest
     if request.query:
-        return search_products_online(request.query)
+        return await run_blocking(search_products_online, request.query)
     return []
 
 # --- Admin Endpoints ---
@@ -72,23 +158,158 @@ async def analyze_product(request: SearchRequest):
     Analyze generic image for cataloging. Uses SearchRequest.image_data
     """
     if request.image_data:
-        return admin_service.analyze_product_image(request.image_data)
+        return await admin_service.analyze_product_image_async(request.image_data)
     return {"error": "No image provided"}
 
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+def _expand_uploads(uploads: List[tuple]) -> List[tuple]:
+    """
+    Zip archives contribute every image inside them; other uploads pass through as-is.
+    Image count and total size are checked against the batch limits from the archive
+    directories before anything is decompressed, so a zip bomb is rejected up front.
+    Raises ValueError when a limit is exceeded.
+    """
+    max_bytes = settings.ADMIN_BATCH_MAX_UNCOMPRESSED_MB * 1024 * 1024
+    plain, archives = [], []
+    count, total = 0, 0
+    for filename, data in uploads:
+        if not zipfile.is_zipfile(io.BytesIO(data)):
+            plain.append((filename, data))
+            count, total = count + 1, total + len(data)
+            continue
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and info.filename.lower().endswith(_IMAGE_EXTENSIONS)]
+        archives.append((archive, members))
+        count += len(members)
+        total += sum(info.file_size for info in members)
+
+    try:
+        if count > settings.ADMIN_BATCH_MAX_IMAGES:
+            raise ValueError(f"At most {settings.ADMIN_BATCH_MAX_IMAGES} images per batch.")
+        if total > max_bytes:
+            raise ValueError(f"Images exceed the {settings.ADMIN_BATCH_MAX_UNCOMPRESSED_MB} MB batch limit.")
+        images = list(plain)
+        for archive, members in archives:
+            for info in members:
+                # file_size comes from the archive header; stop reading at the declared size
+                with archive.open(info) as member:
+                    images.append((info.filename, member.read(info.file_size)))
+        return images
+    finally:
+        for archive, _ in archives:
+            archive.close()
+
+@router.post("/admin/analyze-batch")
+async def analyze_batch(files: List[UploadFile] = File(...), auto_save: bool = Form(False)):
+    """
+    Catalog a whole photo shoot: many images (or zip archives of images) analyzed concurrently.
+    Streams NDJSON, one line per image as it completes, then a summary line.
+    With auto_save, analyzed products are saved to the catalog and indexed.
+    """
+    uploads = [(upload.filename or "image.jpg", await upload.read()) for upload in files]
+    try:
+        images = await run_blocking(_expand_uploads, uploads)
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not images:
+        raise HTTPException(status_code=400, detail="No images found in the upload.")
+
+    async def result_stream():
+        results = admin_service.analyze_batch_async(
+            images, auto_save=auto_save, index_products=search_service.index_products_async
+        )
+        async for result in results:
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
 @router.post("/admin/add-product")
 async def add_product(product: dict):
     """
     Save validated product to database and index it.
     """
     # 1. Save to JSON
-    result = admin_service.save_product(product)
+    result = await admin_service.save_product_async(product)
     
     # 2. Index to Chroma (Real-time compatibility)
     if result.get("status") == "success":
-        search_service.index_product(product)
+        await search_service.index_product_async(product)
         
     return result
 
+def _parse_import_body(body: bytes, content_type: str) -> List[tuple]:
+    """Returns [(index, raw_item or None, parse_error or None)] for a JSON array or NDJSON body."""
+    text = body.decode("utf-8")
+    if "ndjson" not in content_type and text.lstrip().startswith("["):
+        items = json.loads(text)
+        if not isinstance(items, list):
+            raise ValueError("expected a JSON array")
+        return [(i, item, None) for i, item in enumerate(items)]
+
+    parsed = []
+    for i, line in enumerate(text.splitlines()):
+        if not line.strip():
+            continue
+        try:
+            parsed.append((i, json.loads(line), None))
+        except json.JSONDecodeError as e:
+            parsed.append((i, None, f"Invalid JSON: {e}"))
+    return parsed
+
+@router.post("/admin/bulk-import", response_model=BulkImportResponse)
+async def bulk_import(request: Request):
+    """
+    Import many products at once from a JSON array or NDJSON (one product per line).
+    Valid products are saved in one catalog write, then embedded and indexed in batches.
+    """
+    try:
+        parsed = _parse_import_body(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Body must be a JSON array or NDJSON: {e}")
+    if len(parsed) > settings.BULK_IMPORT_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_IMPORT_MAX_ITEMS} products per import.")
+
+    # 1. Validate
+    items, products, accepted = [], {}, {}
+    for index, raw, error in parsed:
+        if error is None:
+            try:
+                product = ProductImport.model_validate(raw).model_dump()
+                product["id"] = product["id"] or f"imp_{uuid.uuid4().hex[:12]}"
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'item'}: {err['msg']}" for err in e.errors())
+        if error is not None:
+            items.append(BulkImportItem(index=index, status="invalid", error=error))
+            continue
+
+        # Last occurrence of an id wins
+        if product["id"] in accepted:
+            previous = accepted[product["id"]]
+            previous.status, previous.error = "duplicate", "Superseded by a later item with the same id"
+        products[product["id"]] = product
+        accepted[product["id"]] = BulkImportItem(index=index, id=product["id"], status="indexed")
+        items.append(accepted[product["id"]])
+
+    # 2. Persist in one write, 3. embed and index in batches what was saved
+    if products:
+        errors = await admin_service.save_products_async(list(products.values()))
+        saved = [product for product in products.values() if product["id"] not in errors]
+        if saved:
+            errors.update(await search_service.index_products_async(saved))
+        for item in items:
+            if item.status == "indexed" and item.id in errors:
+                item.status, item.error = "failed", errors[item.id]
+
+    return BulkImportResponse(
+        total=len(items),
+        indexed=sum(item.status == "indexed" for item in items),
+        invalid=sum(item.status == "invalid" for item in items),
+        failed=sum(item.status == "failed" for item in items),
+        items=items
+    )
+
 # --- Compare Endpoints ---
 from backend.app.services.compare import CompareService
 from typing import List
@@ -97,11 +318,11 @@ from backend.app.models.schema import Product
 compare_service = CompareService()
 
 @router.post("/compare")
-async def compare_products(products: List[dict]):
+async def compare_products(products: List[Union[str, dict]]):
     """
-    Generate markdown comparison for list of products.
+    Generate markdown comparison for list of products (ids or full product dicts).
     """
-    return {"markdown": compare_service.compare_products(products)}
+    return {"markdown": await compare_service.compare_products_async(_resolve_products(products))}
 
 # --- Sustainability Endpoint ---
 from backend.app.services.sustainability_service import SustainabilityService
@@ -112,10 +333,17 @@ sustainability_service = SustainabilityService()
 @router.post("/eco-score")
 async def get_eco_score(request: SustainabilityRequest):
     """
-    Calculate sustainability score for a product.
+    Calculate sustainability score for a product, by id or by its details.
     """
-    return sustainability_service.calculate_eco_score(
-        request.product_name, 
-        request.category, 
-        request.description
+    product = _resolve_products([request.product_id])[0] if request.product_id else {}
+    name = request.product_name or product.get("name")
+    if not name:
+        raise HTTPException(status_code=400, detail="Provide a product_id or a product_name.")
+
+    return await sustainability_service.calculate_eco_score_async(
+        name,
+        request.category or product.get("category") or "General",
+        request.description or product.get("description", ""),
+        request.image_url or product.get("image_url") or None,
+        product_id=request.product_id
     )
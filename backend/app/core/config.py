@@ -10,6 +10,109 @@ class Settings(BaseSettings):
     SERPAPI_KEY: str = os.getenv("SERPAPI_KEY", "")
     CHROMA_DB_DIR: str = os.path.join(os.getcwd(), "data", "chroma_db")
     COLLECTION_NAME: str = "product_manuals"
+    STATIC_BASE_URL: str = "http://127.0.0.1:8000/static" # Public URL of backend/static (catalog image links)
+
+    # Embeddings
+    EMBEDDING_MODEL: str = "models/embedding-001"
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = os.path.join(os.getcwd(), "data", "cache", "embeddings.sqlite3")
+    EMBEDDING_CACHE_MAX_MB: int = 256
+
+    # Search engine: "chroma" (default) or "numpy" (in-memory mirror of description vectors)
+    SEARCH_ENGINE: str = "chroma"
+    VECTOR_INDEX_DIR: str = os.path.join(os.getcwd(), "data", "vector_index")
+    SEARCH_BATCH_MAX_QUERIES: int = 256
+
+    # Text search mode: "semantic" (vectors), "hybrid" (BM25 + vectors, RRF-fused) or "keyword" (BM25)
+    SEARCH_MODE: str = "semantic"
+    KEYWORD_INDEX_DIR: str = os.path.join(os.getcwd(), "data", "keyword_index")
+    RRF_K: int = 60
+
+    # Async service layer: shared executor size and per-service concurrency caps
+    EXECUTOR_MAX_WORKERS: int = 64
+    SEARCH_MAX_CONCURRENCY: int = 32
+    CHAT_MAX_CONCURRENCY: int = 100
+    COMPARE_MAX_CONCURRENCY: int = 100
+    ECO_MAX_CONCURRENCY: int = 100
+    PRICE_MAX_CONCURRENCY: int = 100
+    ADMIN_MAX_CONCURRENCY: int = 32
+
+    # Shared Gemini client: one request budget for all services, retries with backoff on quota errors
+    LLM_MODEL: str = "gemini-flash-latest"
+    LLM_REQUESTS_PER_MINUTE: float = 600
+    LLM_BURST: int = 20
+    LLM_MAX_RETRIES: int = 4
+    LLM_BACKOFF_BASE_SECONDS: float = 1.0
+    LLM_BACKOFF_MAX_SECONDS: float = 30.0
+
+    # Video diagnosis jobs
+    VIDEO_MAX_CONCURRENT_JOBS: int = 4
+    VIDEO_MAX_UPLOAD_MB: int = 200
+    VIDEO_POLL_INTERVAL_SECONDS: float = 2.0
+    VIDEO_PROCESSING_TIMEOUT_SECONDS: int = 600
+    VIDEO_JOB_TTL_SECONDS: int = 3600
+
+    # Image search: "visual" (local image-similarity index) or "semantic" (Gemini description + text search)
+    IMAGE_SEARCH_MODE: str = "visual"
+    VISUAL_INDEX_PATH: str = os.path.join(os.getcwd(), "data", "visual_index", "features.npz")
+
+    # Perceptual-hash cache of image-search descriptions
+    IMAGE_CACHE_ENABLED: bool = True
+    IMAGE_CACHE_PATH: str = os.path.join(os.getcwd(), "data", "cache", "image_descriptions.sqlite3")
+    IMAGE_HASH_MAX_DISTANCE: int = 6
+
+    # Catalog store (SQLite); products.json is imported when it changes
+    CATALOG_DB_PATH: str = os.path.join(os.getcwd(), "data", "catalog.sqlite3")
+    CATALOG_JSON_PATH: str = os.path.join(os.getcwd(), "data", "products.json")
+    PRODUCT_CACHE_MAX_AGE: int = 300 # Cache-Control max-age for GET /api/products/{id}
+
+    # Bulk product import (POST /api/admin/bulk-import)
+    BULK_IMPORT_MAX_ITEMS: int = 10000
+
+    # Batch image cataloging (POST /api/admin/analyze-batch)
+    ADMIN_BATCH_MAX_IMAGES: int = 500
+    ADMIN_BATCH_CONCURRENCY: int = 8
+    ADMIN_BATCH_MAX_UNCOMPRESSED_MB: int = 200 # Total image bytes once zip archives are expanded
+
+    # Comparison result cache
+    COMPARE_CACHE_MAX_ENTRIES: int = 1024
+    COMPARE_CACHE_TTL_SECONDS: int = 86400
+
+    # Image loading for model calls: pooled HTTP, disk cache revalidated by ETag, downscaled
+    IMAGE_FETCH_CACHE_DIR: str = os.path.join(os.getcwd(), "data", "cache", "images")
+    IMAGE_FETCH_CONNECT_TIMEOUT: float = 3.05
+    IMAGE_FETCH_READ_TIMEOUT: float = 10.0
+    IMAGE_FETCH_MAX_BYTES: int = 10 * 1024 * 1024
+    IMAGE_FETCH_POOL_SIZE: int = 16
+    IMAGE_MAX_EDGE: int = 768 # Longest side (px) of any image sent to a model
+    IMAGE_JPEG_QUALITY: int = 85
+
+    # External search: "serpapi" (live, spends quota) or "fixture" (local stand-in for load tests)
+    SERP_BACKEND: str = "serpapi"
+    SERP_FIXTURE_PATH: str = os.path.join(os.getcwd(), "data", "fixtures", "serp_shopping.json")
+    SERP_FIXTURE_LATENCY_MS: float = 0
+    SERP_CACHE_MAX_ENTRIES: int = 2048
+    SERP_CACHE_TTL_SECONDS: int = 3600
+
+    # Observed price series behind /api/predict-price
+    PRICE_HISTORY_PATH: str = os.path.join(os.getcwd(), "data", "price_history.sqlite3")
+
+    # Price predictions: one answer per product, price bucket and day
+    PRICE_CACHE_MAX_ENTRIES: int = 4096
+    PRICE_CACHE_TTL_SECONDS: int = 86400
+    PRICE_CACHE_BUCKET_PCT: float = 2.0
+    PRICE_BATCH_MAX_ITEMS: int = 100
+
+    # Persistent eco-scores and the offline precompute job (scripts/precompute_eco_scores.py)
+    ECO_SCORE_DB_PATH: str = os.path.join(os.getcwd(), "data", "eco_scores.sqlite3")
+    ECO_PRECOMPUTE_CONCURRENCY: int = 8
+    ECO_PRECOMPUTE_RPM: int = 60
+
+    # Incremental ingestion: content hash per indexed document id
+    INGEST_MANIFEST_PATH: str = os.path.join(os.getcwd(), "data", "ingest_manifest.json")
+    INGEST_BATCH_SIZE: int = 100
+    INGEST_WORKERS: int = 4
+    INGEST_MAX_RETRIES: int = 5
 
     class Config:
         env_file = ".env"
@@ -1,5 +1,8 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Literal, Optional
+from backend.app.core.config import settings
+
+SearchMode = Literal["semantic", "hybrid", "keyword"]
 
 class Product(BaseModel):
     id: str
@@ -8,14 +11,23 @@ class Product(BaseModel):
     price: float
     image_url: str
     link: str = "#" # Default link to prevent KeyError
+    category: str = ""
+    # Meaning depends on the search mode:
+    # semantic - squared L2 vector distance (lower is better)
+    # hybrid - reciprocal-rank fusion score, at most 2 / (RRF_K + 1) (higher is better)
+    # keyword - BM25 relevance, unbounded (higher is better)
+    # visual image search - cosine similarity (higher is better)
     score: float = 0.0
 
 class SearchRequest(BaseModel):
     query: Optional[str] = None
     image_data: Optional[str] = None # Base64 encoded image
+    mode: Optional[SearchMode] = None # Defaults to settings.SEARCH_MODE
+    image_mode: Optional[Literal["visual", "semantic"]] = None
 
 class ChatRequest(BaseModel):
     message: str
+    history: List[dict] = [] # Gemini-style turns: {"role": "user"|"model", "parts": [...]}
 class ChatResponse(BaseModel):
     response: str
     sources: List[dict] = []
@@ -25,8 +37,52 @@ class SearchResponse(BaseModel):
     products: List[Product]
     ai_description: Optional[str] = None
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(max_length=settings.SEARCH_BATCH_MAX_QUERIES)
+    limit: int = Field(5, ge=1, le=50) # Results per query
+    mode: Optional[SearchMode] = None
+
+class BatchSearchResponse(BaseModel):
+    results: List[SearchResponse]
+
 class SustainabilityRequest(BaseModel):
-    product_name: str
-    category: str
-    description: str
+    product_id: Optional[str] = None # Looked up in the catalog; fills any fields not sent
+    product_name: Optional[str] = None
+    category: Optional[str] = None
+    description: Optional[str] = None
     image_url: Optional[str] = None
+
+class VideoJob(BaseModel):
+    job_id: str
+    status: str = "queued" # queued, uploading, processing, analyzing, completed, failed
+    progress: int = 0 # 0-100
+    filename: str = ""
+    created_at: float
+    updated_at: float
+    result: Optional[str] = None
+    error: Optional[str] = None
+
+class ProductImport(BaseModel):
+    model_config = ConfigDict(extra="allow") # Keep catalog extras (material, seo_tags, ...)
+
+    id: Optional[str] = None # Generated when missing
+    name: str = Field(min_length=1)
+    description: str = Field(min_length=1)
+    price: float = Field(ge=0)
+    category: str = ""
+    image_url: str = ""
+    link: str = "#"
+    manual_text: str = ""
+
+class BulkImportItem(BaseModel):
+    index: int # Position in the request (line number - 1 for NDJSON)
+    id: Optional[str] = None
+    status: str # indexed, invalid, duplicate, failed
+    error: Optional[str] = None
+
+class BulkImportResponse(BaseModel):
+    total: int
+    indexed: int
+    invalid: int
+    failed: int
+    items: List[BulkImportItem]
@@ -1,23 +1,33 @@
-import google.generativeai as genai
+import asyncio
+import base64
+import hashlib
 import json
 import logging
+import mimetypes
+import os
+from typing import AsyncIterator, Dict, List, Tuple
 from backend.app.core.config import settings
+from backend.app.services.catalog_store import get_catalog_store
+from backend.app.services.catalog_index import get_catalog_index
+from backend.app.services.concurrency import ServiceLimiter
+from backend.app.services.image_loader import get_image_loader
+from backend.app.services.llm import get_llm_client
+from backend.app.services.price_history import parse_price
+from backend.app.services.specs import extract_specs
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
-genai.configure(api_key=settings.GOOGLE_API_KEY)
+_STATIC_IMAGE_DIR = os.path.join("backend", "static", "images")
 
 class AdminService:
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-flash-latest')
+        self.llm = get_llm_client()
+        self.limiter = ServiceLimiter("admin", settings.ADMIN_MAX_CONCURRENCY)
+        self.catalog = get_catalog_store()
+        self.catalog_index = get_catalog_index()
+        self.images = get_image_loader()
 
-    def analyze_product_image(self, image_b64: str):
-        """
-        Analyzes an image and returns structured product metadata.
-        """
-        try:
-            prompt = """
+    _ANALYSIS_PROMPT = """
             Analyze this product image for an e-commerce catalog.
             Return a JSON object with the following fields:
             - name: A catchy, professional product title.
@@ -32,36 +42,186 @@ class AdminService:
             
             Ensure the output is valid JSON.
             """
-            
-            response = self.model.generate_content([
-                {'mime_type': 'image/jpeg', 'data': image_b64},
-                prompt
+
+    def _parse_analysis(self, response) -> dict:
+        # extract json from response
+        text = response.text.replace("```json", "").replace("```", "").strip()
+        return json.loads(text)
+
+    def analyze_product_image(self, image_b64: str):
+        """
+        Analyzes an image and returns structured product metadata.
+        """
+        try:
+            response = self.llm.generate("admin", [
+                self._image_part(image_b64, 'image/jpeg'),
+                self._ANALYSIS_PROMPT
             ])
+            return self._parse_analysis(response)
             
-            # extract json from response
-            text = response.text.replace("```json", "").replace("```", "").strip()
-            return json.loads(text)
+        except Exception as e:
+            logger.error(f"Image analysis failed: {e}")
+            return {"error": str(e)}
+
+    async def analyze_product_image_async(self, image_b64: str, mime_type: str = 'image/jpeg'):
+        try:
+            image_part = await self.limiter.run(self._image_part, image_b64, mime_type)
+            return await self._analyze_part_async(image_part)
+
+        except Exception as e:
+            logger.error(f"Image analysis failed: {e}")
+            return {"error": str(e)}
+
+    def _image_part(self, image_b64: str, mime_type: str) -> dict:
+        # Downscaled before upload: the model needs a few hundred pixels, not the original photo
+        return self.images.part(base64.b64decode(image_b64), mime_type)
+
+    async def _analyze_part_async(self, image_part: dict, feature: str = "admin") -> dict:
+        try:
+            async with self.limiter:
+                response = await self.llm.generate_async(feature, [image_part, self._ANALYSIS_PROMPT])
+            return self._parse_analysis(response)
             
         except Exception as e:
             logger.error(f"Image analysis failed: {e}")
             return {"error": str(e)}
 
+    # --- Batch cataloging ---
+
+    def _product_from_analysis(self, analysis: dict, digest: str, image_url: str) -> dict:
+        # Same shape the admin form saves; the id derives from the image bytes, so re-imports overwrite
+        name = analysis.get("name") or "Untitled Product"
+        material = analysis.get("material", "Unknown")
+        return {
+            "id": f"new_{digest[:12]}",
+            "name": name,
+            # The model may answer "₹1,499", "around 1500" or nothing usable
+            "price": parse_price(analysis.get("estimated_price_inr")) or 999.0,
+            "description": analysis.get("description", ""),
+            "category": analysis.get("category", ""),
+            "material": material,
+            "sustainability_rating": analysis.get("sustainability_rating", 5),
+            "seo_tags": analysis.get("seo_tags", []),
+            "image_url": image_url,
+            "manual_text": f"Manual for {name}. Material: {material}."
+        }
+
+    def _store_image(self, filename: str, data: bytes, digest: str) -> str:
+        extension = os.path.splitext(filename)[1].lower() or ".jpg"
+        stored_name = f"{digest[:16]}{extension}"
+        os.makedirs(_STATIC_IMAGE_DIR, exist_ok=True)
+        with open(os.path.join(_STATIC_IMAGE_DIR, stored_name), "wb") as f:
+            f.write(data)
+        return f"{settings.STATIC_BASE_URL}/images/{stored_name}"
+
+    async def analyze_batch_async(self, images: List[Tuple[str, bytes]], auto_save: bool = False,
+                                  index_products=None) -> AsyncIterator[dict]:
+        """
+        Analyze many images concurrently (bounded and rate limited), yielding one
+        result per image as soon as it completes. Byte-identical images are analyzed
+        once; repeats are reported as duplicates. With auto_save, analyzed products
+        are saved to the catalog in one write and those saved are passed to `index_products`.
+        Ends with a summary dict ({"summary": {...}}).
+        """
+        slots = asyncio.Semaphore(settings.ADMIN_BATCH_CONCURRENCY)
+        first_seen = {} # sha256 -> (filename, bytes) of the copy that gets analyzed
+
+        async def analyze(filename: str, data: bytes, digest: str) -> dict:
+            async with slots:
+                mime_type = mimetypes.guess_type(filename)[0] or "image/jpeg"
+                image_part = await self.limiter.run(self.images.part, data, mime_type)
+                # Background priority: batch jobs yield quota to interactive requests
+                analysis = await self._analyze_part_async(image_part, "admin_batch")
+            if "error" in analysis:
+                return {"filename": filename, "sha256": digest, "status": "error", "error": analysis["error"]}
+            return {"filename": filename, "sha256": digest, "status": "analyzed", "analysis": analysis}
+
+        tasks = []
+        for filename, data in images:
+            digest = hashlib.sha256(data).hexdigest()
+            if digest in first_seen:
+                yield {"filename": filename, "sha256": digest, "status": "duplicate", "duplicate_of": first_seen[digest][0]}
+                continue
+            first_seen[digest] = (filename, data)
+            tasks.append(asyncio.create_task(analyze(filename, data, digest)))
+
+        products = []
+        counts = {"analyzed": 0, "error": 0, "duplicate": len(images) - len(tasks)}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                counts[result["status"]] += 1
+                if auto_save and result["status"] == "analyzed":
+                    filename, data = first_seen[result["sha256"]]
+                    image_url = await self.limiter.run(self._store_image, filename, data, result["sha256"])
+                    product = self._product_from_analysis(result["analysis"], result["sha256"], image_url)
+                    result["product_id"] = product["id"]
+                    products.append(product)
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        summary = {**counts, "saved": 0, "save_errors": {}, "index_errors": {}}
+        if products:
+            summary["save_errors"] = await self.save_products_async(products)
+            saved = [product for product in products if product["id"] not in summary["save_errors"]]
+            summary["saved"] = len(saved)
+            if saved and index_products is not None:
+                summary["index_errors"] = await index_products(saved)
+        yield {"summary": summary}
+
     def save_product(self, product_data: dict):
         """
-        Saves the new product to products.json (and ideally ChromaDB).
-        For prototype, we just append to products.json.
+        Saves the new product to the catalog store (one indexed upsert, safe under concurrent saves).
         """
         try:
-            file_path = "data/products.json"
-            with open(file_path, "r") as f:
-                products = json.load(f)
-            
-            products.append(product_data)
-            
-            with open(file_path, "w") as f:
-                json.dump(products, f, indent=4)
-                
+            product_data = {**product_data, "specs": extract_specs(product_data)}
+            self.catalog.put(product_data, source="admin")
+            self.catalog_index.upsert(product_data)
             return {"status": "success", "message": "Product saved successfully!"}
         except Exception as e:
             logger.error(f"Save failed: {e}")
             return {"status": "error", "message": str(e)}
+
+    async def save_product_async(self, product_data: dict):
+        return await self.limiter.run(self.save_product, product_data)
+
+    def save_products(self, products: List[dict]) -> Dict[str, str]:
+        """
+        Saves many products to the catalog store, in a single transaction unless one of them fails.
+        Returns: {product_id: error} for products that could not be saved.
+        """
+        errors, prepared = {}, []
+        for product in products:
+            try:
+                prepared.append({**product, "specs": extract_specs(product)})
+            except Exception as e:
+                errors[product["id"]] = str(e)
+
+        try:
+            self.catalog.put_many(prepared, source="admin")
+        except Exception as e:
+            # The transaction was rolled back: save one by one so only the failing products are lost
+            logger.warning(f"Bulk save failed, retrying products one by one: {e}")
+            saved = []
+            for product in prepared:
+                try:
+                    self.catalog.put(product, source="admin")
+                    saved.append(product)
+                except Exception as e:
+                    errors[product["id"]] = str(e)
+            prepared = saved
+
+        for product in prepared:
+            try:
+                self.catalog_index.upsert(product)
+            except Exception as e:
+                # Saved; the in-memory index picks it up on the next reload
+                logger.error(f"Catalog index update failed for {product['id']}: {e}")
+        if errors:
+            logger.error(f"Could not save {len(errors)} of {len(products)} products")
+        return errors
+
+    async def save_products_async(self, products: List[dict]) -> Dict[str, str]:
+        return await self.limiter.run(self.save_products, products)
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import sys
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from backend.app.services.catalog_store import get_catalog_store
+
+logger = logging.getLogger(__name__)
+
+# Text fields held column-wise; anything else a product carries lands in `extras`
+_TEXT_FIELDS = ("name", "description", "image_url", "link", "manual_text")
+_CORE_FIELDS = set(_TEXT_FIELDS) | {"id", "price", "category"}
+
+
+class CatalogIndex:
+    """
+    In-memory, column-oriented view of the catalog keyed by product id.
+
+    Each field is one list (prices one float32 array, categories small integer
+    codes into a shared vocabulary), so lookups are O(1) and the per-product
+    overhead is a row number rather than a dict.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.columns: Dict[str, List[str]] = {field: [] for field in _TEXT_FIELDS}
+        self.extras: List[Optional[dict]] = []
+        self.etags: List[str] = []
+        self.prices = np.zeros(0, dtype=np.float32)
+        self.category_codes = np.zeros(0, dtype=np.int32)
+        self.categories: List[str] = []
+        self._category_ids: Dict[str, int] = {}
+        self._size = 0
+        self._listeners: List[Callable[[str], None]] = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, product_id: str) -> bool:
+        return str(product_id) in self._rows
+
+    def _category_code(self, category: str) -> int:
+        code = self._category_ids.get(category)
+        if code is None:
+            code = self._category_ids[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def _grow(self, needed: int):
+        if needed <= len(self.prices):
+            return
+        capacity = max(needed, 2 * len(self.prices), 1024)
+        prices = np.zeros(capacity, dtype=np.float32)
+        prices[:self._size] = self.prices[:self._size]
+        codes = np.zeros(capacity, dtype=np.int32)
+        codes[:self._size] = self.category_codes[:self._size]
+        self.prices, self.category_codes = prices, codes
+
+    def _set(self, product: dict):
+        product_id = str(product["id"])
+        row = self._rows.get(product_id)
+        if row is None:
+            row = self._size
+            self._grow(row + 1)
+            self._rows[product_id] = row
+            self.ids.append(product_id)
+            for values in self.columns.values():
+                values.append("")
+            self.extras.append(None)
+            self.etags.append("")
+            self._size += 1
+
+        for field, values in self.columns.items():
+            # Interned so repeated strings (templated manuals, shared links) are stored once
+            values[row] = sys.intern(str(product.get(field) or ""))
+        self.prices[row] = float(product.get("price") or 0.0)
+        self.category_codes[row] = self._category_code(str(product.get("category") or ""))
+        extras = {k: v for k, v in product.items() if k not in _CORE_FIELDS}
+        self.extras[row] = extras or None
+        self.etags[row] = hashlib.sha1(json.dumps(product, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def load(self, products: Iterable[dict]):
+        with self._lock:
+            for product in products:
+                self._set(product)
+        logger.info(f"Loaded catalog index with {len(self)} products")
+
+    def upsert(self, product: dict):
+        with self._lock:
+            self._set(product)
+        for listener in self._listeners:
+            listener(str(product["id"]))
+
+    def subscribe(self, listener: Callable[[str], None]):
+        """Call `listener(product_id)` whenever a product is added or changed after load."""
+        self._listeners.append(listener)
+
+    def get(self, product_id: str) -> Optional[dict]:
+        """Full product record, or None if the id is unknown."""
+        with self._lock:
+            row = self._rows.get(str(product_id))
+            if row is None:
+                return None
+            product = {"id": self.ids[row]}
+            product.update({field: values[row] for field, values in self.columns.items()})
+            product["price"] = float(self.prices[row])
+            product["category"] = self.categories[self.category_codes[row]]
+            if self.extras[row]:
+                product.update(self.extras[row])
+            return product
+
+    def get_many(self, product_ids: Iterable[str]) -> List[Optional[dict]]:
+        return [self.get(product_id) for product_id in product_ids]
+
+    def etag(self, product_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._rows.get(str(product_id))
+            return self.etags[row] if row is not None else None
+
+
+@lru_cache(maxsize=1)
+def get_catalog_index() -> CatalogIndex:
+    """Shared index, loaded once from the catalog store."""
+    index = CatalogIndex()
+    index.load(get_catalog_store().iter_products())
+    return index
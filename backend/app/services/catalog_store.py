@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogStore:
+    """
+    Embedded SQLite catalog keyed by product id.
+
+    Single-product writes are one indexed upsert (O(1) in catalog size) and are
+    serialised by SQLite, so concurrent admin saves never lose each other.
+    The legacy data/products.json is imported when it changes and can be
+    re-exported for tools that still read it. Each row records its source:
+    JSON-sourced rows mirror the file (ids dropped from it are deleted on
+    re-import), while admin-added or admin-edited rows are never overwritten
+    or deleted by an import.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS products (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                source TEXT NOT NULL DEFAULT 'admin'
+            )"""
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    # --- Writes ---
+
+    def _upsert(self, products: Iterable[dict], source: Optional[str] = None) -> int:
+        now = time.time()
+        # ON CONFLICT ... DO UPDATE keeps the rowid, so export order stays insertion order.
+        # Without a source (e.g. spec enrichment) an existing row keeps its own. An admin write
+        # takes a row over; bulk sources (json, stream) never overwrite an admin row.
+        cursor = self._conn.executemany(
+            """INSERT INTO products (id, data, updated_at, source) VALUES (:id, :data, :now, COALESCE(:source, 'admin'))
+               ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at,
+               source = COALESCE(:source, products.source)
+               WHERE products.source != 'admin' OR :source IS NULL OR :source = 'admin'""",
+            ({"id": str(p["id"]), "data": json.dumps(p), "now": now, "source": source} for p in products)
+        )
+        return cursor.rowcount
+
+    def put(self, product: dict, source: Optional[str] = None):
+        self.put_many([product], source)
+
+    def put_many(self, products: Iterable[dict], source: Optional[str] = None) -> int:
+        """Insert or replace many products in one transaction; on error none of them are written."""
+        with self._lock:
+            try:
+                count = self._upsert(products, source)
+                self._conn.commit()
+            except Exception:
+                # Otherwise the next commit would publish the rows written before the failure
+                self._conn.rollback()
+                raise
+        return count
+
+    # --- Reads ---
+
+    def get(self, product_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM products WHERE id = ?", (str(product_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def iter_products(self, page_size: int = 1000) -> Iterator[dict]:
+        """All products in insertion order, fetched page by page."""
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, data FROM products WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            for _, data in rows:
+                yield json.loads(data)
+
+    # --- Legacy JSON ---
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    def import_json(self, path: str, force: bool = False) -> int:
+        """
+        Mirror a legacy products.json: upsert its products as JSON-sourced rows and
+        delete JSON-sourced rows whose ids are no longer in the file. Admin rows are
+        left exactly as the admin saved them.
+        Skipped when the file hasn't changed since the last import or export, unless forced.
+        """
+        if not os.path.exists(path):
+            return 0
+        mtime = str(os.path.getmtime(path))
+        with self._lock:
+            if not force and self._meta("json_mtime") == mtime:
+                return 0
+
+        with open(path, "r") as f:
+            products = json.load(f)
+
+        with self._lock:
+            count = self._upsert(products, "json")
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS json_ids (id TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM json_ids")
+            self._conn.executemany("INSERT OR IGNORE INTO json_ids (id) VALUES (?)", ((str(p["id"]),) for p in products))
+            removed = self._conn.execute(
+                "DELETE FROM products WHERE source = 'json' AND id NOT IN (SELECT id FROM json_ids)"
+            ).rowcount
+            self._set_meta("json_mtime", mtime)
+            self._conn.commit()
+        logger.info(f"Imported {len(products)} products from {path} ({removed} no longer listed, removed)")
+        return count
+
+    def export_json(self, path: str) -> int:
+        """Stream the catalog to a legacy products.json, one product at a time."""
+        count = 0
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("[\n")
+            for product in self.iter_products():
+                if count:
+                    f.write(",\n")
+                f.write(json.dumps(product, indent=4))
+                count += 1
+            f.write("\n]\n")
+        os.replace(tmp_path, path)
+
+        # Our own export must not trigger a re-import
+        with self._lock:
+            self._set_meta("json_mtime", str(os.path.getmtime(path)))
+            self._conn.commit()
+        return count
+
+
+@lru_cache(maxsize=1)
+def get_catalog_store() -> CatalogStore:
+    """Shared store, picking up data/products.json if it was (re)generated since the last import."""
+    store = CatalogStore(settings.CATALOG_DB_PATH)
+    store.import_json(settings.CATALOG_JSON_PATH)
+    return store
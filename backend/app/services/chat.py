@@ -1,22 +1,23 @@
 import logging
-import google.generativeai as genai
-from typing import List, Tuple, Optional
+from typing import AsyncIterator, List, Tuple, Optional
 from backend.app.core.config import settings
 from backend.app.services.vector_db import get_collection
 from backend.app.services.embeddings import get_embeddings_service
 from backend.app.services.asset_index import AssetIndex
+from backend.app.services.concurrency import ServiceLimiter
+from backend.app.services.llm import get_llm_client
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
-genai.configure(api_key=settings.GOOGLE_API_KEY)
+_VIDEO_TAG = "<VIDEO:"
 
 class ChatService:
     def __init__(self):
         self.collection = get_collection()
         self.embedding_service = get_embeddings_service()
-        self.model = genai.GenerativeModel('gemini-flash-latest')
+        self.llm = get_llm_client()
         self.asset_index = AssetIndex()
+        self.limiter = ServiceLimiter("chat", settings.CHAT_MAX_CONCURRENCY)
 
     def _retrieve_context(self, query: str, limit: int = 3) -> Tuple[str, List[dict]]:
         """Retrieve relevant manual chunks."""
@@ -43,13 +44,7 @@ class ChatService:
             logger.error(f"Context retrieval failed: {e}")
             return "", []
 
-    def chat(self, message: str, history: List[dict] = []) -> Tuple[str, List[dict], Optional[str]]:
-        """
-        RAG Chat with Visual Aid detection.
-        Returns: (response_text, sources, visual_aid_url)
-        """
-        
-        context, sources = self._retrieve_context(message)
+    def _build_prompt(self, message: str, context: str) -> str:
         available_assets = list(self.asset_index._ASSETS.keys())
         
         system_prompt = f"""You are a helpful Indian shopping support assistant designed for e-commerce.
@@ -68,15 +63,10 @@ class ChatService:
         5. Be polite and helpful.
         """
         
-        # Start a chat session
-        chat_session = self.model.start_chat(history=history or [])
-        
-        # Send message with context
-        full_prompt = f"{system_prompt}\n\nUser Question: {message}"
-        response = chat_session.send_message(full_prompt)
-        text_response = response.text
-        
-        # Parse Visual Aid Tag
+        return f"{system_prompt}\n\nUser Question: {message}"
+
+    def _extract_visual_aid(self, text_response: str) -> Tuple[str, Optional[str]]:
+        """Strip the <VIDEO:key> tag from the reply and resolve it to a URL."""
         visual_aid_url = None
         if "<VIDEO:" in text_response:
             try:
@@ -93,4 +83,92 @@ class ChatService:
             except Exception as e:
                 logger.error(f"Error parsing video tag: {e}")
         
+        return text_response, visual_aid_url
+
+    def _contents(self, message: str, context: str, history: List[dict]) -> List[dict]:
+        # The conversation so far plus this turn: what a chat session would send
+        return list(history or []) + [{"role": "user", "parts": [self._build_prompt(message, context)]}]
+
+    def chat(self, message: str, history: List[dict] = []) -> Tuple[str, List[dict], Optional[str]]:
+        """
+        RAG Chat with Visual Aid detection.
+        Returns: (response_text, sources, visual_aid_url)
+        """
+        
+        context, sources = self._retrieve_context(message)
+        
+        # Send the conversation with the context-augmented message
+        response = self.llm.generate("chat", self._contents(message, context, history))
+        text_response, visual_aid_url = self._extract_visual_aid(response.text)
+        
+        return text_response, sources, visual_aid_url
+
+    async def chat_async(self, message: str, history: List[dict] = []) -> Tuple[str, List[dict], Optional[str]]:
+        """
+        Non-blocking variant of chat(): retrieval runs on the shared executor,
+        generation uses the native async Gemini call.
+        """
+        context, sources = await self.limiter.run(self._retrieve_context, message)
+        
+        async with self.limiter:
+            response = await self.llm.generate_async("chat", self._contents(message, context, history))
+        text_response, visual_aid_url = self._extract_visual_aid(response.text)
+        
         return text_response, sources, visual_aid_url
+
+    async def chat_stream_async(self, message: str, history: List[dict] = []) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Streaming RAG chat. Yields (event, data) pairs:
+        "sources" first, then "token" chunks as Gemini produces them,
+        "visual_aid" once a <VIDEO:key> tag has been seen, and finally "done".
+        The tag itself is never forwarded as a token.
+        """
+        context, sources = await self.limiter.run(self._retrieve_context, message)
+        yield "sources", {"sources": sources}
+        
+        video_key = None
+        pending = ""
+        full_text = ""
+        
+        async with self.limiter:
+            async for chunk in self.llm.stream_async("chat", self._contents(message, context, history)):
+                try:
+                    pending += chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. safety metadata only)
+                    continue
+                
+                # Forward everything except a (possibly still incomplete) <VIDEO:key> tag
+                while pending:
+                    start = pending.find(_VIDEO_TAG)
+                    if start == -1:
+                        # Hold back a suffix that might be the beginning of a tag split across chunks
+                        hold = next((n for n in range(min(len(pending), len(_VIDEO_TAG) - 1), 0, -1)
+                                     if _VIDEO_TAG.startswith(pending[-n:])), 0)
+                        text, pending = pending[:len(pending) - hold], pending[len(pending) - hold:]
+                        if text:
+                            full_text += text
+                            yield "token", {"text": text}
+                        break
+                    
+                    if start:
+                        full_text += pending[:start]
+                        yield "token", {"text": pending[:start]}
+                    end = pending.find(">", start)
+                    if end == -1:
+                        pending = pending[start:]
+                        break
+                    video_key = pending[start + len(_VIDEO_TAG):end]
+                    pending = pending[end + 1:]
+        
+        if pending:
+            # Stream ended inside something that looked like a tag: it was plain text after all
+            full_text += pending
+            yield "token", {"text": pending}
+        
+        if video_key:
+            visual_aid_url = self.asset_index.get_visual_aid(video_key)
+            if visual_aid_url:
+                yield "visual_aid", {"url": visual_aid_url}
+        
+        yield "done", {"response": full_text.strip()}
@@ -1,14 +1,100 @@
-import google.generativeai as genai
+import hashlib
+import json
 import logging
-from typing import List
+from typing import List, Tuple
 from backend.app.core.config import settings
+from backend.app.services.cache import TTLCache
+from backend.app.services.catalog_index import get_catalog_index
+from backend.app.services.concurrency import ServiceLimiter
+from backend.app.services.llm import get_llm_client
+from backend.app.services.specs import get_specs
 
 logger = logging.getLogger(__name__)
-genai.configure(api_key=settings.GOOGLE_API_KEY)
+
+_JSON_OUTPUT = {"response_mime_type": "application/json"}
 
 class CompareService:
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-flash-latest')
+        self.llm = get_llm_client()
+        self.limiter = ServiceLimiter("compare", settings.COMPARE_MAX_CONCURRENCY)
+        self.cache = TTLCache(settings.COMPARE_CACHE_MAX_ENTRIES, settings.COMPARE_CACHE_TTL_SECONDS)
+        # Admin edits go through the catalog index; drop every comparison that includes the product
+        get_catalog_index().subscribe(self.invalidate_product)
+
+    @staticmethod
+    def _product_key(product: dict) -> str:
+        # External (online) results have no id; their link, else their title, identifies them
+        return str(product.get("id") or product.get("link") or product.get("title") or product.get("name") or "")
+
+    def _cache_key(self, products: List[dict]) -> Tuple[Tuple[str, ...], str]:
+        # Order-independent product set, plus a content hash so edited payloads never hit stale results
+        ordered = sorted(products, key=lambda p: (self._product_key(p), json.dumps(p, sort_keys=True, default=str)))
+        content = json.dumps(ordered, sort_keys=True, default=str)
+        return tuple(str(p.get("id", "")) for p in ordered), hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def invalidate_product(self, product_id: str):
+        self.cache.invalidate(lambda key: product_id in key[0])
+
+    def _build_prompt(self, products: List[dict], specs: List[dict]) -> str:
+        # Factual columns are built locally from the precomputed specs;
+        # the model only sees a one-line summary per product and writes the judgement columns.
+        lines = []
+        for i, (p, spec) in enumerate(zip(products, specs), start=1):
+            lines.append(
+                f"{i}. {p.get('name')} | ₹{spec['price']:,.0f} | {spec['category'] or 'General'} | "
+                f"{', '.join(spec['key_features']) or '-'} | {', '.join(spec['materials']) or '-'}"
+            )
+        products_text = "\n".join(lines)
+
+        return f"""
+        You are a smart shopping assistant comparing these products (name | price | category | features | materials):
+        {products_text}
+
+        Return only JSON:
+        {{"products": [{{"pros": "...", "cons": "...", "best_for": "..."}}, ...one per product, same order],
+          "best_value": <product number>, "summary": "<one sentence>"}}
+        Keep every field under 15 words.
+        """
+
+    def _parse_notes(self, text: str, count: int) -> dict:
+        try:
+            notes = json.loads(text.replace("```json", "").replace("```", "").strip())
+            rows = notes.get("products", [])
+            if not isinstance(rows, list):
+                rows = []
+        except (ValueError, AttributeError):
+            logger.warning("Comparison notes were not valid JSON; rendering facts only")
+            return {"products": [{}] * count, "best_value": None, "summary": ""}
+        rows = [row if isinstance(row, dict) else {} for row in rows[:count]]
+        best_value = str(notes.get("best_value", ""))
+        return {
+            "products": rows + [{}] * (count - len(rows)),
+            "best_value": int(best_value) if best_value.isdigit() else None,
+            "summary": notes.get("summary", ""),
+        }
+
+    def _render_table(self, products: List[dict], specs: List[dict], notes: dict) -> str:
+        def cell(value) -> str:
+            return str(value or "—").replace("|", "/").replace("\n", " ")
+
+        rows = [
+            "| Product Name | Price (₹) | Category | Key Features | Material | Pros | Cons | Best For |",
+            "|---|---|---|---|---|---|---|---|",
+        ]
+        for i, (p, spec, note) in enumerate(zip(products, specs, notes["products"]), start=1):
+            name = cell(p.get("name"))
+            if notes["best_value"] == i:
+                name = f"**{name}** 🏆"
+            rows.append(
+                f"| {name} | ₹{spec['price']:,.0f} | {cell(spec['category'])} | {cell(', '.join(spec['key_features']))} | "
+                f"{cell(', '.join(spec['materials']))} | {cell(note.get('pros'))} | {cell(note.get('cons'))} | "
+                f"{cell(note.get('best_for'))} |"
+            )
+
+        table = "\n".join(rows)
+        if notes["summary"]:
+            table += f"\n\n**Summary:** {notes['summary']}"
+        return table
 
     def compare_products(self, products: List[dict]) -> str:
         """
@@ -17,34 +103,41 @@ class CompareService:
         if not products or len(products) < 2:
             return "Please select at least 2 products to compare."
 
-        # Construct context for the prompt
-        products_text = ""
-        for p in products:
-            products_text += f"""
-            Product: {p.get('name')}
-            Price: {p.get('price')}
-            Description: {p.get('description')}
-            Manual/Features: {p.get('manual_text', '')}
-            ---
-            """
-
-        prompt = f"""
-        You are a smart shopping assistant. Create a detailed Comparison Table for these products.
-
-        Products Info:
-        {products_text}
+        key = self._cache_key(products)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
 
-        Instructions:
-        1. Output a Markdown Table.
-        2. Columns: Product Name, Price (in ₹), Key Features, Pros, Cons, Best For.
-        3. Highlight the "Best Value" choice in **bold green** within the table if possible, or mention it in a summary below.
-        4. Be concise.
-        5. IMPORTANT: Display all prices in Indian Rupees (₹).
-        """
+        try:
+            specs = [get_specs(p) for p in products]
+            response = self.llm.generate(
+                "compare", self._build_prompt(products, specs), generation_config=_JSON_OUTPUT
+            )
+            markdown = self._render_table(products, specs, self._parse_notes(response.text, len(products)))
+            self.cache.put(key, markdown)
+            return markdown
+        except Exception as e:
+            logger.error(f"Comparison generation failed: {e}")
+            return "Sorry, I couldn't generate the comparison at this moment."
+
+    async def compare_products_async(self, products: List[dict]) -> str:
+        if not products or len(products) < 2:
+            return "Please select at least 2 products to compare."
+
+        key = self._cache_key(products)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
 
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            specs = [get_specs(p) for p in products]
+            async with self.limiter:
+                response = await self.llm.generate_async(
+                    "compare", self._build_prompt(products, specs), generation_config=_JSON_OUTPUT
+                )
+            markdown = self._render_table(products, specs, self._parse_notes(response.text, len(products)))
+            self.cache.put(key, markdown)
+            return markdown
         except Exception as e:
             logger.error(f"Comparison generation failed: {e}")
             return "Sorry, I couldn't generate the comparison at this moment."
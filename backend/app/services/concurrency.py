@@ -0,0 +1,119 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable
+from backend.app.core.config import settings
+
+# Shared pool for blocking work (Chroma, embeddings, HTTP, file IO) issued from async code
+_executor = ThreadPoolExecutor(max_workers=settings.EXECUTOR_MAX_WORKERS, thread_name_prefix="shopai-io")
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking callable on the shared executor without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+class ServiceLimiter:
+    """
+    Per-service concurrency cap for async code paths.
+
+    `async with limiter:` bounds native async model calls, and
+    `await limiter.run(fn, ...)` runs blocking work on the shared executor
+    under the same cap, so one slow service cannot starve the others.
+    Every limiter registers itself by name, for `limiter_stats()`.
+    """
+
+    _registry: Dict[str, "ServiceLimiter"] = {}
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        ServiceLimiter._registry[name] = self
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self.completed += 1
+        self._semaphore.release()
+        return False
+
+    async def run(self, fn, *args, **kwargs):
+        async with self:
+            return await run_blocking(fn, *args, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+        }
+
+
+def limiter_stats() -> dict:
+    """Stats of every registered ServiceLimiter, keyed by service name."""
+    return {name: limiter.stats() for name, limiter in sorted(ServiceLimiter._registry.items())}
+
+
+class RateLimiter:
+    """
+    Spaces out call starts to at most `rate_per_minute`, for upstream APIs
+    with request quotas. `await limiter.wait()` before each call.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.interval = 60.0 / rate_per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key (across threads): the first
+    caller runs `fn`, the rest wait for and share its result or exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result()
+
+        try:
+            call.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            call.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result()
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+def eco_content_hash(product_name: str, category: str, description: str, image_url: Optional[str],
+                     image: Optional[bytes] = None) -> str:
+    """
+    Hash of every input the eco audit depends on; a change to any of them invalidates the stored score.
+    `image` is the prepared image the audit actually saw, so replacing the picture behind an
+    unchanged URL re-scores the product too. ImageLoader revalidates remote images with
+    ETag / Last-Modified; for origins that send neither, the first cached copy stands until its
+    entry in IMAGE_FETCH_CACHE_DIR is deleted (or run precompute_eco_scores.py --force).
+    """
+    image_digest = hashlib.sha256(image).hexdigest() if image else ""
+    source = json.dumps([product_name, category, description, image_url or "", image_digest], ensure_ascii=False)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class EcoScoreStore:
+    """
+    Persistent eco-score results keyed by product id plus content hash.
+    Products without an id (e.g. external search results) are stored under the hash alone.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS eco_scores (
+                product_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (product_id, content_hash)
+            )"""
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, product_id: Optional[str], content_hash: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM eco_scores WHERE product_id = ? AND content_hash = ?",
+                (product_id or "", content_hash)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def contains(self, product_id: Optional[str], content_hash: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM eco_scores WHERE product_id = ? AND content_hash = ?",
+                (product_id or "", content_hash)
+            ).fetchone() is not None
+
+    def put(self, product_id: Optional[str], content_hash: str, result: dict):
+        with self._lock:
+            # A catalog product keeps only the score for its current content
+            if product_id:
+                self._conn.execute("DELETE FROM eco_scores WHERE product_id = ?", (product_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO eco_scores (product_id, content_hash, result, created_at) VALUES (?, ?, ?, ?)",
+                (product_id or "", content_hash, json.dumps(result), time.time())
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM eco_scores").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -1,11 +1,221 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from langchain_core.embeddings import Embeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from backend.app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, size-bounded store of embedding vectors on local disk.
+    Vectors are packed as float32 blobs; the least recently used entries are
+    evicted once the store grows past `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, task: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{task}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                chunk = keys[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        now = time.time()
+        with self._lock:
+            for key, vector in items.items():
+                blob = array("f", vector).tobytes()
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), now)
+                )
+                if cursor.rowcount:
+                    self._size += len(blob)
+            self._conn.commit()
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used vectors until the store is back under 90% of its budget."""
+        target = int(self.max_bytes * 0.9)
+        while self._size > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_used LIMIT ?", (_SQL_BATCH,)
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                break
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                self._size -= size
+                if self._size <= target:
+                    break
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        self._conn.commit()
+        logger.info(f"Embedding cache evicted down to {self._size / (1024 * 1024):.1f} MB")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "entries": entries,
+            "size_mb": round(self._size / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedding client that serves repeated texts from the local EmbeddingCache
+    and only sends cache misses to the upstream model.
+    """
+
+    def __init__(self, upstream: Embeddings, model: str, cache: EmbeddingCache):
+        self.upstream = upstream
+        self.model = model
+        self.cache = cache
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+        self.upstream_seconds = 0.0
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
+
+    def embed_documents(self, texts: List[str], task_type: Optional[str] = None) -> List[List[float]]:
+        # Batched queries (task_type="retrieval_query") share cache entries with embed_query
+        task = "query" if task_type == "retrieval_query" else (task_type or "document")
+        return self._embed(texts, task)
+
+    def _fetch(self, texts: List[str], task: str) -> List[List[float]]:
+        if task == "query":
+            if len(texts) == 1:
+                return [self.upstream.embed_query(texts[0])]
+            return self.upstream.embed_documents(texts, task_type="retrieval_query")
+        if task == "document":
+            return self.upstream.embed_documents(texts)
+        return self.upstream.embed_documents(texts, task_type=task)
+
+    def _embed(self, texts: List[str], task: str) -> List[List[float]]:
+        if not texts:
+            return []
+
+        keys = [self.cache.make_key(self.model, task, text) for text in texts]
+        vectors = self.cache.get_many(set(keys))
+
+        # Deduplicate misses so repeated texts in one batch cost a single upstream slot
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        with self._lock:
+            self.hits += len(texts) - sum(1 for key in keys if key in missing)
+            self.misses += len(missing)
+
+        if missing:
+            started = time.perf_counter()
+            fetched = self._fetch(list(missing.values()), task)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.upstream_calls += 1
+                self.upstream_seconds += elapsed
+
+            new_vectors = dict(zip(missing.keys(), fetched))
+            self.cache.put_many(new_vectors)
+            vectors.update(new_vectors)
+
+        return [vectors[key] for key in keys]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            avg_latency = self.upstream_seconds / self.misses if self.misses else 0.0
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "upstream_calls": self.upstream_calls,
+                "upstream_seconds": round(self.upstream_seconds, 3),
+                # Rough estimate: every hit would have cost the average per-text upstream latency
+                "estimated_seconds_saved": round(self.hits * avg_latency, 3),
+            }
+        stats.update(self.cache.stats())
+        return stats
+
+
+@lru_cache(maxsize=1)
 def get_embeddings_service():
     if not settings.GOOGLE_API_KEY:
         raise ValueError("GOOGLE_API_KEY is not set in environment or .env file.")
-    
-    return GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
+
+    upstream = GoogleGenerativeAIEmbeddings(
+        model=settings.EMBEDDING_MODEL,
         google_api_key=settings.GOOGLE_API_KEY
     )
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return upstream
+
+    cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+    return CachedEmbeddings(upstream, settings.EMBEDDING_MODEL, cache)
+
+
+def get_embedding_stats() -> dict:
+    """Hit/miss counters of the shared embedding cache (empty when caching is disabled)."""
+    service = get_embeddings_service()
+    if isinstance(service, CachedEmbeddings):
+        return service.stats()
+    return {}
@@ -0,0 +1,118 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from io import BytesIO
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def perceptual_hash(image_bytes: bytes) -> int:
+    """
+    64-bit difference hash (dHash) of an image.
+    Computed on a 9x8 grayscale thumbnail, so it survives re-encoding,
+    resizing and small colour shifts; near-duplicates differ in only a few bits.
+    """
+    with Image.open(BytesIO(image_bytes)) as img:
+        pixels = np.asarray(img.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+class ImageDescriptionCache:
+    """
+    Cache of Gemini image descriptions and their embeddings, keyed by
+    perceptual hash. Lookups match any stored image within `max_distance`
+    bits (Hamming distance), so re-uploads of the same photo skip both the
+    vision call and the embedding call.
+    """
+
+    def __init__(self, path: str, model: str, max_distance: int = 6):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.model = model
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS image_descriptions (
+                phash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                description TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (phash, model)
+            )"""
+        )
+        self._conn.commit()
+
+        # Hashes of the current embedding model, scanned in one vectorised pass per lookup
+        rows = self._conn.execute(
+            "SELECT phash FROM image_descriptions WHERE model = ?", (model,)
+        ).fetchall()
+        self._hashes = np.array([int(row[0], 16) for row in rows], dtype=np.uint64)
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def _nearest(self, phash: int) -> Tuple[Optional[int], int]:
+        if not len(self._hashes):
+            return None, 64
+        xor = self._hashes ^ np.uint64(phash)
+        distances = np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+        best = int(np.argmin(distances))
+        return int(self._hashes[best]), int(distances[best])
+
+    def get(self, phash: int) -> Optional[Tuple[str, List[float]]]:
+        """Returns (description, embedding) of the closest cached image, or None."""
+        with self._lock:
+            match, distance = self._nearest(phash)
+            if match is None or distance > self.max_distance:
+                self.misses += 1
+                return None
+
+            row = self._conn.execute(
+                "SELECT description, embedding FROM image_descriptions WHERE phash = ? AND model = ?",
+                (f"{match:016x}", self.model)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            if distance == 0:
+                self.hits += 1
+            else:
+                self.near_hits += 1
+
+        embedding = array("f")
+        embedding.frombytes(row[1])
+        return row[0], embedding.tolist()
+
+    def put(self, phash: int, description: str, embedding: List[float]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_descriptions (phash, model, description, embedding, created_at) VALUES (?, ?, ?, ?, ?)",
+                (f"{phash:016x}", self.model, description, array("f", embedding).tobytes(), time.time())
+            )
+            self._conn.commit()
+            if not (self._hashes == np.uint64(phash)).any():
+                self._hashes = np.append(self._hashes, np.uint64(phash))
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.near_hits + self.misses
+            return {
+                "entries": int(len(self._hashes)),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.near_hits) / total, 4) if total else 0.0,
+                "max_distance": self.max_distance,
+            }
@@ -0,0 +1,211 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ImageLoader:
+    """
+    Fetches product images for model calls.
+
+    One pooled HTTP session with strict timeouts, an on-disk cache keyed by URL
+    (revalidated with ETag / Last-Modified, so unchanged images cost a 304), and
+    downscaling to `max_edge` pixels re-encoded as JPEG before anything reaches a
+    model. The cache holds the prepared bytes, not the originals.
+    """
+
+    def __init__(self, cache_dir: str, max_edge: int, quality: int = 85,
+                 timeout: tuple = (3.05, 10), max_bytes: int = 10 * 1024 * 1024, pool_size: int = 16):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_edge = max_edge
+        self.quality = quality
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.errors = 0
+
+    # --- Encoding ---
+
+    def prepare(self, data: bytes) -> bytes:
+        """Downscale to `max_edge` and re-encode as JPEG. Small JPEGs pass through untouched."""
+        with Image.open(BytesIO(data)) as img:
+            if img.format == "JPEG" and max(img.size) <= self.max_edge:
+                return data
+            img = img.convert("RGB")
+            img.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+            out = BytesIO()
+            img.save(out, format="JPEG", quality=self.quality, optimize=True)
+            return out.getvalue()
+
+    def part(self, data: bytes, mime_type: str = "image/jpeg") -> dict:
+        """Gemini inline image part for `data`, downscaled when it can be decoded."""
+        try:
+            data, mime_type = self.prepare(data), "image/jpeg"
+        except Exception as e:
+            logger.warning(f"Could not downscale image, sending original: {e}")
+        return {"mime_type": mime_type, "data": base64.b64encode(data).decode()}
+
+    # --- Fetching ---
+
+    def _cache_paths(self, key: str) -> tuple:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, digest)
+        return base + ".jpg", base + ".json"
+
+    def _read_cache(self, key: str) -> tuple:
+        data_path, meta_path = self._cache_paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            # Entries prepared for a different size are useless
+            if meta.get("max_edge") != self.max_edge:
+                return None, {}
+            with open(data_path, "rb") as f:
+                return f.read(), meta
+        except (OSError, ValueError):
+            return None, {}
+
+    def _write_cache(self, key: str, data: bytes, meta: dict):
+        data_path, meta_path = self._cache_paths(key)
+        meta = {**meta, "url": key, "max_edge": self.max_edge}
+        # Data first, metadata last: a crash in between leaves an entry that simply misses
+        for path, payload, mode in ((data_path, data, "wb"), (meta_path, json.dumps(meta), "w")):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode) as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _local_path(self, image_url: str) -> Optional[Path]:
+        # Images served by this backend are read from disk instead of over HTTP
+        for prefix in (settings.STATIC_BASE_URL, "/static"):
+            if image_url.startswith(prefix):
+                relative = image_url[len(prefix):].lstrip("/")
+                return Path(os.getcwd()) / "backend" / "static" / relative
+        return None
+
+    def _fetch_local(self, image_url: str, path: Path) -> bytes:
+        stat = path.stat()
+        validator = f"{stat.st_mtime_ns}:{stat.st_size}"
+        cached, meta = self._read_cache(image_url)
+        if cached is not None and meta.get("validator") == validator:
+            self._count("hits")
+            return cached
+
+        self._count("misses")
+        data = self.prepare(path.read_bytes())
+        self._write_cache(image_url, data, {"validator": validator})
+        return data
+
+    def _fetch_remote(self, image_url: str) -> bytes:
+        cached, meta = self._read_cache(image_url)
+        headers = {}
+        if cached is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+            if not headers:
+                # No validator to revalidate with: the cached copy is all we can have
+                self._count("hits")
+                return cached
+
+        try:
+            with self.session.get(image_url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and cached is not None:
+                    self._count("revalidated")
+                    return cached
+                response.raise_for_status()
+                body = response.raw.read(self.max_bytes + 1, decode_content=True)
+                if len(body) > self.max_bytes:
+                    raise ValueError(f"image larger than {self.max_bytes} bytes")
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except Exception:
+            if cached is not None:
+                # Origin unreachable: a stale image is better than none
+                logger.warning(f"Revalidation failed, serving cached image for {image_url}")
+                self._count("hits")
+                return cached
+            raise
+
+        self._count("misses")
+        data = self.prepare(body)
+        self._write_cache(image_url, data, {"etag": etag, "last_modified": last_modified})
+        return data
+
+    def fetch(self, image_url: str) -> Optional[bytes]:
+        """Prepared JPEG bytes for a URL or /static path, or None if it cannot be loaded."""
+        try:
+            local_path = self._local_path(image_url)
+            if local_path is not None:
+                return self._fetch_local(image_url, local_path)
+            if image_url.startswith("http"):
+                return self._fetch_remote(image_url)
+            return None
+        except Exception as e:
+            self._count("errors")
+            logger.error(f"Image load failed: {e}")
+            return None
+
+    @staticmethod
+    def prepared_part(data: bytes) -> dict:
+        """Gemini inline image part for bytes `fetch` already prepared."""
+        return {"mime_type": "image/jpeg", "data": base64.b64encode(data).decode()}
+
+    def load_part(self, image_url: str) -> Optional[dict]:
+        """Gemini inline image part for `image_url`, or None if it cannot be loaded."""
+        data = self.fetch(image_url)
+        if data is None:
+            return None
+        return self.prepared_part(data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.revalidated + self.misses
+            return {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": round((self.hits + self.revalidated) / total, 4) if total else 0.0,
+                "max_edge": self.max_edge,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_image_loader() -> ImageLoader:
+    """Shared loader, so every service reuses one connection pool and cache."""
+    return ImageLoader(
+        settings.IMAGE_FETCH_CACHE_DIR,
+        settings.IMAGE_MAX_EDGE,
+        quality=settings.IMAGE_JPEG_QUALITY,
+        timeout=(settings.IMAGE_FETCH_CONNECT_TIMEOUT, settings.IMAGE_FETCH_READ_TIMEOUT),
+        max_bytes=settings.IMAGE_FETCH_MAX_BYTES,
+        pool_size=settings.IMAGE_FETCH_POOL_SIZE,
+    )
@@ -0,0 +1,338 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from backend.app.services.specs import with_specs
+
+logger = logging.getLogger(__name__)
+
+# (doc_id, text, metadata) as written to Chroma
+IngestDocument = Tuple[str, str, dict]
+
+
+def product_documents(product: dict, text_splitter, include_description: bool = True,
+                      include_manual: bool = True) -> List[IngestDocument]:
+    """
+    Split one catalog product into the Chroma documents we index:
+    its description (for semantic search) and its manual chunks (for RAG).
+    """
+    documents = []
+
+    # Index Description (for semantic search)
+    if include_description and product.get("description"):
+        documents.append((
+            f"{product['id']}_desc",
+            product["description"],
+            {
+                "product_id": product["id"],
+                "product_name": product["name"],
+                "price": float(product.get("price") or 0.0),
+                "image_url": product.get("image_url", ""),
+                "link": product.get("link", "#"),
+                "category": product.get("category", ""),
+                "type": "description"
+            }
+        ))
+
+    # Index Manual (for RAG)
+    manual_text = product.get("manual_text", "")
+    if include_manual and manual_text:
+        for i, chunk in enumerate(text_splitter.split_text(manual_text)):
+            documents.append((
+                f"{product['id']}_manual_{i}",
+                chunk,
+                {
+                    "product_id": product["id"],
+                    "product_name": product["name"],
+                    "type": "manual",
+                    "chunk_id": i
+                }
+            ))
+
+    return documents
+
+
+def content_hash(text: str, metadata: dict) -> str:
+    payload = json.dumps({"text": text, "metadata": metadata}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IngestManifest:
+    """
+    Content hash of every document currently in the collection, keyed by doc id.
+    Lets ingestion embed only new or changed chunks and delete the ones that disappeared.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+
+    def load(self) -> "IngestManifest":
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+        # Replay batches checkpointed by an interrupted run
+        journal = self.path + ".journal"
+        if os.path.exists(journal):
+            with open(journal, "r") as f:
+                for line in f:
+                    if line.strip():
+                        for doc_id, entry in json.loads(line).items():
+                            if entry is None:
+                                self.entries.pop(doc_id, None) # Removed since the last save
+                            else:
+                                self.entries[doc_id] = entry
+        return self
+
+    def save(self):
+        """Write the full manifest and fold in the checkpoint journal."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.entries, f)
+        os.replace(self.path + ".tmp", self.path)
+        if os.path.exists(self.path + ".journal"):
+            os.remove(self.path + ".journal")
+
+    def checkpoint(self, doc_ids: Iterable[str]):
+        """
+        Append the given entries to the journal; cheap enough to call after every batch.
+        Ids no longer in the manifest are journaled as removals.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".journal", "a") as f:
+            f.write(json.dumps({doc_id: self.entries.get(doc_id) for doc_id in doc_ids}) + "\n")
+
+    def journal(self, indexed: Iterable[IngestDocument], removed: Iterable[str]):
+        """
+        Record documents written to the collection outside sync_documents (e.g. admin
+        imports), so the next sync neither re-embeds nor mis-deletes them. Only appends
+        to the journal, so it works on a manifest that was never loaded.
+        """
+        doc_ids = []
+        for document in indexed:
+            doc_id, text, metadata = document
+            self.record(document, content_hash(text, metadata))
+            doc_ids.append(doc_id)
+        removed = list(removed)
+        self.forget(removed)
+        if doc_ids or removed:
+            self.checkpoint(doc_ids + removed)
+
+    def reset(self):
+        self.entries = {}
+
+    def changed(self, documents: Iterable[IngestDocument], seen: Set[str]) -> Iterator[Tuple[IngestDocument, str]]:
+        """
+        Stream (document, hash) for every document that is new or whose content changed.
+        Every doc id passed through is added to `seen`, for `removed()` once the stream is exhausted.
+        """
+        for document in documents:
+            doc_id, text, metadata = document
+            seen.add(doc_id)
+            digest = content_hash(text, metadata)
+            entry = self.entries.get(doc_id)
+            if entry is None or entry["hash"] != digest:
+                yield document, digest
+
+    def removed(self, seen: Set[str], types: Set[str]) -> List[str]:
+        """
+        Doc ids in the manifest that were not seen in this run.
+        Only entries of the given types are candidates, so a manuals-only
+        run never removes description documents.
+        """
+        return [
+            doc_id for doc_id, entry in self.entries.items()
+            if entry["type"] in types and doc_id not in seen
+        ]
+
+    def record(self, document: IngestDocument, digest: str):
+        doc_id, _, metadata = document
+        self.entries[doc_id] = {"hash": digest, "type": metadata.get("type", "")}
+
+    def forget(self, doc_ids: Iterable[str]):
+        for doc_id in doc_ids:
+            self.entries.pop(doc_id, None)
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def prefetch(items: Iterable, maxsize: int = 1000) -> Iterator:
+    """
+    Run an iterator on a background thread, handing items over through a bounded queue.
+    Lets adjacent pipeline stages overlap while capping how far the producer runs ahead.
+    If the consumer stops early (an exception, or the generator is closed), the producer
+    stops too instead of blocking forever on a full queue.
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    done = object()
+    stop = threading.Event()
+    errors = []
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+    if errors:
+        raise errors[0]
+
+
+def _embed_with_backoff(embedding_service, texts: List[str], max_retries: int) -> List[List[float]]:
+    """Embed one batch, retrying transient upstream errors with exponential backoff and jitter."""
+    for attempt in range(max_retries + 1):
+        try:
+            return embedding_service.embed_documents(texts)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+            logger.warning(f"Embedding batch failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def embed_and_upsert(collection, embedding_service, changed: Iterable[Tuple[IngestDocument, str]],
+                     manifest: IngestManifest, batch_size: int, workers: int, max_retries: int) -> dict:
+    """
+    Embed `changed` documents (a list or a stream) in fixed-size batches on a bounded worker pool.
+    Each batch is upserted to Chroma as soon as it completes and checkpointed
+    into the manifest, so an interrupted run resumes with the remaining batches.
+    Batches that still fail after retries are left out of the manifest and picked up next run.
+    """
+    started = time.perf_counter()
+    done = 0
+    failed = 0
+    batches = _batches(changed, batch_size)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def submit_next() -> bool:
+            batch = next(batches, None)
+            if batch is None:
+                return False
+            texts = [text for (_, text, _), _ in batch]
+            pending[pool.submit(_embed_with_backoff, embedding_service, texts, max_retries)] = batch
+            return True
+
+        # Keep at most two batches per worker in flight so memory stays bounded
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch = pending.pop(future)
+                try:
+                    embeddings = future.result()
+                    # Chroma writes stay on this thread; only embedding runs in parallel
+                    collection.upsert(
+                        ids=[doc_id for (doc_id, _, _), _ in batch],
+                        documents=[text for (_, text, _), _ in batch],
+                        metadatas=[metadata for (_, _, metadata), _ in batch],
+                        embeddings=embeddings
+                    )
+                    for document, digest in batch:
+                        manifest.record(document, digest)
+                    manifest.checkpoint(doc_id for (doc_id, _, _), _ in batch)
+                    done += len(batch)
+                except Exception as e:
+                    failed += len(batch)
+                    logger.error(f"Giving up on batch of {len(batch)} documents: {e}")
+
+                elapsed = time.perf_counter() - started
+                logger.info(f"Embedded {done} documents ({done / elapsed:.1f} docs/sec)")
+                submit_next()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "upserted": done,
+        "failed": failed,
+        "seconds": round(elapsed, 2),
+        "docs_per_sec": round(done / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def sync_documents(collection, embedding_service, documents: Iterable[IngestDocument],
+                   manifest: IngestManifest, types: Set[str], batch_size: int = 100,
+                   workers: int = 4, max_retries: int = 5) -> dict:
+    """
+    Bring the collection in line with `documents`: embed and upsert only new or
+    changed chunks, delete chunks that disappeared, and persist the manifest.
+    `documents` may be a generator; it is consumed once, batch by batch.
+    """
+    # A wiped collection invalidates whatever the manifest remembers
+    if manifest.entries and collection.count() == 0:
+        logger.info("Collection is empty; ignoring stale ingest manifest.")
+        manifest.reset()
+
+    # Every doc id of the run; the same order of size as the manifest, which is held in memory anyway
+    seen = set()
+    stats = embed_and_upsert(collection, embedding_service, manifest.changed(documents, seen), manifest,
+                             batch_size, workers, max_retries)
+
+    # Deletions are only known once the whole stream has been seen
+    removed = manifest.removed(seen, types)
+    if removed:
+        collection.delete(ids=removed)
+        manifest.forget(removed)
+    manifest.save()
+
+    return {
+        "total": len(seen),
+        "deleted": len(removed),
+        "unchanged": len(seen) - stats["upserted"] - stats["failed"],
+        **stats,
+    }
+
+
+def normalize_product(product: dict) -> dict:
+    """Coerce a raw catalog row into the field types the indexes and API expect, with specs attached."""
+    return with_specs({
+        **product,
+        "id": str(product["id"]),
+        "name": str(product.get("name", "")).strip(),
+        "price": float(product.get("price") or 0.0),
+        "description": str(product.get("description", "")).strip(),
+        "image_url": product.get("image_url", ""),
+        "link": product.get("link", "#"),
+        "category": product.get("category", ""),
+    })
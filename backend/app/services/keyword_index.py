@@ -0,0 +1,182 @@
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SNAPSHOT_FILE = "docs.json"
+_DELTA_FILE = "delta.jsonl"
+
+# Alphanumeric runs, so SKUs ("53872"), sizes ("32gb") and brand names survive intact
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Product fields kept per document so keyword-only search can build results without Chroma
+_DOC_FIELDS = ("name", "description", "category", "price", "image_url", "link")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class KeywordIndex:
+    """
+    Local BM25 inverted index over product name, description and category.
+
+    Postings are rebuilt in memory from a JSON snapshot of the indexed product
+    fields; products added after the snapshot are appended to a delta log that
+    is replayed on load and folded into the next snapshot.
+    """
+
+    def __init__(self, index_dir: str, k1: float = 1.5, b: float = 0.75, compact_after: int = 1000):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.compact_after = compact_after
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_len: Dict[str, int] = {}
+        self.docs: Dict[str, dict] = {}
+        self.total_len = 0
+        self._delta_count = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # --- Indexing ---
+
+    def _add(self, product: dict):
+        product_id = str(product["id"])
+        if product_id in self.docs:
+            self._remove(product_id)
+
+        doc = {field: product.get(field, "") for field in _DOC_FIELDS}
+        # Name is counted twice: a term in the title is a stronger signal than one in the body
+        tokens = tokenize(f"{doc['name']} {doc['name']} {doc['description']} {doc['category']}")
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, {})[product_id] = tf
+
+        self.docs[product_id] = doc
+        self.doc_len[product_id] = len(tokens)
+        self.total_len += len(tokens)
+
+    def _remove(self, product_id: str):
+        doc = self.docs.pop(product_id)
+        tokens = tokenize(f"{doc['name']} {doc['name']} {doc['description']} {doc['category']}")
+        for term in set(tokens):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(product_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_len -= self.doc_len.pop(product_id, 0)
+
+    def build(self, products: Iterable[dict]):
+        """Index a full catalog from scratch and write a fresh snapshot."""
+        with self._lock:
+            self._clear()
+            for product in products:
+                self._add(product)
+            self.save()
+        logger.info(f"Built keyword index with {len(self)} products and {len(self.postings)} terms")
+
+    def add(self, product: dict, persist: bool = True):
+        """
+        Add or replace one product, persisting it to the delta log.
+        With persist=False the product is only indexed in memory until the next save().
+        """
+        with self._lock:
+            self._add(product)
+            if not persist:
+                return
+            os.makedirs(self.index_dir, exist_ok=True)
+            with open(os.path.join(self.index_dir, _DELTA_FILE), "a") as f:
+                f.write(json.dumps({"id": str(product["id"]), **self.docs[str(product["id"])]}) + "\n")
+            self._delta_count += 1
+            if self._delta_count >= self.compact_after:
+                self.save()
+
+    # --- Persistence ---
+
+    def save(self):
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            path = os.path.join(self.index_dir, _SNAPSHOT_FILE)
+            with open(path + ".tmp", "w") as f:
+                json.dump(self.docs, f)
+            os.replace(path + ".tmp", path)
+
+            delta_path = os.path.join(self.index_dir, _DELTA_FILE)
+            if os.path.exists(delta_path):
+                os.remove(delta_path)
+            self._delta_count = 0
+
+    def load(self) -> bool:
+        path = os.path.join(self.index_dir, _SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return False
+
+        with self._lock:
+            self._clear()
+            with open(path, "r") as f:
+                docs = json.load(f)
+            for product_id, doc in docs.items():
+                self._add({"id": product_id, **doc})
+
+            delta_path = os.path.join(self.index_dir, _DELTA_FILE)
+            if os.path.exists(delta_path):
+                with open(delta_path, "r") as f:
+                    for line in f:
+                        if line.strip():
+                            self._add(json.loads(line))
+                            self._delta_count += 1
+
+        logger.info(f"Loaded keyword index with {len(self)} products")
+        return True
+
+    # --- Search ---
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        BM25 ranking of products for the query.
+        Returns: [(product_id, score)] best first.
+        """
+        with self._lock:
+            n_docs = len(self.docs)
+            if not n_docs:
+                return []
+            avg_len = self.total_len / n_docs
+
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for product_id, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_len[product_id] / avg_len)
+                    scores[product_id] = scores.get(product_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def get(self, product_id: str) -> dict:
+        return self.docs.get(product_id)
+
+
+@lru_cache(maxsize=1)
+def get_keyword_index() -> KeywordIndex:
+    """Shared index instance (empty until scripts/ingest_root.py has built it)."""
+    index = KeywordIndex(settings.KEYWORD_INDEX_DIR)
+    index.load()
+    return index
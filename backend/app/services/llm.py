@@ -0,0 +1,338 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Optional
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from backend.app.core.config import settings
+from backend.app.services.concurrency import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Configure Gemini (once, for every service)
+genai.configure(api_key=settings.GOOGLE_API_KEY)
+
+# Lower runs first when calls queue for quota: interactive paths ahead of background jobs
+FEATURE_PRIORITY = {
+    "chat": 0,
+    "search": 0,
+    "compare": 1,
+    "eco": 1,
+    "price": 1,
+    "admin": 1,
+    "video": 2,
+    "admin_batch": 3,
+    "eco_batch": 3,
+}
+_DEFAULT_PRIORITY = 2
+
+_QUOTA_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+_RETRYABLE_ERRORS = _QUOTA_ERRORS + (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+
+class TokenBucket:
+    """
+    Process-wide request budget: `rate_per_minute` tokens refilled continuously,
+    up to `burst`. Async callers queue by priority; `pause()` stops all grants
+    for a while after the upstream reports quota exhaustion.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._waiters = [] # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._drainer: Optional[asyncio.Task] = None
+
+    def _take(self) -> float:
+        """Takes a token if one is available (returns 0), else returns seconds until one is."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, priority: int = _DEFAULT_PRIORITY):
+        with self._lock:
+            if not self._waiters and self._take() == 0:
+                return
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), future))
+            if self._drainer is None or self._drainer.done():
+                self._drainer = asyncio.ensure_future(self._drain())
+        await future
+
+    async def _drain(self):
+        # Grants tokens to queued callers, most urgent first, as they refill
+        while True:
+            with self._lock:
+                while self._waiters and self._waiters[0][2].done():
+                    heapq.heappop(self._waiters) # Caller was cancelled
+                if not self._waiters:
+                    return
+                wait = self._take()
+                if wait == 0:
+                    heapq.heappop(self._waiters)[2].set_result(None)
+                    continue
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self):
+        """Blocking acquire for threads. Queued async callers are served first, whatever their priority."""
+        while True:
+            with self._lock:
+                # A token taken now would jump the queue: give the drainer a refill to serve it first
+                wait = 1 / self.rate if self._waiters else self._take()
+            if wait == 0:
+                return
+            time.sleep(wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate_per_minute": round(self.rate * 60, 2),
+                "burst": self.burst,
+                "tokens": round(min(self.burst, self._tokens + (time.monotonic() - self._updated) * self.rate), 2),
+                "queued": len(self._waiters),
+                "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            }
+
+
+def _part_fingerprint(part) -> str:
+    # Non-JSON prompt parts: raw bytes by digest, uploaded files by name
+    if isinstance(part, (bytes, bytearray)):
+        return hashlib.sha256(part).hexdigest()
+    return getattr(part, "name", None) or repr(part)
+
+
+def _prompt_size(contents) -> int:
+    if isinstance(contents, str):
+        return len(contents)
+    if isinstance(contents, dict):
+        return sum(_prompt_size(value) for value in contents.values())
+    if isinstance(contents, (list, tuple)):
+        return sum(_prompt_size(part) for part in contents)
+    if isinstance(contents, (bytes, bytearray)):
+        return len(contents)
+    return 0
+
+
+class LLMClient:
+    """
+    Shared Gemini client used by every service.
+
+    Each call names its feature (e.g. "chat", "eco"). Calls wait for a token in
+    the process-wide bucket, ordered by FEATURE_PRIORITY. Quota and transient
+    errors are retried with exponential backoff, and a quota error pauses the
+    whole bucket so other callers back off too. Identical in-flight prompts
+    share one request. Latency and prompt/response sizes are tracked per feature.
+    """
+
+    def __init__(self, model_name: str, bucket: TokenBucket, max_retries: int,
+                 backoff_base: float, backoff_max: float):
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._sync_flight = SingleFlight()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, dict] = {}
+
+    # --- Accounting ---
+
+    def _feature_stats(self, feature: str) -> dict:
+        return self._stats.setdefault(feature, {
+            "calls": 0, "errors": 0, "retries": 0, "quota_errors": 0, "coalesced": 0,
+            "latency_ms_total": 0.0, "latency_ms_max": 0.0,
+            "prompt_chars": 0, "response_chars": 0, "prompt_tokens": 0, "response_tokens": 0,
+        })
+
+    def _count(self, feature: str, counter: str):
+        with self._stats_lock:
+            self._feature_stats(feature)[counter] += 1
+
+    def _record(self, feature: str, started: float, contents, response_text: str, usage=None):
+        latency_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            stats = self._feature_stats(feature)
+            stats["calls"] += 1
+            stats["latency_ms_total"] += latency_ms
+            stats["latency_ms_max"] = max(stats["latency_ms_max"], latency_ms)
+            stats["prompt_chars"] += _prompt_size(contents)
+            stats["response_chars"] += len(response_text)
+            if usage is not None:
+                stats["prompt_tokens"] += getattr(usage, "prompt_token_count", 0) or 0
+                stats["response_tokens"] += getattr(usage, "candidates_token_count", 0) or 0
+        logger.debug(f"LLM {feature}: {latency_ms:.0f} ms, {_prompt_size(contents)} prompt chars, {len(response_text)} response chars")
+
+    def _record_response(self, feature: str, started: float, contents, response):
+        try:
+            text = response.text
+        except ValueError:
+            text = "" # No text parts (e.g. blocked by safety filters)
+        self._record(feature, started, contents, text, getattr(response, "usage_metadata", None))
+
+    def _failure_delay(self, feature: str, attempt: int, error: Exception) -> Optional[float]:
+        """Backoff before the next attempt, or None if the error is final."""
+        self._count(feature, "errors")
+        if not isinstance(error, _RETRYABLE_ERRORS) or attempt >= self.max_retries:
+            return None
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if isinstance(error, _QUOTA_ERRORS):
+            self._count(feature, "quota_errors")
+            # Everyone backs off, not just this caller: avoids a burst of follow-up 429s
+            self.bucket.pause(delay)
+        self._count(feature, "retries")
+        logger.warning(f"LLM {feature} call failed ({type(error).__name__}), retrying in {delay:.1f}s")
+        return delay
+
+    # --- Calls ---
+
+    def _fingerprint(self, contents, generation_config) -> str:
+        payload = json.dumps([self.model_name, contents, generation_config], sort_keys=True, default=_part_fingerprint)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _call(self, feature: str, contents, generation_config):
+        for attempt in itertools.count():
+            self.bucket.acquire_sync()
+            started = time.perf_counter()
+            try:
+                response = self.model.generate_content(contents, generation_config=generation_config)
+            except Exception as e:
+                delay = self._failure_delay(feature, attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._record_response(feature, started, contents, response)
+            return response
+
+    async def _call_async(self, feature: str, contents, generation_config):
+        priority = FEATURE_PRIORITY.get(feature, _DEFAULT_PRIORITY)
+        for attempt in itertools.count():
+            await self.bucket.acquire(priority)
+            started = time.perf_counter()
+            try:
+                response = await self.model.generate_content_async(contents, generation_config=generation_config)
+            except Exception as e:
+                delay = self._failure_delay(feature, attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._record_response(feature, started, contents, response)
+            return response
+
+    def generate(self, feature: str, contents, generation_config: Optional[dict] = None, dedupe: bool = True):
+        """Blocking generate_content through the shared budget. Returns the Gemini response."""
+        if not dedupe:
+            return self._call(feature, contents, generation_config)
+        led = []
+
+        def call():
+            led.append(True)
+            return self._call(feature, contents, generation_config)
+
+        response = self._sync_flight.do(self._fingerprint(contents, generation_config), call)
+        if not led:
+            self._count(feature, "coalesced")
+        return response
+
+    async def generate_async(self, feature: str, contents, generation_config: Optional[dict] = None, dedupe: bool = True):
+        """generate_content_async through the shared budget. Returns the Gemini response."""
+        if not dedupe:
+            return await self._call_async(feature, contents, generation_config)
+
+        key = self._fingerprint(contents, generation_config)
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self._count(feature, "coalesced")
+        else:
+            pending = asyncio.ensure_future(self._call_async(feature, contents, generation_config))
+            self._in_flight[key] = pending
+            pending.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded: a caller that goes away does not cancel the call for the others
+        return await asyncio.shield(pending)
+
+    async def stream_async(self, feature: str, contents, generation_config: Optional[dict] = None) -> AsyncIterator:
+        """
+        Streaming generate_content_async through the shared budget; yields response chunks.
+        Only the initial request is retried: once chunks have been yielded, errors propagate.
+        """
+        priority = FEATURE_PRIORITY.get(feature, _DEFAULT_PRIORITY)
+        for attempt in itertools.count():
+            await self.bucket.acquire(priority)
+            started = time.perf_counter()
+            try:
+                response = await self.model.generate_content_async(contents, generation_config=generation_config, stream=True)
+                break
+            except Exception as e:
+                delay = self._failure_delay(feature, attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+        text = ""
+        try:
+            async for chunk in response:
+                try:
+                    text += chunk.text
+                except ValueError:
+                    pass
+                yield chunk
+        except Exception:
+            self._count(feature, "errors")
+            raise
+        self._record(feature, started, contents, text, getattr(response, "usage_metadata", None))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            features = {}
+            for feature, stats in self._stats.items():
+                features[feature] = {
+                    **stats,
+                    "latency_ms_total": round(stats["latency_ms_total"], 1),
+                    "latency_ms_max": round(stats["latency_ms_max"], 1),
+                    "latency_ms_avg": round(stats["latency_ms_total"] / stats["calls"], 1) if stats["calls"] else 0.0,
+                    "priority": FEATURE_PRIORITY.get(feature, _DEFAULT_PRIORITY),
+                }
+        return {"model": self.model_name, "budget": self.bucket.stats(), "features": features}
+
+
+@lru_cache(maxsize=1)
+def get_llm_client() -> LLMClient:
+    """Shared client, so every service draws from one request budget."""
+    return LLMClient(
+        settings.LLM_MODEL,
+        TokenBucket(settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_BURST),
+        max_retries=settings.LLM_MAX_RETRIES,
+        backoff_base=settings.LLM_BACKOFF_BASE_SECONDS,
+        backoff_max=settings.LLM_BACKOFF_MAX_SECONDS,
+    )
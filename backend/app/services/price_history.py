@@ -0,0 +1,245 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PRICE_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+# A daily price this far below the trailing week's mean counts as a drop
+_DROP_THRESHOLD = 0.05
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, punctuation-free, single-spaced product name."""
+    return _NON_WORD_RE.sub(" ", str(name).lower()).strip()
+
+
+def name_key(name: str) -> str:
+    # Series for products without a catalog id (e.g. SerpApi results) are keyed by name
+    return f"name:{normalize_name(name)}"
+
+
+def parse_price(value) -> Optional[float]:
+    """Float price from a number or a display string such as '₹1,299.00'."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _PRICE_RE.search(str(value or ""))
+    return float(match.group(0).replace(",", "")) if match else None
+
+
+class PriceHistory:
+    """
+    Observed prices per product, one point per price change.
+
+    Each series is two compact arrays (day ordinals as int32, prices as float32),
+    persisted in SQLite. A series is a step function: a price holds until the
+    next observation, so repeated sightings of an unchanged price cost nothing.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS price_history (
+                key TEXT NOT NULL,
+                day INTEGER NOT NULL,
+                price REAL NOT NULL,
+                source TEXT NOT NULL,
+                PRIMARY KEY (key, day)
+            )"""
+        )
+        self._conn.commit()
+        self._series: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute("SELECT key, day, price FROM price_history ORDER BY key, day").fetchall()
+        if not rows:
+            return
+        keys, days, prices = zip(*rows)
+        days = np.array(days, dtype=np.int32)
+        prices = np.array(prices, dtype=np.float32)
+        # Rows are sorted by key, so each series is one contiguous slice
+        starts = [0] + [i for i in range(1, len(keys)) if keys[i] != keys[i - 1]] + [len(keys)]
+        for start, end in zip(starts, starts[1:]):
+            self._series[keys[start]] = (days[start:end].copy(), prices[start:end].copy())
+        logger.info(f"Loaded price history for {len(self._series)} products ({len(rows)} points)")
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def _append(self, key: str, price: float, day: int) -> Optional[tuple]:
+        """Update the in-memory series; returns the row to persist, or None if nothing changed."""
+        days, prices = self._series.get(key, (None, None))
+        if days is not None and len(days):
+            if prices[-1] == np.float32(price):
+                return None
+            if day < days[-1]:
+                # Late observation for a day already superseded: history stays as recorded
+                return None
+            if days[-1] == day:
+                prices[-1] = price
+                return (key, day, price)
+            days = np.append(days, np.int32(day))
+            prices = np.append(prices, np.float32(price))
+        else:
+            days = np.array([day], dtype=np.int32)
+            prices = np.array([price], dtype=np.float32)
+        self._series[key] = (days, prices)
+        return (key, day, price)
+
+    def record(self, key: str, price: float, source: str, day: Optional[int] = None):
+        self.record_many([(key, price)], source, day)
+
+    def record_many(self, observations: Iterable[Tuple[str, float]], source: str, day: Optional[int] = None) -> int:
+        """Record (key, price) observations for `day` (default today). Returns the number of price changes."""
+        day = day or date.today().toordinal()
+        with self._lock:
+            rows = []
+            for key, price in observations:
+                if price is None or price <= 0:
+                    continue
+                row = self._append(key, float(price), day)
+                if row is not None:
+                    rows.append((*row, source))
+            if rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO price_history (key, day, price, source) VALUES (?, ?, ?, ?)", rows
+                )
+                self._conn.commit()
+        return len(rows)
+
+    def series(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            found = self._series.get(key)
+            return (found[0].copy(), found[1].copy()) if found else None
+
+
+def daily_prices(days: np.ndarray, prices: np.ndarray, today: int) -> np.ndarray:
+    """The step-function series resampled to one price per day, from the first observation to today."""
+    grid = np.arange(days[0], max(today, days[-1]) + 1, dtype=np.int32)
+    return prices[np.searchsorted(days, grid, side="right") - 1].astype(np.float64)
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    # Mean of each trailing window (values[i - window + 1 .. i]); shorter at the start
+    sums = np.cumsum(np.insert(values, 0, 0.0))
+    idx = np.arange(1, len(values) + 1)
+    lo = np.maximum(idx - window, 0)
+    return (sums[idx] - sums[lo]) / (idx - lo)
+
+
+def analyze(days: np.ndarray, prices: np.ndarray, current_price: float, today: Optional[int] = None) -> dict:
+    """
+    Rolling statistics, drop detection and seasonality for one price series.
+    `current_price` is the price being evaluated (usually the last observation).
+    """
+    today = today or date.today().toordinal()
+    daily = daily_prices(days, prices, today)
+    daily[-1] = current_price
+    span = len(daily)
+
+    last_30 = daily[-30:]
+    last_90 = daily[-90:]
+    median_30 = float(np.median(last_30))
+    rolling_7 = _rolling_mean(daily, 7)
+
+    # Trend: least-squares slope over the last 30 days, as % of the median per week
+    slope = 0.0
+    if len(last_30) >= 7:
+        x = np.arange(len(last_30)) - (len(last_30) - 1) / 2
+        slope = float(x @ (last_30 - last_30.mean()) / (x @ x)) * 7 / median_30 * 100
+
+    # Drops: first day of each run priced well below the mean of the week before
+    below = daily[1:] < rolling_7[:-1] * (1 - _DROP_THRESHOLD)
+    drop_days = np.flatnonzero(below & ~np.insert(below[:-1], 0, False)) + 1
+    drop_sizes = 1 - daily[drop_days] / rolling_7[drop_days - 1]
+
+    stats = {
+        "observations": int(len(days)),
+        "history_days": int(span),
+        "current": round(float(current_price), 2),
+        "median_30d": round(median_30, 2),
+        "mean_30d": round(float(last_30.mean()), 2),
+        "std_30d": round(float(last_30.std()), 2),
+        "min_90d": round(float(last_90.min()), 2),
+        "max_90d": round(float(last_90.max()), 2),
+        "vs_median_30d_pct": round((current_price / median_30 - 1) * 100, 1),
+        "trend_pct_per_week": round(slope, 2) + 0.0,
+        "drops": int(len(drop_days)),
+        "avg_drop_pct": round(float(drop_sizes.mean()) * 100, 1) if len(drop_days) else 0.0,
+        "days_since_drop": int(span - 1 - drop_days[-1]) if len(drop_days) else None,
+        "next_month_vs_avg_pct": None,
+    }
+
+    # Seasonality: average price per calendar month relative to the overall mean (needs ~a year of data)
+    if span >= 330:
+        epoch_days = np.arange(int(days[0]), int(days[0]) + span) - _EPOCH_ORDINAL
+        months = epoch_days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+        monthly = np.bincount(months, weights=daily, minlength=13) / np.maximum(np.bincount(months, minlength=13), 1)
+        next_month = date.fromordinal(today).month % 12 + 1
+        if monthly[next_month]:
+            stats["next_month_vs_avg_pct"] = round(float(monthly[next_month] / daily.mean() - 1) * 100, 1)
+
+    return stats
+
+
+def recommend(stats: dict) -> dict:
+    """BUY_NOW / WAIT recommendation from `analyze` stats, with a rule-based reason."""
+    evidence = min(stats["history_days"] / 90, 1.0)
+    vs_median = stats["vs_median_30d_pct"]
+    seasonal = stats["next_month_vs_avg_pct"]
+    trend = stats["trend_pct_per_week"]
+
+    if stats["current"] <= stats["min_90d"] * 1.01 < stats["max_90d"]:
+        recommendation, strength = "BUY_NOW", 0.9
+        reason = "Price is at its lowest in the last 90 days."
+        predicted = "Stable"
+    elif vs_median <= -5:
+        recommendation, strength = "BUY_NOW", 0.8
+        reason = f"Price is {abs(vs_median):.0f}% below its 30-day median."
+        predicted = "Stable"
+    elif seasonal is not None and seasonal <= -5:
+        recommendation, strength = "WAIT", 0.75
+        reason = f"Prices for this product usually run {abs(seasonal):.0f}% below average next month."
+        predicted = f"Likely {abs(seasonal):.0f}% drop next month"
+    elif trend <= -1:
+        recommendation, strength = "WAIT", 0.65
+        reason = f"Price has been falling about {abs(trend):.1f}% per week over the last month."
+        predicted = f"Likely {min(abs(trend) * 2, 30):.0f}% drop in 2 weeks"
+    elif vs_median >= 5:
+        recommendation, strength = "WAIT", 0.6
+        reason = f"Price is {vs_median:.0f}% above its 30-day median."
+        if stats["drops"]:
+            reason += f" It has dropped {stats['drops']} times before, by {stats['avg_drop_pct']:.0f}% on average."
+        predicted = f"Likely {min(vs_median, stats['avg_drop_pct'] or vs_median):.0f}% drop"
+    else:
+        recommendation, strength = "BUY_NOW", 0.5
+        reason = "Price is in line with its recent history."
+        predicted = "Stable"
+
+    return {
+        "recommendation": recommendation,
+        "confidence": int(round(20 + 75 * strength * evidence)),
+        "reason": reason,
+        "predicted_drop": predicted,
+    }
+
+
+@lru_cache(maxsize=1)
+def get_price_history() -> PriceHistory:
+    return PriceHistory(settings.PRICE_HISTORY_PATH)
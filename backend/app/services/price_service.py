@@ -1,57 +1,175 @@
+import asyncio
+import copy
 import logging
 import json
-from datetime import datetime
-import google.generativeai as genai
+import math
+from datetime import date, datetime
+from typing import List, Optional
 from backend.app.core.config import settings
+from backend.app.services.cache import TTLCache
+from backend.app.services.catalog_index import get_catalog_index
+from backend.app.services.concurrency import ServiceLimiter
+from backend.app.services.llm import get_llm_client
+from backend.app.services.price_history import analyze, get_price_history, name_key, normalize_name, recommend
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
-genai.configure(api_key=settings.GOOGLE_API_KEY)
-
 class PriceService:
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-flash-latest')
+        self.llm = get_llm_client()
+        self.limiter = ServiceLimiter("price", settings.PRICE_MAX_CONCURRENCY)
+        self.history = get_price_history()
+        self.catalog = get_catalog_index()
+        self.cache = TTLCache(settings.PRICE_CACHE_MAX_ENTRIES, settings.PRICE_CACHE_TTL_SECONDS)
 
-    def predict_price_trend(self, product_name: str, current_price: float, category: str = "") -> dict:
-        """
-        Analyzes market trends to predict price movement.
-        """
-        try:
-            today_date = datetime.now().strftime("%Y-%m-%d")
-            
-            prompt = f"""
+        # Today's catalog prices are observations too; only changes are stored
+        changed = self.history.record_many(
+            zip(self.catalog.ids, self.catalog.prices[:len(self.catalog)].tolist()), "catalog"
+        )
+        logger.info(f"Price history: {changed} catalog price changes recorded")
+        self.catalog.subscribe(self._on_catalog_change)
+
+    def _on_catalog_change(self, product_id: str):
+        product = self.catalog.get(product_id)
+        if product:
+            self.history.record(product_id, product["price"], "catalog")
+
+    def _build_prompt(self, product_name: str, category: str, result: dict) -> str:
+        today_date = datetime.now().strftime("%Y-%m-%d")
+
+        return f"""
             You are an expert Market Analyst AI.
-            Predict the short-term price trend for this product.
+            Explain this price recommendation to a shopper.
 
             Product: {product_name}
             Category: {category}
-            Current Price: {current_price}
             Date: {today_date}
+            Recommendation: {result["recommendation"]} ({result["predicted_drop"]})
+            Price statistics from our observed price history: {json.dumps(result["stats"])}
 
-            Analyze factors:
-            1. Seasonality (e.g., Electronics, Clothes).
-            2. Product Lifecycle (Is a new version coming?).
-            3. Upcoming Sales Events (Black Friday, Prime Day, Regional Festivals).
+            Base the explanation on the statistics; you may mention upcoming sales events
+            (Black Friday, Prime Day, Regional Festivals) if relevant to the date.
 
             Output strict JSON:
             {{
-                "recommendation": "BUY_NOW" or "WAIT",
-                "confidence": [0-100],
-                "reason": "Short explanation (max 2 sentences). If product is Indian or context implies India, use Hinglish/Indian context.",
-                "predicted_drop": "e.g., 'Likely 10% drop in 2 weeks' or 'Stable'"
+                "reason": "Short explanation (max 2 sentences). If product is Indian or context implies India, use Hinglish/Indian context."
             }}
             """
 
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-            result = json.loads(response.text)
-            return result
+    def _fallback(self) -> dict:
+        return {
+            "recommendation": "BUY_NOW", # Fallback to Buy
+            "confidence": 0,
+            "reason": "Could not analyze market data at this moment.",
+            "predicted_drop": "Unknown"
+        }
 
+    def _analyze(self, product_name: str, current_price: float, product_id: Optional[str]) -> dict:
+        # Catalog products are tracked by id; anything else (e.g. online results) by name
+        keys = ([str(product_id)] if product_id else []) + [name_key(product_name)]
+        series = next(filter(None, (self.history.series(key) for key in keys)), None)
+        if series is None or current_price <= 0:
+            return {**self._fallback(), "reason": "No price history recorded for this product yet.", "stats": None}
+
+        stats = analyze(*series, current_price)
+        return {**recommend(stats), "stats": stats}
+
+    def _predict(self, product_name: str, current_price: float, category: str,
+                 product_id: Optional[str], narrative: bool) -> dict:
+        try:
+            result = self._analyze(product_name, current_price, product_id)
         except Exception as e:
             logger.error(f"Price prediction failed: {e}")
-            return {
-                "recommendation": "BUY_NOW", # Fallback to Buy
-                "confidence": 0,
-                "reason": "Could not analyze market data at this moment.",
-                "predicted_drop": "Unknown"
-            }
+            return self._fallback()
+
+        if narrative and result["stats"]:
+            try:
+                prompt = self._build_prompt(product_name, category, result)
+                response = self.llm.generate("price", prompt, generation_config={"response_mime_type": "application/json"})
+                result["reason"] = json.loads(response.text)["reason"]
+            except Exception as e:
+                logger.error(f"Price narrative failed, keeping rule-based reason: {e}")
+        return result
+
+    async def _predict_async(self, product_name: str, current_price: float, category: str,
+                             product_id: Optional[str], narrative: bool) -> dict:
+        try:
+            # Pure NumPy over in-memory arrays: microseconds, no need to leave the event loop
+            result = self._analyze(product_name, current_price, product_id)
+        except Exception as e:
+            logger.error(f"Price prediction failed: {e}")
+            return self._fallback()
+
+        if narrative and result["stats"]:
+            try:
+                prompt = self._build_prompt(product_name, category, result)
+                async with self.limiter:
+                    response = await self.llm.generate_async("price", prompt, generation_config={"response_mime_type": "application/json"})
+                result["reason"] = json.loads(response.text)["reason"]
+            except Exception as e:
+                logger.error(f"Price narrative failed, keeping rule-based reason: {e}")
+        return result
+
+    def _cache_key(self, product_name: str, current_price: float, category: str,
+                   product_id: Optional[str], narrative: bool) -> tuple:
+        # One answer per product per day: prices within the same ~PRICE_CACHE_BUCKET_PCT band share it
+        bucket = round(math.log(current_price) / math.log1p(settings.PRICE_CACHE_BUCKET_PCT / 100)) if current_price > 0 else 0
+        return (
+            normalize_name(product_name), category.strip().lower(), bucket,
+            date.today().isoformat(), str(product_id or ""), narrative
+        )
+
+    def predict_price_trend(self, product_name: str, current_price: float, category: str = "",
+                            product_id: Optional[str] = None, narrative: bool = False) -> dict:
+        """
+        Price trend from the observed price history (rolling stats, drops, seasonality).
+        With narrative=True, Gemini rewrites the reason from those statistics.
+        Answers are cached per product, price bucket and day.
+        """
+        key = self._cache_key(product_name, current_price, category, product_id, narrative)
+        cached = self.cache.get(key)
+        if cached is not None:
+            # Callers (e.g. endpoints adding fields) must not edit the shared entry
+            return copy.deepcopy(cached)
+
+        result = self._predict(product_name, current_price, category, product_id, narrative)
+        # Products without history may gain some later today, so only real analyses are kept
+        if result.get("stats"):
+            self.cache.put(key, copy.deepcopy(result))
+        return result
+
+    async def predict_price_trend_async(self, product_name: str, current_price: float, category: str = "",
+                                        product_id: Optional[str] = None, narrative: bool = False) -> dict:
+        key = self._cache_key(product_name, current_price, category, product_id, narrative)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        result = await self._predict_async(product_name, current_price, category, product_id, narrative)
+        if result.get("stats"):
+            self.cache.put(key, copy.deepcopy(result))
+        return result
+
+    async def predict_price_trends_async(self, items: List[dict]) -> List[dict]:
+        """
+        Predictions for many products (e.g. a whole result grid), in input order.
+        Items sharing a cache key are resolved once; cache misses run concurrently.
+        Each item takes the predict_price_trend_async keyword arguments.
+        """
+        keys = [
+            self._cache_key(item["product_name"], item["current_price"], item.get("category", ""),
+                            item.get("product_id"), item.get("narrative", False))
+            for item in items
+        ]
+        unique = {}
+        for key, item in zip(keys, items):
+            unique.setdefault(key, item)
+
+        results = await asyncio.gather(*(self.predict_price_trend_async(**item) for item in unique.values()))
+        resolved = dict(zip(unique, results))
+        predictions, seen = [], set()
+        for key in keys:
+            # Repeated items get their own copy, like separate calls would
+            predictions.append(copy.deepcopy(resolved[key]) if key in seen else resolved[key])
+            seen.add(key)
+        return predictions
@@ -1,8 +1,18 @@
+import base64
 import logging
-import google.generativeai as genai
-from typing import List
+from typing import Dict, List, Optional
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from backend.app.core.config import settings
 from backend.app.services.vector_db import get_collection
 from backend.app.services.embeddings import get_embeddings_service
+from backend.app.services.ingestion import IngestManifest, product_documents
+from backend.app.services.keyword_index import get_keyword_index
+from backend.app.services.catalog_index import get_catalog_index
+from backend.app.services.concurrency import ServiceLimiter
+from backend.app.services.llm import get_llm_client
+from backend.app.services.image_cache import ImageDescriptionCache, perceptual_hash
+from backend.app.services.image_loader import get_image_loader
+from backend.app.services.visual_index import get_visual_index
 from backend.app.models.schema import Product
 
 logger = logging.getLogger(__name__)
@@ -11,110 +21,353 @@ class SearchService:
     def __init__(self):
         self.collection = get_collection()
         self.embedding_service = get_embeddings_service()
+        self.keyword_index = get_keyword_index()
+        self.catalog = get_catalog_index()
+        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+        self.llm = get_llm_client()
+        self.limiter = ServiceLimiter("search", settings.SEARCH_MAX_CONCURRENCY)
+        self.visual_index = get_visual_index()
+        self.images = get_image_loader()
+        self.image_cache = None
+        if settings.IMAGE_CACHE_ENABLED:
+            self.image_cache = ImageDescriptionCache(
+                settings.IMAGE_CACHE_PATH, settings.EMBEDDING_MODEL, settings.IMAGE_HASH_MAX_DISTANCE
+            )
+        self.vector_index = None
+        if settings.SEARCH_ENGINE == "numpy":
+            from backend.app.services.vector_index import get_vector_index
+            self.vector_index = get_vector_index()
+
+    def _make_product(self, product_id: str, fallback: dict, score: float) -> Product:
+        # Full details come from the in-memory catalog index (O(1) per hit);
+        # the search index's own fields are only a fallback for products it doesn't know yet.
+        details = self.catalog.get(product_id) or fallback
+        return Product(
+            id=product_id,
+            name=details.get("name", ""),
+            description=details.get("description", ""),
+            price=float(details.get("price") or 0.0),
+            image_url=details.get("image_url", ""),
+            link=details.get("link") or f"https://www.google.com/search?q={details.get('name', '')}", # Fallback to Google Search
+            category=details.get("category", ""),
+            score=score
+        )
+
+    def _to_product(self, metadata: dict, document: str, distance: float) -> Product:
+        return self._make_product(metadata["product_id"], {
+            "name": metadata["product_name"],
+            "description": document,
+            "price": metadata.get("price", 0.0),
+            "image_url": metadata.get("image_url", ""),
+            "link": metadata.get("link"),
+            "category": metadata.get("category", ""),
+        }, distance)
+
+    def _keyword_product(self, product_id: str, score: float) -> Product:
+        return self._make_product(product_id, self.keyword_index.get(product_id), score)
+
+    def _vector_search(self, query_embeddings: List[List[float]], limit: int) -> List[List[Product]]:
+        """Nearest descriptions for each query embedding, in a single vector query."""
+        # In-memory mirror answers without touching Chroma
+        if self.vector_index is not None:
+            return [
+                [self._to_product(metadata, document, distance) for _, document, metadata, distance in hits]
+                for hits in self.vector_index.query_many(query_embeddings, limit)
+            ]
+
+        # Query ChromaDB for descriptions
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=limit,
+            where={"type": "description"} # Filter by type
+        )
+
+        batch = []
+        for q in range(len(query_embeddings)):
+            products = []
+            if results["ids"] and q < len(results["ids"]):
+                for i in range(len(results["ids"][q])):
+                    products.append(self._to_product(
+                        results["metadatas"][q][i],
+                        results["documents"][q][i],
+                        results["distances"][q][i] if results["distances"] else 0.0
+                    ))
+            batch.append(products)
+        return batch
 
-    def search_products(self, query: str, limit: int = 5) -> List[Product]:
+    def _fuse(self, semantic: List[Product], keyword_hits: List[tuple], limit: int) -> List[Product]:
         """
-        Search for products by description using semantic search.
+        Reciprocal-rank fusion of the semantic and BM25 rankings.
+        The returned score is the fused RRF score (higher is better).
         """
+        fused = {}
+        products = {}
+        for rank, product in enumerate(semantic):
+            if product.id in products:
+                continue
+            products[product.id] = product
+            fused[product.id] = 1.0 / (settings.RRF_K + rank + 1)
+        for rank, (product_id, _) in enumerate(keyword_hits):
+            fused[product_id] = fused.get(product_id, 0.0) + 1.0 / (settings.RRF_K + rank + 1)
+            if product_id not in products:
+                products[product_id] = self._keyword_product(product_id, 0.0)
+
+        ranked = sorted(fused, key=fused.get, reverse=True)[:limit]
+        return [products[product_id].model_copy(update={"score": fused[product_id]}) for product_id in ranked]
+
+    def search_products(self, query: str, limit: int = 5, mode: Optional[str] = None,
+                        query_embedding: Optional[List[float]] = None) -> List[Product]:
+        """
+        Search for products by text.
+        mode: "semantic" (vectors only), "keyword" (BM25 only, no embedding call)
+        or "hybrid" (both, fused with reciprocal-rank fusion). Defaults to settings.SEARCH_MODE.
+        Product.score is the squared L2 distance in semantic mode (lower is better), the BM25
+        score in keyword mode and the RRF score in hybrid mode (both higher is better).
+        A precomputed `query_embedding` skips the embedding call.
+        """
+        mode = mode or settings.SEARCH_MODE
         try:
+            if mode == "keyword":
+                return [self._keyword_product(pid, score) for pid, score in self.keyword_index.search(query, limit)]
+
             # Generate embedding for the query
-            query_embedding = self.embedding_service.embed_query(query)
-            
-            # Query ChromaDB for descriptions
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=limit,
-                where={"type": "description"} # Filter by type
-            )
-            
-            products = []
-            if results["ids"]:
-                for i in range(len(results["ids"][0])):
-                    metadata = results["metadatas"][0][i]
-                    # In a real app, we might fetch full product details from a SQL DB here
-                    # For now, we reconstruct from what we have or just return basics
-                    # Since we don't store image_url in chroma metadata, we'll need to fetch it 
-                    # from our products.json or add it to metadata during ingest.
-                    # For MVP, let's just return what we have in metadata.
-                    
-                    products.append(Product(
-                        id=metadata["product_id"],
-                        name=metadata["product_name"],
-                        description=results["documents"][0][i],
-                        price=metadata.get("price", 0.0),
-                        image_url=metadata.get("image_url", ""),
-                        link=metadata.get("link", f"https://www.google.com/search?q={metadata['product_name']}"), # Fallback to Google Search
-                        score=results["distances"][0][i] if results["distances"] else 0.0
-                    ))
-            
-            return products
+            if query_embedding is None:
+                query_embedding = self.embedding_service.embed_query(query)
+            if mode == "semantic":
+                return self._vector_search([query_embedding], limit)[0]
+
+            depth = max(limit * 4, 20)
+            semantic = self._vector_search([query_embedding], depth)[0]
+            return self._fuse(semantic, self.keyword_index.search(query, depth), limit)
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
-            
-    def search_by_image(self, image_data: str, limit: int = 5) -> tuple[List[Product], str]:
+
+    def search_products_batch(self, queries: List[str], limit: int = 5, mode: Optional[str] = None) -> List[List[Product]]:
+        """
+        Run many searches at once: one batched embedding call and one vector query.
+        """
+        if not queries:
+            return []
+        mode = mode or settings.SEARCH_MODE
+        try:
+            if mode == "keyword":
+                return [
+                    [self._keyword_product(pid, score) for pid, score in self.keyword_index.search(query, limit)]
+                    for query in queries
+                ]
+
+            query_embeddings = self.embedding_service.embed_documents(queries, task_type="retrieval_query")
+            if mode == "semantic":
+                return self._vector_search(query_embeddings, limit)
+
+            depth = max(limit * 4, 20)
+            return [
+                self._fuse(semantic, self.keyword_index.search(query, depth), limit)
+                for query, semantic in zip(queries, self._vector_search(query_embeddings, depth))
+            ]
+        except Exception as e:
+            logger.error(f"Batch search failed: {e}")
+            return [[] for _ in queries]
+
+    _IMAGE_PROMPT = "Describe this product in detail so I can find similar items. Focus on category, color, material, and key features. Return a single paragraph description."
+
+    def _image_part(self, image_data: str) -> dict:
+        # Create the image part (assuming standard base64 from frontend)
+        # We need to clean the base64 string if it has headers
+        if "base64," in image_data:
+            image_data = image_data.split("base64,")[1]
+
+        return {
+            "mime_type": "image/jpeg",
+            "data": image_data
+        }
+
+    def _model_image_part(self, image_part: dict) -> dict:
+        # Downscaled copy for the vision model; hashing and visual search keep the original
+        return self.images.part(base64.b64decode(image_part["data"]), image_part["mime_type"])
+
+    def _image_hash(self, image_b64: str) -> Optional[int]:
+        if self.image_cache is None:
+            return None
+        try:
+            return perceptual_hash(base64.b64decode(image_b64))
+        except Exception as e:
+            logger.warning(f"Could not hash image, skipping description cache: {e}")
+            return None
+
+    def _visual_search(self, image_b64: str, limit: int) -> List[Product]:
+        """Rank catalog items by local image similarity. Score is cosine similarity (higher is better)."""
+        return [
+            self._make_product(fields["id"], fields, similarity)
+            for fields, similarity in self.visual_index.search(base64.b64decode(image_b64), limit)
+        ]
+
+    def search_by_image(self, image_data: str, limit: int = 5, mode: Optional[str] = None) -> tuple[List[Product], Optional[str]]:
         """
-        Search using the description generated from an image.
-        Returns: (List[Products], generated_description)
+        Search by image.
+        mode: "visual" ranks catalog items by local image similarity with no model calls;
+        "semantic" describes the image with Gemini and searches by that description
+        (repeat or near-duplicate images reuse the cached description and embedding).
+        Defaults to settings.IMAGE_SEARCH_MODE; visual falls back to semantic while the index is empty.
+        Returns: (List[Products], generated_description or None in visual mode)
         """
+        mode = mode or settings.IMAGE_SEARCH_MODE
         try:
-            # Generate description using Gemini
-            model = genai.GenerativeModel('gemini-flash-latest')
-            
-            # Simple prompt
-            prompt = "Describe this product in detail so I can find similar items. Focus on category, color, material, and key features. Return a single paragraph description."
-            
-            # Create the image part (assuming standard base64 from frontend)
-            # We need to clean the base64 string if it has headers
-            if "base64," in image_data:
-                image_data = image_data.split("base64,")[1]
-                
-            image_part = {
-                "mime_type": "image/jpeg", 
-                "data": image_data
-            }
-            
-            response = model.generate_content([prompt, image_part])
-            description = response.text
-            
+            if mode == "visual" and len(self.visual_index):
+                return self._visual_search(self._image_part(image_data)["data"], limit), None
+
+            image_part = self._image_part(image_data)
+            phash = self._image_hash(image_part["data"])
+            cached = self.image_cache.get(phash) if phash is not None else None
+
+            if cached:
+                description, embedding = cached
+                logger.info("Image description served from perceptual-hash cache")
+            else:
+                # Generate description using Gemini
+                response = self.llm.generate("search", [self._IMAGE_PROMPT, self._model_image_part(image_part)])
+                description = response.text
+                embedding = self.embedding_service.embed_query(description)
+                if phash is not None:
+                    self.image_cache.put(phash, description, embedding)
+
             logger.info(f"Generated Image Description: {description}")
-            
+
             # Search using the description
-            return self.search_products(description, limit), description
-            
+            return self.search_products(description, limit, query_embedding=embedding), description
+
         except Exception as e:
             logger.error(f"Image search failed: {e}")
             return [], "Error analyzing image."
+
+    # --- Async API (non-blocking for the event loop) ---
+
+    async def search_products_async(self, query: str, limit: int = 5, mode: Optional[str] = None) -> List[Product]:
+        return await self.limiter.run(self.search_products, query, limit, mode)
+
+    async def search_products_batch_async(self, queries: List[str], limit: int = 5, mode: Optional[str] = None) -> List[List[Product]]:
+        return await self.limiter.run(self.search_products_batch, queries, limit, mode)
+
+    async def search_by_image_async(self, image_data: str, limit: int = 5, mode: Optional[str] = None) -> tuple[List[Product], Optional[str]]:
+        mode = mode or settings.IMAGE_SEARCH_MODE
+        try:
+            if mode == "visual" and len(self.visual_index):
+                return await self.limiter.run(self._visual_search, self._image_part(image_data)["data"], limit), None
+
+            image_part = self._image_part(image_data)
+            phash = await self.limiter.run(self._image_hash, image_part["data"])
+            cached = await self.limiter.run(self.image_cache.get, phash) if phash is not None else None
+
+            if cached:
+                description, embedding = cached
+                logger.info("Image description served from perceptual-hash cache")
+            else:
+                model_part = await self.limiter.run(self._model_image_part, image_part)
+                async with self.limiter:
+                    response = await self.llm.generate_async("search", [self._IMAGE_PROMPT, model_part])
+                description = response.text
+                embedding = await self.limiter.run(self.embedding_service.embed_query, description)
+                if phash is not None:
+                    await self.limiter.run(self.image_cache.put, phash, description, embedding)
+
+            logger.info(f"Generated Image Description: {description}")
+
+            return await self.limiter.run(self.search_products, description, limit, None, embedding), description
+
+        except Exception as e:
+            logger.error(f"Image search failed: {e}")
+            return [], "Error analyzing image."
+
+    async def index_product_async(self, product: dict):
+        return await self.limiter.run(self.index_product, product)
+
+    async def index_products_async(self, products: List[dict]) -> Dict[str, str]:
+        return await self.limiter.run(self.index_products, products)
+
+    def _existing_documents(self, product_ids: List) -> Dict[str, object]:
+        """{doc_id: product_id} of every document already in Chroma for these products."""
+        existing = {}
+        for start in range(0, len(product_ids), settings.INGEST_BATCH_SIZE):
+            chunk = product_ids[start:start + settings.INGEST_BATCH_SIZE]
+            found = self.collection.get(where={"product_id": {"$in": chunk}}, include=["metadatas"])
+            for doc_id, metadata in zip(found["ids"], found["metadatas"]):
+                existing[doc_id] = metadata.get("product_id")
+        return existing
+
+    def index_products(self, products: List[dict]) -> Dict[str, str]:
+        """
+        Bulk counterpart of index_product: description and manual chunks (same ids and
+        metadata as ingestion) are embedded in large embed_documents batches and
+        upserted to ChromaDB in chunked calls. Chunks left over from a previous version
+        of a product (e.g. a longer manual) are deleted, and everything written is
+        journaled into the ingest manifest so the next ingest run agrees with it.
+        Returns: {product_id: error} for products that could not be indexed.
+        """
+        documents = [doc for product in products for doc in product_documents(product, self.text_splitter)]
+        errors = {}
+        try:
+            existing = self._existing_documents(list({product["id"]: None for product in products}))
+        except Exception as e:
+            logger.warning(f"Could not look up existing documents, stale chunks are kept: {e}")
+            existing = {}
+
+        batch_size = settings.INGEST_BATCH_SIZE
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            ids = [doc_id for doc_id, _, _ in batch]
+            texts = [text for _, text, _ in batch]
+            metadatas = [metadata for _, _, metadata in batch]
+            try:
+                embeddings = self.embedding_service.embed_documents(texts)
+                self.collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=texts)
+            except Exception as e:
+                logger.error(f"Bulk indexing batch failed: {e}")
+                for metadata in metadatas:
+                    errors[metadata["product_id"]] = str(e)
+                continue
+
+            # Keep the in-memory mirror in sync with Chroma (it only holds descriptions)
+            if self.vector_index is not None:
+                for doc_id, text, metadata, embedding in zip(ids, texts, metadatas, embeddings):
+                    if metadata["type"] == "description":
+                        self.vector_index.upsert(doc_id, embedding, metadata, text)
+
+        indexed = [doc for doc in documents if doc[2]["product_id"] not in errors]
+        new_ids = {doc_id for doc_id, _, _ in documents}
+        stale = [doc_id for doc_id, product_id in existing.items()
+                 if doc_id not in new_ids and product_id not in errors]
+        if stale:
+            try:
+                self.collection.delete(ids=stale)
+            except Exception as e:
+                logger.error(f"Deleting {len(stale)} stale chunks failed: {e}")
+                stale = []
+        try:
+            IngestManifest(settings.INGEST_MANIFEST_PATH).journal(indexed, stale)
+        except OSError as e:
+            # Only costs a re-embed of these documents on the next ingest run
+            logger.warning(f"Could not journal indexed documents to the ingest manifest: {e}")
+
+        for product in products:
+            if product["id"] not in errors:
+                self.keyword_index.add(product)
+
+        logger.info(f"Bulk indexed {len(products) - len(errors)} products ({len(documents)} documents)")
+        return errors
+
     def index_product(self, product: dict):
         """
         Add a single product to the ChromaDB index immediately.
+        Indexes exactly what ingestion would (description and manual chunks, document
+        embeddings), so a product added by an admin ranks the same after a re-ingest.
         """
         try:
-            # Generate embedding
-            text_to_embed = f"{product['name']} - {product['description']} - {product['category']}"
-            embedding = self.embedding_service.embed_query(text_to_embed)
-            
-            # Prepare metadata (flat dict)
-            # Ensure all values are strings, ints, or floats
-            metadata = {
-                "product_id": product['id'],
-                "product_name": product['name'],
-                "price": float(product['price']),
-                "image_url": product['image_url'],
-                "link": product.get("link", "#"),
-                "category": product.get("category", ""),
-                "type": "description"
-            }
-            
-            # Add to collection
-            self.collection.add(
-                ids=[product['id']],
-                embeddings=[embedding],
-                metadatas=[metadata],
-                documents=[product['description']]
-            )
-            logger.info(f"Indexed product: {product['name']}")
-            return True
+            errors = self.index_products([product])
         except Exception as e:
-            logger.error(f"Indexing failed: {e}")
+            errors = {product.get("id"): str(e)}
+        if errors:
+            logger.error(f"Indexing failed: {next(iter(errors.values()))}")
             return False
+        logger.info(f"Indexed product: {product['name']}")
+        return True
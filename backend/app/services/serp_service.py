@@ -1,41 +1,166 @@
-from serpapi import GoogleSearch
+import json
+import logging
+import os
+import time
+import zlib
+from functools import lru_cache
+from typing import Dict, List
 from backend.app.core.config import settings
+from backend.app.services.cache import TTLCache
+from backend.app.services.concurrency import SingleFlight
+from backend.app.services.price_history import get_price_history, name_key, parse_price
+
+logger = logging.getLogger(__name__)
+
+
+class SerpApiBackend:
+    """Google Shopping via SerpApi (spends API quota)."""
+
+    name = "serpapi"
+    live = True # Results are real market prices worth recording
+
+    def search(self, query: str) -> List[dict]:
+        from serpapi import GoogleSearch
+
+        params = {
+            "engine": "google_shopping",
+            "q": query,
+            "google_domain": "google.co.in",
+            "gl": "in",
+            "hl": "en",
+            "api_key": settings.SERPAPI_KEY
+        }
+        results = GoogleSearch(params).get_dict()
+        if "error" in results:
+            raise RuntimeError(results["error"])
+        return results.get("shopping_results", [])
+
+
+class FixtureBackend:
+    """
+    Local stand-in for SerpApi, for load tests and offline development.
+
+    Reads `{query: [shopping_results items]}` from a JSON fixture; queries not in
+    the fixture get the items sharing the most words with the query. Without a
+    fixture file, items are synthesised from the catalog. `latency_ms` simulates
+    the upstream round trip.
+    """
+
+    name = "fixture"
+    live = False
+
+    def __init__(self, path: str, latency_ms: float = 0):
+        self.latency_ms = latency_ms
+        self.queries: Dict[str, List[dict]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.queries = {normalize_query(q): items for q, items in json.load(f).items()}
+            self.items = [item for items in self.queries.values() for item in items]
+        else:
+            logger.warning(f"No SerpApi fixture at {path}; serving catalog products instead")
+            self.items = self._catalog_items()
+
+    def _catalog_items(self, limit: int = 500) -> List[dict]:
+        from backend.app.services.catalog_store import get_catalog_store
+
+        items = []
+        for product in get_catalog_store().iter_products():
+            items.append({
+                "title": product.get("name"),
+                "price": f"₹{float(product.get('price') or 0):,.2f}",
+                "thumbnail": product.get("image_url"),
+                "link": product.get("link"),
+                "source": "Fixture",
+            })
+            if len(items) >= limit:
+                break
+        return items
+
+    def search(self, query: str) -> List[dict]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        query = normalize_query(query)
+        if query in self.queries:
+            return self.queries[query]
+
+        words = set(query.split())
+        scored = [(len(words & set(str(item.get("title", "")).lower().split())), i) for i, item in enumerate(self.items)]
+        matches = [self.items[i] for score, i in sorted(scored, key=lambda s: (-s[0], s[1])) if score]
+        if matches or not self.items:
+            return matches[:10]
+        # Deterministic filler so every query returns something
+        start = zlib.crc32(query.encode("utf-8")) % len(self.items)
+        return (self.items[start:] + self.items[:start])[:5]
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+@lru_cache(maxsize=1)
+def get_serp_backend():
+    if settings.SERP_BACKEND == "fixture":
+        return FixtureBackend(settings.SERP_FIXTURE_PATH, settings.SERP_FIXTURE_LATENCY_MS)
+    return SerpApiBackend()
+
+
+_cache = TTLCache(settings.SERP_CACHE_MAX_ENTRIES, settings.SERP_CACHE_TTL_SECONDS)
+_in_flight = SingleFlight()
+
+
+def _fetch(query: str) -> List[dict]:
+    # A leader that lost the race to a just-finished call must not spend quota on the same query.
+    # This is the lookup that counts the miss: only a leader about to call upstream gets here with one.
+    cached = _cache.get(normalize_query(query))
+    if cached is not None:
+        return cached
+
+    backend = get_serp_backend()
+    shopping_results = backend.search(query)
+
+    cleaned_products = []
+    for item in shopping_results[:5]: # Top 5 items
+        product = {
+            "title": item.get("title"),
+            "price": item.get("price"),
+            "image": item.get("thumbnail"),
+            "link": item.get("link"),
+            "source": item.get("source")
+        }
+        cleaned_products.append(product)
+
+    # Every online sighting is a price observation for the trend analytics
+    if backend.live:
+        get_price_history().record_many(
+            ((name_key(p["title"]), parse_price(p["price"])) for p in cleaned_products if p["title"]),
+            "serpapi"
+        )
+
+    _cache.put(normalize_query(query), cleaned_products)
+    return cleaned_products
+
 
 def search_products_online(query: str):
     """
     Searches Google Shopping via SerpApi for the query and returns top results.
+    Results are cached per normalized query, and concurrent identical queries
+    share one upstream call.
     """
-    if not settings.SERPAPI_KEY:
-        print("❌ SERPAPI_KEY is missing.")
+    if settings.SERP_BACKEND == "serpapi" and not settings.SERPAPI_KEY:
+        logger.warning("SERPAPI_KEY is missing.")
         return []
 
-    params = {
-        "engine": "google_shopping",
-        "q": query,
-        "google_domain": "google.co.in", 
-        "gl": "in",
-        "hl": "en",
-        "api_key": settings.SERPAPI_KEY
-    }
+    key = normalize_query(query)
+    cached = _cache.get(key, count_miss=False)
+    if cached is not None:
+        return cached
 
     try:
-        search = GoogleSearch(params)
-        results = search.get_dict()
-        
-        shopping_results = results.get("shopping_results", [])
-        
-        cleaned_products = []
-        for item in shopping_results[:5]: # Top 5 items
-            product = {
-                "title": item.get("title"),
-                "price": item.get("price"),
-                "image": item.get("thumbnail"),
-                "link": item.get("link"),
-                "source": item.get("source")
-            }
-            cleaned_products.append(product)
-            
-        return cleaned_products
+        return _in_flight.do(key, _fetch, query)
     except Exception as e:
-        print(f"❌ Error querying SerpApi: {e}")
+        logger.error(f"Error querying SerpApi: {e}")
         return []
+
+
+def serp_stats() -> dict:
+    return {"backend": settings.SERP_BACKEND, "coalesced": _in_flight.coalesced, **_cache.stats()}
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import re
+import string
+from typing import Iterable, List
+
+from backend.app.services.price_history import parse_price
+
+# Bump when the extraction rules change so ingest re-enriches existing products
+SPECS_VERSION = 1
+
+_MATERIALS = (
+    "cotton", "polyester", "leather", "denim", "wool", "silk", "linen", "nylon", "rubber",
+    "plastic", "metal", "steel", "stainless steel", "aluminium", "aluminum", "gold", "silver",
+    "brass", "copper", "glass", "wood", "bamboo", "ceramic", "canvas", "suede", "viscose",
+)
+_COLORS = (
+    "black", "white", "blue", "navy blue", "red", "green", "olive", "yellow", "orange", "pink",
+    "purple", "brown", "grey", "gray", "silver", "gold", "beige", "maroon", "cream", "multi",
+)
+
+_FASHION_DESC_RE = re.compile(r"^(?P<gender>\w+) (?P<master>[\w ]+?) - (?P<sub>[\w ]+?) \((?P<article>[^)]+)\)")
+_AMAZON_DESC_RE = re.compile(r"^High quality (?P<category>.+?) from Amazon", re.IGNORECASE)
+_COLOR_RE = re.compile(r"(\w+(?: \w+)?) colou?r", re.IGNORECASE)
+_USAGE_RE = re.compile(r"(\w+) usage", re.IGNORECASE)
+_MATERIAL_LINE_RE = re.compile(r"Material:\s*([^\n.]+)", re.IGNORECASE)
+_RATING_RE = re.compile(r"(\d+(?:\.\d+)?) Star Rating", re.IGNORECASE)
+_SIZE_RE = re.compile(
+    r"\b(\d+(?:\.\d+)?\s?(?:ml|l|kg|g|cm|mm|inch|in|gb|tb|mah|w))\b|\bSize (\w{1,4})\b|\bPack of (\d+)\b",
+    re.IGNORECASE
+)
+
+
+# Product fields the specs are derived from; a change to any of them triggers re-extraction
+_SOURCE_FIELDS = ("name", "description", "manual_text", "price", "category", "material", "features")
+
+
+def _source_hash(product: dict) -> str:
+    source = json.dumps({field: product.get(field) for field in _SOURCE_FIELDS}, sort_keys=True, default=str)
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+def _find_terms(text: str, terms: Iterable[str]) -> List[str]:
+    lowered = text.lower()
+    found = []
+    for term in terms:
+        if re.search(rf"\b{re.escape(term)}\b", lowered) and not any(term in f for f in found):
+            found.append(term)
+    return found
+
+
+def extract_specs(product: dict) -> dict:
+    """
+    Structured attributes of a product, extracted with local rules (no model call)
+    from its name, description, manual text and any admin-entered fields.
+    """
+    name = str(product.get("name", ""))
+    description = str(product.get("description", ""))
+    manual_text = str(product.get("manual_text", ""))
+
+    category = product.get("category") or ""
+    features: List[str] = []
+    gender = None
+
+    fashion = _FASHION_DESC_RE.match(description)
+    if fashion:
+        category = category or fashion.group("article").strip()
+        gender = fashion.group("gender")
+    else:
+        amazon = _AMAZON_DESC_RE.match(description)
+        if amazon:
+            category = category or string.capwords(amazon.group("category").strip())
+
+    # Materials: admin field first, then an explicit "Material:" line, then known material words
+    materials = []
+    if product.get("material"):
+        materials.append(str(product["material"]))
+    else:
+        line = _MATERIAL_LINE_RE.search(manual_text)
+        if line:
+            materials.append(line.group(1).strip())
+    materials += [m.title() for m in _find_terms(f"{name}. {description}", _MATERIALS)
+                  if not any(m in existing.lower() for existing in materials)]
+
+    color = None
+    color_match = _COLOR_RE.search(description)
+    if color_match:
+        color = color_match.group(1).title()
+    else:
+        colors = _find_terms(name, _COLORS)
+        color = colors[0].title() if colors else None
+
+    rating = None
+    rating_match = _RATING_RE.search(manual_text)
+    if rating_match:
+        rating = float(rating_match.group(1))
+
+    # Key features: admin-entered list, then sizes/quantities, usage and audience
+    if isinstance(product.get("features"), list):
+        features += [str(f) for f in product["features"]]
+    for match in _SIZE_RE.finditer(name):
+        size, letter_size, pack = match.groups()
+        if size:
+            features.append(size.replace(" ", ""))
+        elif letter_size:
+            features.append(f"Size {letter_size}")
+        elif pack:
+            features.append(f"Pack of {pack}")
+    usage = _USAGE_RE.search(description)
+    if usage and usage.group(1).lower() != "nan":
+        features.append(f"{usage.group(1).title()} use")
+    if gender:
+        features.append(gender)
+    if color:
+        features.append(color)
+
+    return {
+        "version": SPECS_VERSION,
+        "source_hash": _source_hash(product),
+        # Online results carry display strings such as "₹1,299.00"
+        "price": parse_price(product.get("price")) or 0.0,
+        "category": category,
+        "materials": materials[:3],
+        "color": color,
+        "rating": rating,
+        "key_features": list(dict.fromkeys(features))[:5],
+    }
+
+
+def needs_specs(product: dict) -> bool:
+    specs = product.get("specs")
+    return (
+        not isinstance(specs, dict)
+        or specs.get("version") != SPECS_VERSION
+        or specs.get("source_hash") != _source_hash(product)
+    )
+
+
+def with_specs(product: dict) -> dict:
+    """The product with up-to-date `specs` attached (unchanged when already current)."""
+    if not needs_specs(product):
+        return product
+    return {**product, "specs": extract_specs(product)}
+
+
+def get_specs(product: dict) -> dict:
+    """Stored specs when current, otherwise extracted on the fly (e.g. external products)."""
+    return product["specs"] if not needs_specs(product) else extract_specs(product)
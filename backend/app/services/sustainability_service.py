@@ -1,57 +1,37 @@
 import logging
 import json
-import os
-import requests
-from PIL import Image
-from io import BytesIO
-from pathlib import Path
-import google.generativeai as genai
+from typing import Optional
 from backend.app.core.config import settings
+from backend.app.services.concurrency import RateLimiter, ServiceLimiter, run_blocking
+from backend.app.services.eco_store import EcoScoreStore, eco_content_hash
+from backend.app.services.image_loader import get_image_loader
+from backend.app.services.llm import get_llm_client
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
-genai.configure(api_key=settings.GOOGLE_API_KEY)
-
 class SustainabilityService:
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-flash-latest')
+        self.llm = get_llm_client()
+        self.limiter = ServiceLimiter("eco", settings.ECO_MAX_CONCURRENCY)
+        self.store = EcoScoreStore(settings.ECO_SCORE_DB_PATH)
+        self.images = get_image_loader()
 
-    def _load_image(self, image_url: str):
-        """Loads image from local path or URL."""
-        try:
-            # Local Path (e.g., /static/images/...)
-            if image_url.startswith("/static"):
-                # Assuming backend run from project root
-                relative_path = image_url.lstrip("/")
-                full_path = Path(os.getcwd()) / "backend" / relative_path
-                return Image.open(full_path)
-            
-            # External URL
-            elif image_url.startswith("http"):
-                response = requests.get(image_url)
-                return Image.open(BytesIO(response.content))
-            
-            return None
-        except Exception as e:
-            logger.error(f"Image load failed: {e}")
-            return None
+    def _fallback(self) -> dict:
+        return {
+            "score": 50,
+            "label": "Unknown",
+            "color": "gray",
+            "reason": "Could not analyze sustainability data.",
+            "visual_audit": "Image analysis failed.",
+            "greenwashing_flag": False,
+            "metrics": {"carbon_footprint": "?", "water_usage": "?", "recyclability": "?"},
+            "pros": [],
+            "cons": [],
+            "tips": "Check local recycling guidelines."
+        }
 
-    def calculate_eco_score(self, product_name: str, category: str, description: str, image_url: str = None) -> dict:
-        """
-        Multimodal Sustainability Audit.
-        """
-        try:
-            inputs = []
-            
-            # Add Image if available
-            if image_url:
-                img = self._load_image(image_url)
-                if img:
-                    inputs.append(img)
-                    logger.info("Image added to Eco-Audit.")
-
-            prompt = f"""
+    def _build_prompt(self, product_name: str, category: str, description: str) -> str:
+        return f"""
             You are an expert Environmental Scientist & Sustainability Auditor.
             Conduct a rigorous MULTIMODAL AUDIT of this product.
             
@@ -85,22 +65,96 @@ class SustainabilityService:
                 "tips": "1 actionable tip for disposal or better choice."
             }}
             """
-            inputs.append(prompt)
 
-            response = self.model.generate_content(inputs, generation_config={"response_mime_type": "application/json"})
-            return json.loads(response.text)
+    def _load_image(self, image_url: Optional[str]) -> Optional[bytes]:
+        # Downscaled bytes, served from the local image cache when the origin says they are unchanged
+        return self.images.fetch(image_url) if image_url else None
+
+    def _model_inputs(self, product_name: str, category: str, description: str, image: Optional[bytes]) -> list:
+        inputs = []
+        if image:
+            inputs.append(self.images.prepared_part(image))
+            logger.info("Image added to Eco-Audit.")
+        inputs.append(self._build_prompt(product_name, category, description))
+        return inputs
+
+    def _audit(self, product_name: str, category: str, description: str, image: Optional[bytes] = None) -> dict:
+        inputs = self._model_inputs(product_name, category, description, image)
+        response = self.llm.generate("eco", inputs, generation_config={"response_mime_type": "application/json"})
+        return json.loads(response.text)
+
+    async def _audit_async(self, product_name: str, category: str, description: str, image: Optional[bytes] = None,
+                           feature: str = "eco") -> dict:
+        inputs = self._model_inputs(product_name, category, description, image)
+        async with self.limiter:
+            response = await self.llm.generate_async(feature, inputs, generation_config={"response_mime_type": "application/json"})
+        return json.loads(response.text)
+
+    def calculate_eco_score(self, product_name: str, category: str, description: str, image_url: str = None,
+                            product_id: str = None) -> dict:
+        """
+        Multimodal Sustainability Audit.
+        Served from the persistent store when this product's content, image included, was already audited.
+        """
+        image = self._load_image(image_url)
+        content_hash = eco_content_hash(product_name, category, description, image_url, image)
+        cached = self.store.get(product_id, content_hash)
+        if cached is not None:
+            return cached
+
+        try:
+            result = self._audit(product_name, category, description, image)
+            self.store.put(product_id, content_hash, result)
+            return result
+
+        except Exception as e:
+            logger.error(f"Eco-score calculation failed: {e}")
+            return self._fallback()
+
+    async def calculate_eco_score_async(self, product_name: str, category: str, description: str, image_url: str = None,
+                                        product_id: str = None, feature: str = "eco") -> dict:
+        # Image download/decoding is blocking: keep it off the event loop
+        image = await self.limiter.run(self._load_image, image_url)
+        content_hash = eco_content_hash(product_name, category, description, image_url, image)
+        cached = await run_blocking(self.store.get, product_id, content_hash)
+        if cached is not None:
+            return cached
+
+        try:
+            result = await self._audit_async(product_name, category, description, image, feature)
+            await run_blocking(self.store.put, product_id, content_hash, result)
+            return result
 
         except Exception as e:
             logger.error(f"Eco-score calculation failed: {e}")
-            return {
-                "score": 50,
-                "label": "Unknown",
-                "color": "gray",
-                "reason": "Could not analyze sustainability data.",
-                "visual_audit": "Image analysis failed.",
-                "greenwashing_flag": False,
-                "metrics": {"carbon_footprint": "?", "water_usage": "?", "recyclability": "?"},
-                "pros": [],
-                "cons": [],
-                "tips": "Check local recycling guidelines."
-            }
+            return self._fallback()
+
+    @staticmethod
+    def audit_inputs(product: dict) -> tuple:
+        """(name, category, description, image_url) as /api/eco-score derives them for a catalog product."""
+        return (
+            product.get("name", ""),
+            product.get("category") or "General",
+            product.get("description", ""),
+            product.get("image_url") or None,
+        )
+
+    async def refresh_async(self, product: dict, force: bool = False, feature: str = "eco_batch",
+                            rate: Optional[RateLimiter] = None) -> Optional[dict]:
+        """
+        Audit a catalog product and store the result (e.g. for batch precomputation).
+        Returns None without a model call when the stored score is still current, unless forced;
+        `rate` only spaces out the model calls, not these checks.
+        Unlike calculate_eco_score_async, a failed audit raises instead of returning the fallback.
+        """
+        name, category, description, image_url = self.audit_inputs(product)
+        image = await self.limiter.run(self._load_image, image_url)
+        content_hash = eco_content_hash(name, category, description, image_url, image)
+        if not force and await run_blocking(self.store.contains, product["id"], content_hash):
+            return None
+
+        if rate is not None:
+            await rate.wait()
+        result = await self._audit_async(name, category, description, image, feature=feature)
+        await run_blocking(self.store.put, product["id"], content_hash, result)
+        return result
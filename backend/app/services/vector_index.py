@@ -0,0 +1,285 @@
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_VECTORS_FILE = "vectors.npy"
+_META_FILE = "meta.json"
+_DELTA_FILE = "delta.jsonl"
+
+# Metadata fields kept as parallel columns (all other Chroma metadata is dropped)
+_COLUMNS = ("product_id", "product_name", "image_url", "link", "category")
+
+
+class NumpyVectorIndex:
+    """
+    In-memory mirror of the product description vectors stored in Chroma.
+
+    Vectors live in one contiguous float32 matrix memory-mapped from a `.npy`
+    snapshot, with product metadata in parallel arrays, so a top-k query is a
+    single matrix-vector product plus `argpartition`. Writes made after the
+    snapshot go to an in-memory append buffer and an on-disk delta log that is
+    replayed on load and folded into the next snapshot.
+
+    Distances are squared L2, matching Chroma's default space, so scores are
+    comparable between the two engines.
+    """
+
+    def __init__(self, snapshot_dir: str, compact_after: int = 1000):
+        self.snapshot_dir = snapshot_dir
+        self.compact_after = compact_after
+        self._lock = threading.RLock()
+        self._reset(np.zeros((0, 0), dtype=np.float32))
+
+    def _reset(self, matrix: np.ndarray):
+        self._base = matrix
+        self._base_norms = np.einsum("ij,ij->i", matrix, matrix) if len(matrix) else np.zeros(0, dtype=np.float32)
+        self._extra = np.zeros((0, matrix.shape[1] if matrix.ndim == 2 else 0), dtype=np.float32)
+        self._extra_norms = np.zeros(0, dtype=np.float32)
+        self._extra_count = 0
+        self._alive = np.ones(len(matrix), dtype=bool)
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.columns = {name: [] for name in _COLUMNS}
+        self.prices = np.zeros(len(matrix), dtype=np.float32)
+        self._row_of = {}
+        self._delta_count = 0
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    @property
+    def dim(self) -> int:
+        return self._base.shape[1] if self._base.ndim == 2 else 0
+
+    # --- Persistence ---
+
+    def load(self) -> bool:
+        """Load the snapshot (memory-mapped) and replay the delta log. Returns False if no snapshot exists."""
+        vectors_path = os.path.join(self.snapshot_dir, _VECTORS_FILE)
+        meta_path = os.path.join(self.snapshot_dir, _META_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(meta_path)):
+            return False
+
+        with self._lock:
+            matrix = np.load(vectors_path, mmap_mode="r")
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+
+            self._reset(matrix)
+            self.ids = meta["ids"]
+            self.documents = meta["documents"]
+            self.columns = {name: meta["columns"][name] for name in _COLUMNS}
+            self.prices = np.asarray(meta["prices"], dtype=np.float32)
+            self._row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+
+            delta_path = os.path.join(self.snapshot_dir, _DELTA_FILE)
+            if os.path.exists(delta_path):
+                with open(delta_path, "r") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._upsert(entry["id"], entry["embedding"], entry["metadata"], entry["document"])
+                            self._delta_count += 1
+
+        logger.info(f"Loaded vector index snapshot with {len(self)} vectors ({self._delta_count} from delta log)")
+        return True
+
+    def save(self):
+        """Write a compacted snapshot (dead rows dropped) and truncate the delta log."""
+        with self._lock:
+            rows = np.flatnonzero(self._alive_mask())
+            matrix = np.ascontiguousarray(self._all_vectors()[rows], dtype=np.float32)
+            meta = {
+                "ids": [self.ids[i] for i in rows],
+                "documents": [self.documents[i] for i in rows],
+                "columns": {name: [values[i] for i in rows] for name, values in self.columns.items()},
+                "prices": self.prices[rows].tolist(),
+            }
+
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            # Write to temp files first so a crash never leaves a half-written snapshot
+            vectors_path = os.path.join(self.snapshot_dir, _VECTORS_FILE)
+            meta_path = os.path.join(self.snapshot_dir, _META_FILE)
+            with open(vectors_path + ".tmp", "wb") as f:
+                np.save(f, matrix)
+            with open(meta_path + ".tmp", "w") as f:
+                json.dump(meta, f)
+            os.replace(vectors_path + ".tmp", vectors_path)
+            os.replace(meta_path + ".tmp", meta_path)
+
+            delta_path = os.path.join(self.snapshot_dir, _DELTA_FILE)
+            if os.path.exists(delta_path):
+                os.remove(delta_path)
+
+            self.load()
+
+    def rebuild_from_collection(self, collection, page_size: int = 5000):
+        """Rebuild the mirror from every description vector in the Chroma collection."""
+        ids, embeddings, metadatas, documents = [], [], [], []
+        offset = 0
+        while True:
+            page = collection.get(
+                where={"type": "description"},
+                include=["embeddings", "documents", "metadatas"],
+                limit=page_size,
+                offset=offset
+            )
+            if not page["ids"]:
+                break
+            ids.extend(page["ids"])
+            embeddings.extend(page["embeddings"])
+            metadatas.extend(page["metadatas"])
+            documents.extend(page["documents"])
+            offset += len(page["ids"])
+
+        with self._lock:
+            self._reset(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1) if ids else np.zeros((0, 0), dtype=np.float32))
+            self.ids = list(ids)
+            self.documents = [document or "" for document in documents]
+            self.columns = {name: [str(meta.get(name, "")) for meta in metadatas] for name in _COLUMNS}
+            self.prices = np.asarray([meta.get("price", 0.0) or 0.0 for meta in metadatas], dtype=np.float32)
+            self._row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+            self.save()
+        logger.info(f"Rebuilt vector index from Chroma with {len(self)} vectors")
+
+    # --- Writes ---
+
+    def upsert(self, doc_id: str, embedding: List[float], metadata: dict, document: str):
+        """Add or replace one vector, keeping the mirror in sync with a Chroma write."""
+        with self._lock:
+            self._upsert(doc_id, embedding, metadata, document)
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            with open(os.path.join(self.snapshot_dir, _DELTA_FILE), "a") as f:
+                f.write(json.dumps({
+                    "id": doc_id,
+                    "embedding": [float(x) for x in embedding],
+                    "metadata": metadata,
+                    "document": document
+                }) + "\n")
+            self._delta_count += 1
+            if self._delta_count >= self.compact_after:
+                self.save()
+
+    def _upsert(self, doc_id: str, embedding: List[float], metadata: dict, document: str):
+        vector = np.asarray(embedding, dtype=np.float32)
+        if self._extra.shape[1] != vector.shape[0]:
+            if len(self):
+                raise ValueError(f"Embedding dimension {vector.shape[0]} does not match index dimension {self._extra.shape[1]}")
+            self._extra = np.zeros((0, vector.shape[0]), dtype=np.float32)
+            if self._base.shape[0] == 0:
+                self._base = np.zeros((0, vector.shape[0]), dtype=np.float32)
+
+        old_row = self._row_of.get(doc_id)
+        if old_row is not None:
+            self._alive[old_row] = False
+
+        # Grow the append buffer geometrically so repeated adds stay amortised O(1)
+        if self._extra_count == len(self._extra):
+            capacity = max(64, 2 * len(self._extra))
+            grown = np.zeros((capacity, self._extra.shape[1]), dtype=np.float32)
+            grown[:self._extra_count] = self._extra[:self._extra_count]
+            grown_norms = np.zeros(capacity, dtype=np.float32)
+            grown_norms[:self._extra_count] = self._extra_norms[:self._extra_count]
+            self._extra, self._extra_norms = grown, grown_norms
+
+        self._extra[self._extra_count] = vector
+        self._extra_norms[self._extra_count] = float(vector @ vector)
+        self._extra_count += 1
+
+        row = len(self.ids)
+        if row == len(self._alive):
+            capacity = max(64, 2 * row)
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:row] = self._alive[:row]
+            prices = np.zeros(capacity, dtype=np.float32)
+            prices[:row] = self.prices[:row]
+            self._alive, self.prices = alive, prices
+
+        self.ids.append(doc_id)
+        self.documents.append(document or "")
+        for name in _COLUMNS:
+            self.columns[name].append(str(metadata.get(name, "")))
+        self.prices[row] = metadata.get("price", 0.0) or 0.0
+        self._alive[row] = True
+        self._row_of[doc_id] = row
+
+    # --- Reads ---
+
+    def _all_vectors(self) -> np.ndarray:
+        if self._extra_count == 0:
+            return self._base
+        return np.vstack([self._base, self._extra[:self._extra_count]])
+
+    def _alive_mask(self) -> np.ndarray:
+        return self._alive[:len(self.ids)]
+
+    @staticmethod
+    def _row_metadata(columns: dict, prices: np.ndarray, row: int) -> dict:
+        meta = {name: values[row] for name, values in columns.items()}
+        meta["price"] = float(prices[row])
+        meta["type"] = "description"
+        return meta
+
+    def metadata(self, row: int) -> dict:
+        with self._lock:
+            return self._row_metadata(self.columns, self.prices, row)
+
+    def query(self, embedding: List[float], k: int = 5) -> List[Tuple[str, str, dict, float]]:
+        """
+        Top-k nearest descriptions by squared L2 distance.
+        Returns: [(doc_id, document, metadata, distance)]
+        """
+        return self.query_many([embedding], k)[0]
+
+    def query_many(self, embeddings: List[List[float]], k: int = 5) -> List[List[Tuple[str, str, dict, float]]]:
+        """Batched top-k: one matrix-matrix product for all queries."""
+        with self._lock:
+            base, base_norms = self._base, self._base_norms
+            extra, extra_norms, extra_count = self._extra, self._extra_norms, self._extra_count
+            alive = self._alive_mask().copy()
+            # Rows are only ever appended, and save()/load() swap in new containers rather
+            # than mutating these, so the references stay consistent with the vectors above
+            ids, documents, columns, prices = self.ids, self.documents, self.columns, self.prices
+
+        if k < 1 or not alive.any() or not embeddings:
+            return [[] for _ in embeddings]
+
+        queries = np.asarray(embeddings, dtype=np.float32)
+        # ||m - q||^2 = ||m||^2 - 2 m.q + ||q||^2
+        scores = np.empty((len(queries), len(alive)), dtype=np.float32)
+        n_base = len(base)
+        if n_base:
+            scores[:, :n_base] = base_norms - 2.0 * (queries @ base.T)
+        if extra_count:
+            scores[:, n_base:] = extra_norms[:extra_count] - 2.0 * (queries @ extra[:extra_count].T)
+        scores += np.einsum("ij,ij->i", queries, queries)[:, None]
+        scores[:, ~alive] = np.inf
+
+        k = min(k, int(alive.sum()))
+        top = np.argpartition(scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        top = np.take_along_axis(top, np.argsort(top_scores, axis=1), axis=1)
+
+        return [
+            [(ids[row], documents[row], self._row_metadata(columns, prices, row), float(scores[i, row])) for row in rows]
+            for i, rows in enumerate(top)
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_vector_index() -> NumpyVectorIndex:
+    """Shared index instance, built from Chroma on first use if no snapshot exists yet."""
+    index = NumpyVectorIndex(settings.VECTOR_INDEX_DIR)
+    if not index.load():
+        from backend.app.services.vector_db import get_collection
+        index.rebuild_from_collection(get_collection())
+    return index
@@ -1,54 +1,38 @@
+import asyncio
 import logging
 import os
 import time
-import shutil
+import uuid
 from pathlib import Path
+from typing import Dict, Optional
 import google.generativeai as genai
 from fastapi import UploadFile
 from backend.app.core.config import settings
+from backend.app.models.schema import VideoJob
+from backend.app.services.concurrency import run_blocking
+from backend.app.services.llm import get_llm_client
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
-genai.configure(api_key=settings.GOOGLE_API_KEY)
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
 
 class VideoService:
+    """
+    Video diagnosis as background jobs: uploads are streamed to a uniquely
+    named temp file, a job id is returned immediately, and the Gemini
+    upload/processing/analysis runs as an asyncio task polled without blocking.
+    """
+
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-flash-latest')
+        self.llm = get_llm_client()
         self.upload_dir = Path("temp_videos")
         self.upload_dir.mkdir(exist_ok=True)
+        self.jobs: Dict[str, VideoJob] = {}
+        self._job_slots = asyncio.Semaphore(settings.VIDEO_MAX_CONCURRENT_JOBS)
+        self._tasks = set()
 
-    async def analyze_video(self, file: UploadFile, context: str = "") -> str:
-        """
-        Uploads video to Gemini and asks for a diagnosis.
-        """
-        temp_file_path = self.upload_dir / file.filename
-        
-        try:
-            # 1. Save locally
-            with open(temp_file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            logger.info(f"Saved video locally to {temp_file_path}")
-
-            # 2. Upload to Gemini
-            logger.info("Uploading to Gemini...")
-            video_file = genai.upload_file(path=temp_file_path)
-            logger.info(f"Upload complete: {video_file.name}")
-
-            # 3. Wait for processing
-            while video_file.state.name == "PROCESSING":
-                logger.info("Waiting for video processing...")
-                time.sleep(2)
-                video_file = genai.get_file(video_file.name)
-
-            if video_file.state.name == "FAILED":
-                raise ValueError("Video processing failed by Gemini.")
-
-            logger.info("Video is active. Generating content...")
-
-            # 4. Generate Advanced Diagnosis
-            prompt = f"""
+    def _build_prompt(self, context: str) -> str:
+        return f"""
             You are "Deep Seek", an advanced AI Technical Diagnostic Agent.
             Analyze this video footage of a malfunctioning product frame-by-frame.
             
@@ -92,17 +76,95 @@ class VideoService:
             - Else, default to English.
             """
 
-            response = self.model.generate_content([video_file, prompt])
-            
-            # Clean up Gemini file (optional, but good practice)
-            # genai.delete_file(video_file.name) 
-            
-            return response.text
+    def _update(self, job: VideoJob, status: str, progress: int):
+        job.status = status
+        job.progress = progress
+        job.updated_at = time.time()
+
+    def _prune_jobs(self):
+        """Forget finished jobs older than VIDEO_JOB_TTL_SECONDS."""
+        cutoff = time.time() - settings.VIDEO_JOB_TTL_SECONDS
+        for job_id, job in list(self.jobs.items()):
+            if job.status in ("completed", "failed") and job.updated_at < cutoff:
+                del self.jobs[job_id]
+
+    async def submit_job(self, file: UploadFile, context: str = "") -> VideoJob:
+        """
+        Streams the upload to disk and schedules the analysis. Returns immediately.
+        """
+        self._prune_jobs()
+
+        job_id = uuid.uuid4().hex
+        # Unique name per job, so concurrent uploads of "video.mp4" never collide
+        temp_file_path = self.upload_dir / f"{job_id}{Path(file.filename or '').suffix.lower()}"
+        max_bytes = settings.VIDEO_MAX_UPLOAD_MB * 1024 * 1024
 
-        except Exception as e:
-            logger.error(f"Video analysis failed: {e}")
-            return f"❌ Analysis Failed: {str(e)}"
-        finally:
-            # Cleanup local file
+        size = 0
+        try:
+            with open(temp_file_path, "wb") as buffer:
+                while chunk := await file.read(_UPLOAD_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"Video exceeds the {settings.VIDEO_MAX_UPLOAD_MB} MB upload limit.")
+                    await run_blocking(buffer.write, chunk)
+        except Exception:
             if temp_file_path.exists():
                 os.remove(temp_file_path)
+            raise
+
+        logger.info(f"Saved video locally to {temp_file_path} ({size} bytes)")
+
+        now = time.time()
+        job = VideoJob(job_id=job_id, filename=file.filename or "", created_at=now, updated_at=now)
+        self.jobs[job_id] = job
+
+        task = asyncio.create_task(self._run_job(job, temp_file_path, context))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[VideoJob]:
+        return self.jobs.get(job_id)
+
+    async def _run_job(self, job: VideoJob, temp_file_path: Path, context: str):
+        # Queued jobs wait here until one of the VIDEO_MAX_CONCURRENT_JOBS slots frees up
+        async with self._job_slots:
+            try:
+                # 1. Upload to Gemini
+                self._update(job, "uploading", 10)
+                logger.info(f"[{job.job_id}] Uploading to Gemini...")
+                video_file = await run_blocking(genai.upload_file, path=temp_file_path)
+                logger.info(f"[{job.job_id}] Upload complete: {video_file.name}")
+
+                # 2. Wait for processing without blocking the event loop
+                self._update(job, "processing", 30)
+                deadline = time.monotonic() + settings.VIDEO_PROCESSING_TIMEOUT_SECONDS
+                while video_file.state.name == "PROCESSING":
+                    if time.monotonic() > deadline:
+                        raise TimeoutError("Video processing timed out.")
+                    await asyncio.sleep(settings.VIDEO_POLL_INTERVAL_SECONDS)
+                    video_file = await run_blocking(genai.get_file, video_file.name)
+                    self._update(job, "processing", min(job.progress + 5, 70))
+
+                if video_file.state.name == "FAILED":
+                    raise ValueError("Video processing failed by Gemini.")
+
+                # 3. Generate Advanced Diagnosis
+                self._update(job, "analyzing", 80)
+                logger.info(f"[{job.job_id}] Video is active. Generating content...")
+                response = await self.llm.generate_async("video", [video_file, self._build_prompt(context)], dedupe=False)
+
+                # Clean up Gemini file (optional, but good practice)
+                # genai.delete_file(video_file.name)
+
+                job.result = response.text
+                self._update(job, "completed", 100)
+
+            except Exception as e:
+                logger.error(f"[{job.job_id}] Video analysis failed: {e}")
+                job.error = str(e)
+                self._update(job, "failed", 100)
+            finally:
+                # Cleanup local file
+                if temp_file_path.exists():
+                    os.remove(temp_file_path)
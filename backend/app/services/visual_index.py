@@ -0,0 +1,166 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_STATIC_ROOT = os.path.join("backend", "static")
+
+# Relative weight of each feature block in the final cosine similarity
+_COLOR_WEIGHT = 0.5
+_LAYOUT_WEIGHT = 0.3
+_HASH_WEIGHT = 0.2
+
+
+def resolve_static_path(image_url: str) -> Optional[str]:
+    """Map a catalog image URL served from /static (absolute or relative) to its file under backend/static."""
+    if not image_url or "/static/" not in image_url:
+        return None
+    relative = image_url.split("/static/", 1)[1]
+    return os.path.join(_STATIC_ROOT, *relative.split("/"))
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def image_features(img: Image.Image) -> np.ndarray:
+    """
+    CPU-only visual descriptor: HSV colour histogram, 16x16 grayscale layout
+    and a 64-bit difference hash, each L2-normalised and weighted so the dot
+    product of two descriptors is a blended cosine similarity.
+    """
+    rgb = img.convert("RGB")
+
+    # Colour: 12 hue x 3 saturation x 3 value bins, square-rooted (Hellinger) so dominant colours don't swamp the rest
+    hsv = np.asarray(rgb.resize((64, 64)).convert("HSV"), dtype=np.uint16)
+    bins = (hsv[..., 0] * 12 // 256) * 9 + (hsv[..., 1] * 3 // 256) * 3 + (hsv[..., 2] * 3 // 256)
+    color = np.sqrt(np.bincount(bins.ravel(), minlength=108).astype(np.float32))
+
+    # Layout: downscaled grayscale pixels, mean-centred
+    gray = np.asarray(rgb.convert("L").resize((16, 16)), dtype=np.float32).ravel()
+    layout = gray - gray.mean()
+
+    # Structure: dHash bits as +/-1
+    small = np.asarray(rgb.convert("L").resize((9, 8)), dtype=np.int16)
+    hash_bits = np.where(small[:, 1:] > small[:, :-1], 1.0, -1.0).astype(np.float32).ravel()
+
+    return np.concatenate([
+        np.sqrt(_COLOR_WEIGHT) * _normalize(color),
+        np.sqrt(_LAYOUT_WEIGHT) * _normalize(layout),
+        np.sqrt(_HASH_WEIGHT) * _normalize(hash_bits),
+    ]).astype(np.float32)
+
+
+class VisualIndex:
+    """
+    Image-similarity index over local catalog images, built at ingest time.
+    Ranks catalog items directly against an uploaded photo without any model call.
+    """
+
+    _FIELDS = ("ids", "names", "descriptions", "image_urls", "links", "categories")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.prices = np.zeros(0, dtype=np.float32)
+        self.columns = {field: [] for field in self._FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.columns["ids"])
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with np.load(self.path, allow_pickle=False) as data:
+            with self._lock:
+                self.vectors = data["vectors"]
+                self.prices = data["prices"]
+                self.columns = {field: data[field].tolist() for field in self._FIELDS}
+        logger.info(f"Loaded visual index with {len(self)} images")
+        return True
+
+    def build(self, products: Iterable[dict], workers: int = 8):
+        """Extract features for every product with a local image and write the index file."""
+        products = [p for p in products if resolve_static_path(p.get("image_url", ""))]
+
+        def extract(product):
+            path = resolve_static_path(product["image_url"])
+            try:
+                with Image.open(path) as img:
+                    return product, image_features(img)
+            except Exception as e:
+                logger.warning(f"Skipping image for {product.get('id')}: {e}")
+                return product, None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            extracted = [(p, v) for p, v in pool.map(extract, products) if v is not None]
+
+        with self._lock:
+            self.vectors = np.stack([v for _, v in extracted]) if extracted else np.zeros((0, 0), dtype=np.float32)
+            self.prices = np.asarray([float(p.get("price") or 0.0) for p, _ in extracted], dtype=np.float32)
+            self.columns = {
+                "ids": [str(p["id"]) for p, _ in extracted],
+                "names": [p.get("name", "") for p, _ in extracted],
+                "descriptions": [p.get("description", "") for p, _ in extracted],
+                "image_urls": [p.get("image_url", "") for p, _ in extracted],
+                "links": [p.get("link", "") for p, _ in extracted],
+                "categories": [p.get("category", "") for p, _ in extracted],
+            }
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path, vectors=self.vectors, prices=self.prices,
+                 **{field: np.asarray(values, dtype=str) for field, values in self.columns.items()})
+        os.replace(tmp_path, self.path)
+        logger.info(f"Built visual index with {len(self)} images")
+
+    def search(self, image_bytes: bytes, limit: int = 5) -> List[Tuple[dict, float]]:
+        """
+        Catalog items most similar to the image.
+        Returns: [(product_fields, cosine_similarity)] best first.
+        """
+        with self._lock:
+            vectors, prices, columns = self.vectors, self.prices, self.columns
+        if not len(vectors):
+            return []
+
+        with Image.open(BytesIO(image_bytes)) as img:
+            query = image_features(img)
+
+        similarities = vectors @ query
+        k = min(limit, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+
+        return [
+            ({
+                "id": columns["ids"][row],
+                "name": columns["names"][row],
+                "description": columns["descriptions"][row],
+                "image_url": columns["image_urls"][row],
+                "link": columns["links"][row],
+                "category": columns["categories"][row],
+                "price": float(prices[row]),
+            }, float(similarities[row]))
+            for row in top
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_visual_index() -> VisualIndex:
+    """Shared index instance (empty until scripts/ingest_root.py has built it)."""
+    index = VisualIndex(settings.VISUAL_INDEX_PATH)
+    index.load()
+    return index
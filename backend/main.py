@@ -1,4 +1,4 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from backend.app.api import endpoints
@@ -27,16 +27,46 @@ def read_root():
 from backend.app.services.video_service import VideoService
 video_service = VideoService()
 
-@app.post("/api/analyze-video")
+@app.post("/api/analyze-video", status_code=202)
 async def analyze_video(file: UploadFile = File(...), context: str = Form("")):
     """
-    Analyze uploaded video for diagnostics.
+    Submit an uploaded video for diagnostics. Returns a job id to poll.
     """
-    return {"analysis": await video_service.analyze_video(file, context)}
+    try:
+        job = await video_service.submit_job(file, context)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"job_id": job.job_id, "status": job.status}
+
+@app.get("/api/analyze-video/{job_id}")
+async def video_job_status(job_id: str):
+    """
+    Progress of a video diagnosis job.
+    """
+    job = video_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    return job.model_dump(exclude={"result"})
+
+@app.get("/api/analyze-video/{job_id}/result")
+async def video_job_result(job_id: str):
+    """
+    Diagnosis report of a finished video job.
+    """
+    job = video_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    if job.status == "failed":
+        return {"status": job.status, "analysis": f"❌ Analysis Failed: {job.error}"}
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is still {job.status}.")
+    return {"status": job.status, "analysis": job.result}
 
 # --- Price Prediction Endpoint ---
 from backend.app.services.price_service import PriceService
 from pydantic import BaseModel
+from typing import List, Optional
+from backend.app.core.config import settings
 
 price_service = PriceService()
 
@@ -44,13 +74,31 @@ class PriceRequest(BaseModel):
     product_name: str
     current_price: float
     category: str = ""
+    product_id: Optional[str] = None
+    narrative: bool = False # Ask Gemini to word the reason (slower)
 
 @app.post("/api/predict-price")
 async def predict_price(request: PriceRequest):
     """
-    Predict price trend for a product.
+    Predict price trend for a product from its observed price history.
+    """
+    return await price_service.predict_price_trend_async(
+        request.product_name, request.current_price, request.category,
+        product_id=request.product_id, narrative=request.narrative
+    )
+
+class PriceBatchRequest(BaseModel):
+    items: List[PriceRequest]
+
+@app.post("/api/predict-price/batch")
+async def predict_price_batch(request: PriceBatchRequest):
+    """
+    Predict price trends for a whole result grid in one request (same order as `items`).
     """
-    return price_service.predict_price_trend(request.product_name, request.current_price, request.category)
+    if len(request.items) > settings.PRICE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.PRICE_BATCH_MAX_ITEMS} items per batch.")
+    predictions = await price_service.predict_price_trends_async([item.model_dump() for item in request.items])
+    return {"predictions": predictions}
 
 if __name__ == "__main__":
     import uvicorn
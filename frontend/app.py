@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import base64
+import time
 
 # --- Page Config ---
 st.set_page_config(
@@ -12,11 +13,14 @@ st.set_page_config(
 
 # --- Constants & State ---
 API_URL = "https://shopai-backend-i1za.onrender.com/api" # Remote Backend
+VIDEO_POLL_TIMEOUT_SECONDS = 900 # Upload + processing + analysis; the backend gives up on processing after 10 min
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
 if "search_results" not in st.session_state:
     st.session_state.search_results = []
+if "price_predictions" not in st.session_state:
+    st.session_state.price_predictions = {}
 
 # --- Custom CSS ---
 def load_css():
@@ -29,23 +33,62 @@ load_css()
 
 # --- Components ---
 
+def iter_sse_events(response):
+    """Parse a streaming requests.Response of Server-Sent Events into (event, data) pairs."""
+    import json
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+def parse_card_price(raw_price):
+    # Handle price parsing (could be string or float)
+    if isinstance(raw_price, str):
+        try: return float(raw_price.replace('₹', '').replace(',', '').strip())
+        except: return 0.0
+    return float(raw_price)
+
+def card_key(product):
+    # Generate unique key for buttons
+    return product.get('id') or str(abs(hash(product.get('link', '#'))))[:10]
+
+def price_payload(product):
+    return {
+        "product_name": product.get('name') or product.get('title', 'Product'),
+        "current_price": parse_card_price(product.get('price', 0)),
+        "category": product.get("category", "General"),
+        "product_id": product.get("id")
+    }
+
+def prefetch_price_predictions(products):
+    """One batch request for the whole grid; cards then show their prediction without a round trip."""
+    missing = [p for p in products if card_key(p) not in st.session_state.price_predictions]
+    if not missing:
+        return
+    try:
+        resp = requests.post(f"{API_URL}/predict-price/batch", json={"items": [price_payload(p) for p in missing]})
+        if resp.status_code == 200:
+            for product, prediction in zip(missing, resp.json()["predictions"]):
+                st.session_state.price_predictions[card_key(product)] = prediction
+    except Exception:
+        pass # Cards fall back to a single request on click
+
 def render_product_card(product):
     # Normalize product data for both internal and external sources
     p_name = product.get('name') or product.get('title', 'Product')
     p_img = product.get('image_url') or product.get('image', '')
-    raw_price = product.get('price', 0)
-    
-    # Handle price parsing (could be string or float)
-    if isinstance(raw_price, str):
-        try: p_price = float(raw_price.replace('₹', '').replace(',', '').strip())
-        except: p_price = 0.0
-    else:
-        p_price = float(raw_price)
-        
+    p_price = parse_card_price(product.get('price', 0))
     p_desc = product.get('description') or product.get('source', '')
     p_link = product.get('link', '#')
-    # Generate unique key for buttons
-    p_id = product.get('id') or str(abs(hash(p_link)))[:10]
+    p_id = card_key(product)
 
     st.markdown(f"""
     <div class="product-card">
@@ -67,14 +110,12 @@ def render_product_card(product):
         if st.button("📉", key=f"trend_{p_id}", help="AI Price Prediction"):
              with st.spinner("Analyzing Market..."):
                  try:
-                     payload = {
-                         "product_name": p_name,
-                         "current_price": p_price,
-                         "category": product.get("category", "General")
-                     }
-                     resp = requests.post(f"{API_URL}/predict-price", json=payload)
-                     if resp.status_code == 200:
-                         data = resp.json()
+                     data = st.session_state.price_predictions.get(p_id)
+                     if data is None:
+                         resp = requests.post(f"{API_URL}/predict-price", json=price_payload(product))
+                         if resp.status_code == 200:
+                             data = st.session_state.price_predictions[p_id] = resp.json()
+                     if data is not None:
                          rec = data.get("recommendation")
                          confidence = data.get("confidence")
                          reason = data.get("reason")
@@ -87,7 +128,7 @@ def render_product_card(product):
 
     with m3:
          if st.button("🌱", key=f"eco_{p_id}", help="View Eco-Score & Audit"):
-             temp_p = {"name": p_name, "category": product.get("category", "General"), "description": p_desc, "image_url": p_img}
+             temp_p = {"id": product.get("id"), "name": p_name, "category": product.get("category", "General"), "description": p_desc, "image_url": p_img}
              get_eco_score(temp_p)
     
     st.markdown('</div>', unsafe_allow_html=True)
@@ -98,12 +139,16 @@ def get_eco_score(product):
     st.caption(f"Analyzing {product['name']}...")
     with st.spinner("Auditing Materials & Lifecycle..."):
         try:
-             payload = {
-                 "product_name": product['name'],
-                 "category": product.get("category", "General"),
-                 "description": product.get("description", ""),
-                 "image_url": product.get("image_url") 
-             }
+             # Catalog products are looked up by id server-side; external ones send their details
+             if product.get("id"):
+                 payload = {"product_id": product["id"]}
+             else:
+                 payload = {
+                     "product_name": product['name'],
+                     "category": product.get("category", "General"),
+                     "description": product.get("description", ""),
+                     "image_url": product.get("image_url")
+                 }
              resp = requests.post(f"{API_URL}/eco-score", json=payload)
              if resp.status_code == 200:
                  data = resp.json()
@@ -212,7 +257,59 @@ if app_mode == "🔐 Admin Panel":
     st.title("🔐 Admin Dashboard")
     st.markdown("Upload a raw product image, and **ShopAI Vision** will automatically generate the catalog entry.")
     
-    uploaded_file = st.file_uploader("Upload Product Image", type=["jpg", "jpeg", "png"])
+    uploaded_files = st.file_uploader(
+        "Upload Product Image(s)", type=["jpg", "jpeg", "png", "zip"], accept_multiple_files=True,
+        help="Upload one image to edit it by hand, or several images / a zip of a photo shoot to catalog them in bulk."
+    )
+    is_batch = len(uploaded_files) > 1 or any(f.name.lower().endswith(".zip") for f in uploaded_files)
+    uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 and not is_batch else None
+
+    if is_batch:
+        st.caption(f"{len(uploaded_files)} file(s) selected for batch cataloging.")
+        auto_save = st.checkbox("Save & index analyzed products automatically", value=False)
+
+        if st.button("✨ Analyze Batch"):
+            import json
+            files = [("files", (f.name, f.getvalue(), f.type or "application/octet-stream")) for f in uploaded_files]
+            progress = st.progress(0, text="Uploading...")
+            rows = []
+            table = st.empty()
+            try:
+                with requests.post(f"{API_URL}/admin/analyze-batch", files=files,
+                                   data={"auto_save": str(auto_save).lower()}, stream=True) as response:
+                    if response.status_code != 200:
+                        st.error(f"Batch analysis failed: {response.text}")
+                    else:
+                        for line in response.iter_lines(decode_unicode=True):
+                            if not line:
+                                continue
+                            result = json.loads(line)
+                            if "summary" in result:
+                                summary = result["summary"]
+                                progress.progress(1.0, text="Done")
+                                st.success(
+                                    f"Analyzed {summary['analyzed']}, skipped {summary['duplicate']} duplicate(s), "
+                                    f"{summary['error']} error(s). Saved {summary['saved']} product(s)."
+                                )
+                                if summary.get("save_errors"):
+                                    st.warning(f"Could not save {len(summary['save_errors'])} product(s): "
+                                               f"{summary['save_errors']}")
+                                continue
+                            analysis = result.get("analysis", {})
+                            rows.append({
+                                "File": result["filename"],
+                                "Status": result["status"],
+                                "Name": analysis.get("name", ""),
+                                "Category": analysis.get("category", ""),
+                                "Price (₹)": analysis.get("estimated_price_inr", ""),
+                                "Note": result.get("error") or result.get("duplicate_of", ""),
+                            })
+                            progress.progress(min(len(rows) / max(len(uploaded_files), 1), 0.99),
+                                              text=f"Processed {len(rows)} image(s)...")
+                            table.dataframe(rows, use_container_width=True)
+            except Exception as e:
+                st.error(f"Error: {e}")
+
     if uploaded_file:
         from PIL import Image
         image = Image.open(uploaded_file)
@@ -312,6 +409,7 @@ elif app_mode == "🛍️ User App":
                      st.markdown("### Visual Search")
                      uploaded_file = st.file_uploader("Upload an image", type=['jpg', 'png'], label_visibility='collapsed')
                      st.caption("Upload a product photo to find matches.")
+                     use_ai_vision = st.toggle("Use AI Vision (slower, describes the photo)", value=False)
 
             st.markdown('</div>', unsafe_allow_html=True)
 
@@ -337,6 +435,7 @@ elif app_mode == "🛍️ User App":
                      bytes_data = uploaded_file.getvalue()
                      b64 = base64.b64encode(bytes_data).decode('utf-8')
                      payload["image_data"] = b64
+                     payload["image_mode"] = "semantic" if use_ai_vision else "visual"
                 if final_query:
                     payload["query"] = final_query
                 
@@ -384,8 +483,9 @@ elif app_mode == "🛍️ User App":
             if st.button("⚖️ Compare Now", type="primary"):
                  with st.spinner("Generating Comparison Table..."):
                      try:
-                         # Send list directly
-                         resp = requests.post(f"{API_URL}/compare", json=st.session_state.compare_list)
+                         # Catalog products go by id; external ones (no id) are sent in full
+                         payload = [p["id"] if p.get("id") else p for p in st.session_state.compare_list]
+                         resp = requests.post(f"{API_URL}/compare", json=payload)
                          if resp.status_code == 200:
                              st.markdown("### Comparison Result")
                              st.markdown(resp.json()['markdown'])
@@ -398,6 +498,7 @@ elif app_mode == "🛍️ User App":
         # Grid Layout for Results
         results = st.session_state.search_results
         if results:
+            prefetch_price_predictions(results)
             cols = st.columns(3) # 3 Card Grid
             for i, product in enumerate(results):
                 with cols[i % 3]:
@@ -438,16 +539,49 @@ elif app_mode == "🛍️ User App":
             context_input = st.text_input("Additional Context (Optional)", placeholder="Describe what you see or hear (e.g., 'grinding noise when turning on')...")
             
             if video_file_input and st.button("🔍 Run Diagnostic Analysis"):
-                with st.spinner("Uploading & Analyzing Video (this may take a moment)..."):
-                    try:
-                        # Prepare file for API
-                        files = {"file": (video_file_input.name, video_file_input, video_file_input.type)}
-                        data = {"context": context_input}
-                        
+                try:
+                    # Prepare file for API
+                    files = {"file": (video_file_input.name, video_file_input, video_file_input.type)}
+                    data = {"context": context_input}
+                    
+                    with st.spinner("Uploading video..."):
                         resp = requests.post(f"{API_URL}/analyze-video", files=files, data=data)
+                    
+                    if resp.status_code in (200, 202):
+                        job_id = resp.json()["job_id"]
                         
-                        if resp.status_code == 200:
-                            report_md = resp.json().get("analysis", "No analysis returned.")
+                        # Poll the job until the backend finishes the analysis (or we give up)
+                        progress_bar = st.progress(0, text="Queued for analysis...")
+                        status = {}
+                        poll_error = None
+                        deadline = time.monotonic() + VIDEO_POLL_TIMEOUT_SECONDS
+                        while True:
+                            try:
+                                status_resp = requests.get(f"{API_URL}/analyze-video/{job_id}", timeout=10)
+                            except requests.RequestException as e:
+                                poll_error = f"Lost contact with the server: {e}"
+                                break
+                            if status_resp.status_code != 200:
+                                # e.g. 404 once the job has expired or the backend restarted
+                                poll_error = f"Could not get the job status ({status_resp.status_code}): {status_resp.text}"
+                                break
+                            status = status_resp.json()
+                            progress_bar.progress(status.get("progress", 0) / 100, text=f"{status.get('status', 'working').title()}...")
+                            if status.get("status") in ("completed", "failed"):
+                                break
+                            if time.monotonic() > deadline:
+                                poll_error = "The analysis is taking too long. Please try again later."
+                                break
+                            time.sleep(2)
+                        
+                        if poll_error:
+                            st.error(poll_error)
+                        elif status.get("status") != "completed":
+                            st.error(f"Analysis failed: {status.get('error') or 'Unknown error'}")
+                        else:
+                            result_resp = requests.get(f"{API_URL}/analyze-video/{job_id}/result", timeout=30)
+                            result_resp.raise_for_status()
+                            report_md = result_resp.json().get("analysis", "No analysis returned.")
                             st.success("Analysis Complete!")
                             st.markdown("### 🧬 Deep Seek Diagnostic Report")
                             st.markdown(report_md)
@@ -457,10 +591,10 @@ elif app_mode == "🛍️ User App":
                                 "role": "assistant", 
                                 "content": f"**Video Analysis Report:**\n\n{report_md}"
                             })
-                        else:
-                            st.error(f"Analysis failed: {resp.text}")
-                    except Exception as e:
-                        st.error(f"Error: {e}")
+                    else:
+                        st.error(f"Analysis failed: {resp.text}")
+                except Exception as e:
+                    st.error(f"Error: {e}")
             
             st.markdown('</div>', unsafe_allow_html=True)
 
@@ -545,35 +679,49 @@ elif app_mode == "🛍️ User App":
                             api_history.append({"role": role, "parts": [msg["content"]]})
                             
                         try:
-                            response = requests.post(f"{API_URL}/chat", json={
+                            # Stream the reply token-by-token (Server-Sent Events)
+                            reply_placeholder = st.empty()
+                            data = {"response": "", "sources": [], "visual_aid_url": None}
+                            with requests.post(f"{API_URL}/chat/stream", json={
                                 "message": prompt,
                                 "history": api_history
-                            })
-                            if response.status_code == 200:
-                                data = response.json()
-                                
-                                # Generate TTS Audio
-                                from gtts import gTTS
-                                import io
-                                tts = gTTS(text=data["response"], lang='en', tld='co.in') # Indian English accent
-                                audio_fp = io.BytesIO()
-                                tts.write_to_fp(audio_fp)
-                                audio_bytes = audio_fp.getvalue()
-                                
-                                # Build final message dict
-                                final_msg = {
-                                    "role": "assistant", 
-                                    "content": data["response"],
-                                    "sources": data.get("sources", []),
-                                    "audio": audio_bytes
-                                }
-                                if data.get("visual_aid_url"):
-                                    final_msg["visual_aid_url"] = data["visual_aid_url"]
-                                
-                                st.session_state.messages.append(final_msg)
-                                st.rerun() # Rerun to show the new assistant message
-                            else:
-                                st.error("Support agent is currently unavailable.")
+                            }, stream=True) as response:
+                                if response.status_code != 200:
+                                    raise RuntimeError("Support agent is currently unavailable.")
+                                for event, payload in iter_sse_events(response):
+                                    if event == "sources":
+                                        data["sources"] = payload.get("sources", [])
+                                    elif event == "token":
+                                        data["response"] += payload.get("text", "")
+                                        reply_placeholder.markdown(data["response"] + "▌")
+                                    elif event == "visual_aid":
+                                        data["visual_aid_url"] = payload.get("url")
+                                    elif event == "done":
+                                        data["response"] = payload.get("response", data["response"])
+                                    elif event == "error":
+                                        raise RuntimeError(payload.get("detail", "Support agent is currently unavailable."))
+                            reply_placeholder.markdown(data["response"])
+                            
+                            # Generate TTS Audio
+                            from gtts import gTTS
+                            import io
+                            tts = gTTS(text=data["response"], lang='en', tld='co.in') # Indian English accent
+                            audio_fp = io.BytesIO()
+                            tts.write_to_fp(audio_fp)
+                            audio_bytes = audio_fp.getvalue()
+                            
+                            # Build final message dict
+                            final_msg = {
+                                "role": "assistant", 
+                                "content": data["response"],
+                                "sources": data.get("sources", []),
+                                "audio": audio_bytes
+                            }
+                            if data.get("visual_aid_url"):
+                                final_msg["visual_aid_url"] = data["visual_aid_url"]
+                            
+                            st.session_state.messages.append(final_msg)
+                            st.rerun() # Rerun to show the new assistant message
                         except Exception as e:
                             st.error(f"Error: {e}")
             
@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+
+# Ensure backend imports work
+sys.path.append(os.getcwd())
+
+import numpy as np
+from backend.app.services.vector_db import get_collection
+from backend.app.services.vector_index import get_vector_index
+
+def benchmark(n_queries: int = 200, k: int = 5):
+    """
+    Head-to-head latency of the Chroma query path vs the in-memory NumPy mirror.
+    Query vectors are sampled from the catalog itself, so no embedding calls are made.
+    """
+    collection = get_collection()
+    index = get_vector_index()
+    if not len(index):
+        print("❌ Vector index is empty. Run scripts/ingest_root.py first.")
+        return
+
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, len(index.ids), size=n_queries)
+    vectors = index._all_vectors()[rows]
+    # Perturb slightly so queries are not exact catalog members
+    queries = (vectors + rng.normal(0, 0.01, vectors.shape)).astype(np.float32).tolist()
+
+    print(f"🏁 Benchmarking {n_queries} queries (k={k}) over {len(index)} vectors...")
+    for name, run in (
+        ("chroma", lambda q: collection.query(query_embeddings=[q], n_results=k, where={"type": "description"})),
+        ("numpy", lambda q: index.query(q, k)),
+    ):
+        latencies = []
+        for q in queries:
+            started = time.perf_counter()
+            run(q)
+            latencies.append((time.perf_counter() - started) * 1000)
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"  {name:<7} p50={p50:.3f} ms  p99={p99:.3f} ms")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,17 @@
+import argparse
+import os
+import sys
+
+# Ensure backend imports work
+sys.path.append(os.getcwd())
+
+from backend.app.services.catalog_store import get_catalog_store
+from backend.app.core.config import settings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the catalog store as a legacy products.json.")
+    parser.add_argument("--output", default=settings.CATALOG_JSON_PATH, help="Destination JSON file")
+    args = parser.parse_args()
+
+    count = get_catalog_store().export_json(args.output)
+    print(f"✅ Exported {count} products to {args.output}")
@@ -1,30 +1,40 @@
-import json
+import argparse
 import os
 import sys
 
 # Ensure backend imports work
 sys.path.append(os.getcwd())
 
-from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from backend.app.services.vector_db import get_collection
+from backend.app.services.catalog_store import get_catalog_store
+from backend.app.services.specs import needs_specs, with_specs
 from backend.app.services.embeddings import get_embeddings_service
+from backend.app.services.ingestion import IngestManifest, product_documents, sync_documents
+from backend.app.services.vector_index import NumpyVectorIndex
+from backend.app.services.keyword_index import KeywordIndex
+from backend.app.services.visual_index import VisualIndex
 from backend.app.core.config import settings
 
-def ingest_data():
+def ingest_data(full: bool = False, batch_size: int = settings.INGEST_BATCH_SIZE,
+                workers: int = settings.INGEST_WORKERS):
     print("🚀 Starting ingestion process...")
     
-    # 1. Load Data
-    data_path = os.path.join("data", "products.json")
-    if not os.path.exists(data_path):
-        print(f"❌ Error: {data_path} not found. Run scripts/create_mock_data.py first.")
+    # 1. Load Data (the catalog store picks up data/products.json whenever it changes)
+    catalog = get_catalog_store()
+    products = list(catalog.iter_products())
+    if not products:
+        print("❌ Error: catalog is empty. Run scripts/create_mock_data.py or scripts/process_data.py first.")
         return
 
-    with open(data_path, "r") as f:
-        products = json.load(f)
+    # Offline enrichment: structured specs for comparisons, stored with the catalog
+    stale = [with_specs(p) for p in products if needs_specs(p)]
+    if stale:
+        print(f"🏷️ Extracting specs for {len(stale)} products...")
+        catalog.put_many(stale)
+        products = [with_specs(p) for p in products]
 
     # 2. Prepare Documents
-    documents = []
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=500,
         chunk_overlap=50
@@ -32,71 +42,51 @@ def ingest_data():
 
     print(f"📦 Processing {len(products)} products...")
 
+    documents = []
     for product in products:
-        # Index Description (for semantic search)
-        if product.get("description"):
-            doc = Document(
-                page_content=product["description"],
-                metadata={
-                    "product_id": product["id"],
-                    "product_name": product["name"],
-                    "price": product["price"],
-                    "image_url": product["image_url"],
-                    "type": "description"
-                }
-            )
-            documents.append(doc)
-
-        # Index Manual (for RAG)
-        manual_text = product.get("manual_text", "")
-        if manual_text:
-            chunks = text_splitter.split_text(manual_text)
-            for i, chunk in enumerate(chunks):
-                doc = Document(
-                    page_content=chunk,
-                    metadata={
-                        "product_id": product["id"],
-                        "product_name": product["name"],
-                        "type": "manual",
-                        "chunk_id": i
-                    }
-                )
-                documents.append(doc)
+        documents.extend(product_documents(product, text_splitter))
 
     print(f"📄 Prepared {len(documents)} document chunks.")
 
-    # 3. Embedding & Indexing
+    # 3. Embedding & Indexing (only new or changed chunks)
     try:
         embedding_service = get_embeddings_service()
         collection = get_collection()
-        
-        # Prepare lists for ChromaDB
-        # Generate unique IDs including type to avoid collisions
-        ids = []
-        for doc in documents:
-            if doc.metadata['type'] == 'description':
-                 ids.append(f"{doc.metadata['product_id']}_desc")
-            else:
-                 ids.append(f"{doc.metadata['product_id']}_manual_{doc.metadata['chunk_id']}")
-                 
-        texts = [doc.page_content for doc in documents]
-        metadatas = [doc.metadata for doc in documents]
-        
-        print("🧠 Generating embeddings...")
-        embeddings = embedding_service.embed_documents(texts)
-        
-        print("💾 Storing in ChromaDB...")
-        collection.add(
-            ids=ids,
-            documents=texts,
-            metadatas=metadatas,
-            embeddings=embeddings
+
+        manifest = IngestManifest(settings.INGEST_MANIFEST_PATH)
+        if not full:
+            manifest.load()
+
+        print("🧠 Embedding new or changed chunks...")
+        stats = sync_documents(
+            collection, embedding_service, documents, manifest, {"description", "manual"},
+            batch_size=batch_size, workers=workers, max_retries=settings.INGEST_MAX_RETRIES
         )
-        
+        print(f"💾 Upserted {stats['upserted']}, deleted {stats['deleted']}, unchanged {stats['unchanged']} "
+              f"({stats['docs_per_sec']} docs/sec).")
+        if stats["failed"]:
+            print(f"⚠️ {stats['failed']} documents failed to embed; re-run to resume them.")
+
         # 4. Test / Verify
         count = collection.count()
         print(f"✅ Success! Collection now has {count} documents.")
-        
+
+        if not (full or stats["upserted"] or stats["deleted"]):
+            print("⏭️ Catalog unchanged; keeping existing local indexes.")
+            return
+
+        # Refresh the in-memory search mirror snapshot
+        print("🧮 Rebuilding vector index snapshot...")
+        NumpyVectorIndex(settings.VECTOR_INDEX_DIR).rebuild_from_collection(collection)
+
+        # Local BM25 index for exact-token and keyword-only search
+        print("🔤 Building keyword index...")
+        KeywordIndex(settings.KEYWORD_INDEX_DIR).build(products)
+
+        # Local image features for LLM-free visual search
+        print("🖼️ Building visual index...")
+        VisualIndex(settings.VISUAL_INDEX_PATH).build(products)
+
         # Optional: Peek at one result
         # print("Peek:", collection.peek(limit=1))
         
@@ -105,4 +95,9 @@ def ingest_data():
         print("💡 Hint: Check your GOOGLE_API_KEY in .env")
 
 if __name__ == "__main__":
-    ingest_data()
+    parser = argparse.ArgumentParser(description="Index the product catalog into ChromaDB and the local search indexes.")
+    parser.add_argument("--full", action="store_true", help="Ignore the ingest manifest and re-embed every document")
+    parser.add_argument("--batch-size", type=int, default=settings.INGEST_BATCH_SIZE, help="Documents per embedding call")
+    parser.add_argument("--workers", type=int, default=settings.INGEST_WORKERS, help="Concurrent embedding calls")
+    args = parser.parse_args()
+    ingest_data(full=args.full, batch_size=args.batch_size, workers=args.workers)
@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Ensure backend imports work
+sys.path.append(os.getcwd())
+
+from backend.app.services.catalog_store import get_catalog_store
+from backend.app.services.concurrency import RateLimiter
+from backend.app.services.sustainability_service import SustainabilityService
+from backend.app.core.config import settings
+
+
+async def precompute(concurrency: int, rpm: float, limit: int = None, force: bool = False):
+    service = SustainabilityService()
+    rate = RateLimiter(rpm)
+    # Whether a stored score is current depends on the image too, so the check runs in the workers
+    products = iter([p for p in get_catalog_store().iter_products() if service.audit_inputs(p)[0]])
+    counts = {"stored": 0, "current": 0, "failed": 0}
+
+    print(f"🌱 Checking {concurrency} products at a time ({rpm:g} model req/min)...")
+    start = time.perf_counter()
+
+    async def worker():
+        # The iterator is shared: each worker pulls the next unclaimed product
+        for product in products:
+            if limit and counts["stored"] + counts["failed"] >= limit:
+                return
+            try:
+                if await service.refresh_async(product, force=force, feature="eco_batch", rate=rate) is None:
+                    counts["current"] += 1
+                    continue
+                counts["stored"] += 1
+            except Exception as e:
+                # Failed audits are never stored; a re-run retries them
+                print(f"⚠️ {e}")
+                counts["failed"] += 1
+            scored = counts["stored"] + counts["failed"]
+            if scored % 50 == 0:
+                print(f"   {scored} scored ({scored / (time.perf_counter() - start):.2f}/s)")
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    print(f"✅ Done in {time.perf_counter() - start:.1f}s: {counts['stored']} stored, "
+          f"{counts['current']} already current, {counts['failed']} to retry.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute eco-scores for the whole catalog.")
+    parser.add_argument("--concurrency", type=int, default=settings.ECO_PRECOMPUTE_CONCURRENCY,
+                        help="Audits in flight at once")
+    parser.add_argument("--rpm", type=float, default=settings.ECO_PRECOMPUTE_RPM,
+                        help="Maximum model requests per minute")
+    parser.add_argument("--limit", type=int, default=None, help="Stop once this many products have been scored")
+    parser.add_argument("--force", action="store_true", help="Re-score products that already have a stored score")
+    args = parser.parse_args()
+
+    asyncio.run(precompute(args.concurrency, args.rpm, args.limit, args.force))
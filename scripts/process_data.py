@@ -1,56 +1,227 @@
 import kagglehub
 import pandas as pd
+import numpy as np
+import argparse
 import json
 import os
 import shutil
-import random
-import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Iterator, Optional
 
-def clean_price(price_str):
+# Only the columns we actually read, so wide CSVs don't cost memory for unused fields
+FASHION_COLUMNS = ["id", "gender", "masterCategory", "subCategory", "articleType", "baseColour", "usage", "productDisplayName"]
+AMAZON_COLUMNS = ["name", "main_category", "image", "ratings", "discount_price", "actual_price", "description"]
+
+IMAGE_BASE_URL = "http://127.0.0.1:8000/static/images"
+
+def clean_prices(prices: pd.Series) -> pd.Series:
     """
-    Cleans price strings like '₹1,299', '₹ 1,299', '1,299' -> float 1299.0
+    Cleans price strings like '₹1,299', '₹ 1,299', '1,299' -> float 1299.0 (NaN when unparseable)
     """
-    if pd.isna(price_str): return None
-    clean = str(price_str).replace('₹', '').replace(',', '').strip()
-    try:
-        return float(clean)
-    except:
-        return None
+    clean = prices.astype(str).str.replace(r"[₹,\s]", "", regex=True)
+    return pd.to_numeric(clean, errors="coerce")
 
-def get_fashion_price(row):
+def fashion_prices(df: pd.DataFrame, rng: np.random.Generator) -> np.ndarray:
     """
     Generates realistic Indian market prices based on Category.
     """
-    master = str(row['masterCategory']).lower()
-    sub = str(row['subCategory']).lower()
-    article = str(row['articleType']).lower()
-    
-    # Base ranges (INR) - Psychological pricing
-    if 'watch' in article:
-        return (random.randint(15, 90) * 100) - 1 # e.g. 1499, 8999
-    elif 'shoe' in article or 'footwear' in master:
-        if 'sports' in article or 'casual' in article:
-            return (random.randint(13, 60) * 100) - 1
-        return (random.randint(8, 30) * 100) - 1
-    elif 'bag' in article or 'backpack' in article:
-        return (random.randint(9, 35) * 100) - 1
-    elif 'eyewear' in master or 'sunglass' in article:
-        return (random.randint(6, 25) * 100) - 1
-    elif 'apparel' in master:
-        if 'tshirt' in article:
-            return (random.randint(4, 13) * 100) - 1
-        elif 'shirt' in article:
-            return (random.randint(8, 25) * 100) - 1
-        elif 'jeans' in article or 'trousers' in article:
-            return (random.randint(10, 35) * 100) - 1
-        return (random.randint(5, 20) * 100) - 1
-    elif 'jewellery' in master:
-         return (random.randint(3, 15) * 100) - 1
-         
-    # Default fallback
-    return (random.randint(5, 15) * 100) - 1
-
-def process_data():
+    master = df['masterCategory'].astype(str).str.lower()
+    article = df['articleType'].astype(str).str.lower()
+
+    footwear = article.str.contains('shoe') | master.str.contains('footwear')
+    apparel = master.str.contains('apparel')
+
+    # Base ranges (INR, in hundreds) - first matching rule wins
+    rules = [
+        (article.str.contains('watch'), 15, 90),
+        (footwear & article.str.contains('sports|casual'), 13, 60),
+        (footwear, 8, 30),
+        (article.str.contains('bag|backpack'), 9, 35),
+        (master.str.contains('eyewear') | article.str.contains('sunglass'), 6, 25),
+        (apparel & article.str.contains('tshirt'), 4, 13),
+        (apparel & article.str.contains('shirt'), 8, 25),
+        (apparel & article.str.contains('jeans|trousers'), 10, 35),
+        (apparel, 5, 20),
+        (master.str.contains('jewellery'), 3, 15),
+    ]
+    conditions = [cond.to_numpy() for cond, _, _ in rules]
+    low = np.select(conditions, [lo for _, lo, _ in rules], default=5)
+    high = np.select(conditions, [hi for _, _, hi in rules], default=15)
+
+    # Psychological pricing: e.g. 1499, 8999
+    return rng.integers(low, high + 1) * 100 - 1
+
+def _fashion_frame_to_products(df: pd.DataFrame, fashion_path: str, static_img_dir: str,
+                               pool: ThreadPoolExecutor, rng: np.random.Generator) -> Iterator[dict]:
+    ids = df['id'].astype(str)
+
+    def copy_image(item_id):
+        src_img = os.path.join(fashion_path, "images", f"{item_id}.jpg")
+        if not os.path.exists(src_img):
+            return False
+        shutil.copyfile(src_img, os.path.join(static_img_dir, f"{item_id}.jpg"))
+        return True
+
+    # Copy images in parallel; rows without an image are dropped
+    has_image = np.fromiter(pool.map(copy_image, ids), dtype=bool, count=len(ids))
+    df, ids = df[has_image], ids[has_image]
+    if df.empty:
+        return
+
+    names = df['productDisplayName'].astype(str)
+    prices = fashion_prices(df, rng)
+    descriptions = (
+        df['gender'].astype(str) + " " + df['masterCategory'].astype(str) + " - " + df['subCategory'].astype(str)
+        + " (" + df['articleType'].astype(str) + "). " + df['baseColour'].astype(str) + " color. "
+        + df['usage'].astype(str) + " usage."
+    )
+    manuals = ("Care Instructions for " + names
+               + ": \n1. Check label. \n2. Wash with like colors. \nMaterial: Cotton/Polyester Blend.")
+
+    for item_id, name, price, description, manual_text in zip(ids, names, prices, descriptions, manuals):
+        yield {
+            "id": item_id,
+            "name": name,
+            "price": int(price),
+            "description": description,
+            "image_url": f"{IMAGE_BASE_URL}/{item_id}.jpg",
+            "manual_text": manual_text
+        }
+
+def iter_fashion_products(fashion_path: str, static_img_dir: str, chunksize: int = 10000,
+                          sample: Optional[int] = None, workers: int = 16, seed: Optional[int] = None) -> Iterator[dict]:
+    """
+    Stream products from the fashion dataset, chunk by chunk.
+    With `sample`, reads the (column-pruned) CSV once and yields a random sample instead.
+    """
+    styles_csv = os.path.join(fashion_path, "styles.csv")
+    os.makedirs(static_img_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    read = dict(usecols=lambda c: c in FASHION_COLUMNS, on_bad_lines='skip')
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if sample:
+            df = pd.read_csv(styles_csv, **read)
+            frames = [df.sample(min(sample, len(df)), random_state=seed)]
+        else:
+            frames = pd.read_csv(styles_csv, chunksize=chunksize, **read)
+
+        for df in frames:
+            yield from _fashion_frame_to_products(df, fashion_path, static_img_dir, pool, rng)
+
+def _amazon_frame_to_products(df: pd.DataFrame, seen: set) -> Iterator[dict]:
+    images = df['image'].astype(str)
+    df = df[images.str.startswith('http')]
+    if df.empty:
+        return
+
+    # Pricing Logic: discount price, then list price, then fallback
+    prices = clean_prices(df['discount_price']).fillna(clean_prices(df['actual_price']))
+    prices = prices.where(prices > 0, 999.0)
+
+    names = df['name'].astype(str)
+    short_names = names.where(names.str.len() <= 60, names.str.slice(0, 60) + "...")
+    fallback = "High quality " + df['main_category'].fillna('item').astype(str) + " from Amazon."
+    descriptions = df['description'].astype(object).where(df['description'].notna(), fallback).astype(str)
+    ratings = df['ratings'].fillna('4.5').astype(str)
+    manuals = "User Guide for " + names + ": \nStandard Warranty applies. \nFeatures: " + ratings + " Star Rating."
+
+    # Stable ids derived from name + image, so re-processing yields the same catalog keys
+    hashes = pd.util.hash_pandas_object(pd.DataFrame({"name": names, "image": df['image']}), index=False)
+
+    for item_hash, name, price, description, image_url, manual_text in zip(
+            hashes, short_names, prices, descriptions, df['image'], manuals):
+        # The same product appears in Amazon-Products.csv and its category CSV (and some rows twice);
+        # only the 64-bit hashes are kept, so this stays small even for the full dataset
+        if item_hash in seen:
+            continue
+        seen.add(item_hash)
+        yield {
+            "id": f"amz_{item_hash:016x}",
+            "name": name,
+            "price": float(price),
+            "description": description,
+            "image_url": image_url,
+            "manual_text": manual_text
+        }
+
+def _amazon_csvs(amazon_path: str) -> Iterator[str]:
+    for root, dirs, files in os.walk(amazon_path):
+        for file in sorted(files):
+            if file.endswith(".csv"):
+                yield os.path.join(root, file)
+
+def iter_amazon_products(amazon_path: str, chunksize: int = 10000, sample: Optional[int] = None,
+                         seed: Optional[int] = None) -> Iterator[dict]:
+    """
+    Stream products from every Amazon category CSV, chunk by chunk.
+    With `sample`, yields a random sample across all (column-pruned) CSVs instead.
+    """
+    read = dict(usecols=lambda c: c in AMAZON_COLUMNS, on_bad_lines='skip')
+    frames = []
+    seen = set()
+
+    for path in _amazon_csvs(amazon_path):
+        try:
+            reader = pd.read_csv(path, chunksize=chunksize, **read)
+            for df in reader:
+                if 'name' not in df.columns or 'actual_price' not in df.columns:
+                    break
+                if sample:
+                    frames.append(df)
+                else:
+                    yield from _amazon_frame_to_products(df.reindex(columns=AMAZON_COLUMNS), seen)
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+
+    if sample and frames:
+        # Duplicates dropped before sampling, so they don't shrink the sample
+        full_df = pd.concat(frames, ignore_index=True).reindex(columns=AMAZON_COLUMNS)
+        full_df = full_df.drop_duplicates(subset=["name", "image"])
+        yield from _amazon_frame_to_products(full_df.sample(min(sample, len(full_df)), random_state=seed), seen)
+
+class ProductJsonWriter:
+    """Writes products as a JSON array one item at a time, never holding the whole catalog in memory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+
+    def __enter__(self):
+        self._file = open(self.path + ".tmp", "w")
+        self._file.write("[\n")
+        return self
+
+    def write(self, product: dict):
+        if self.count:
+            self._file.write(",\n")
+        self._file.write(json.dumps(product, indent=4))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.write("\n]\n")
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.path + ".tmp", self.path)
+        else:
+            os.remove(self.path + ".tmp")
+        return False
+
+def write_products_json(products: Iterator[dict], path: str) -> int:
+    with ProductJsonWriter(path) as writer:
+        for product in products:
+            writer.write(product)
+    return writer.count
+
+def _isolated(products: Iterator[dict], label: str) -> Iterator[dict]:
+    # A failing dataset ends its own stream only; products already written are kept
+    try:
+        yield from products
+    except Exception as e:
+        print(f"Error processing {label} data: {e}")
+
+def process_data(full: bool = False, chunksize: int = 10000, sample: int = 40, workers: int = 16):
     print("🔄 Getting dataset paths (cached)...")
     try:
         fashion_path = kagglehub.dataset_download("paramaggarwal/fashion-product-images-small")
@@ -62,92 +233,25 @@ def process_data():
     output_dir = "data"
     static_img_dir = "backend/static/images"
     os.makedirs(output_dir, exist_ok=True)
-    os.makedirs(static_img_dir, exist_ok=True)
 
-    products = []
+    per_dataset = None if full else sample
+    mode = "full datasets" if full else f"{sample} samples per dataset"
+    print(f"👗📦 Processing Fashion (Indian pricing) and Amazon (real prices) - {mode}...")
 
-    # --- Process Fashion Dataset ---
-    print("👗 Processing Fashion Dataset (Applying Indian Pricing)...")
-    try:
-        styles_csv = os.path.join(fashion_path, "styles.csv")
-        df_fashion = pd.read_csv(styles_csv, on_bad_lines='skip')
-        
-        # Sample 40 items for diverse Categories
-        sample_fashion = df_fashion.sample(40)
-        
-        for _, row in sample_fashion.iterrows():
-            item_id = str(row['id'])
-            image_filename = f"{item_id}.jpg"
-            src_img = os.path.join(fashion_path, "images", image_filename)
-            dst_img = os.path.join(static_img_dir, image_filename)
-            
-            if os.path.exists(src_img):
-                shutil.copy(src_img, dst_img)
-                
-                price = get_fashion_price(row)
-                
-                products.append({
-                    "id": item_id,
-                    "name": str(row['productDisplayName']),
-                    "price": price,
-                    "description": f"{row['gender']} {row['masterCategory']} - {row['subCategory']} ({row['articleType']}). {row['baseColour']} color. {row['usage']} usage.",
-                    "image_url": f"http://127.0.0.1:8000/static/images/{image_filename}", 
-                    "manual_text": f"Care Instructions for {row['productDisplayName']}: \n1. Check label. \n2. Wash with like colors. \nMaterial: {row.get('material', 'Cotton/Polyester Blend')}."
-                })
-    except Exception as e:
-        print(f"Error processing Fashion data: {e}")
-
-    # --- Process Amazon Dataset ---
-    print("📦 Processing Amazon Dataset (Extracting Real Prices)...")
-    try:
-        # Walk through all CSVs to find varied products
-        all_products = []
-        for root, dirs, files in os.walk(amazon_path):
-            for file in files:
-                if file.endswith(".csv"):
-                    try:
-                        df = pd.read_csv(os.path.join(root, file), on_bad_lines='skip')
-                        # Normalize columns if needed (dataset uses consistently named cols though)
-                        if 'name' in df.columns and 'actual_price' in df.columns:
-                            all_products.append(df)
-                    except: pass
-        
-        if all_products:
-            full_df = pd.concat(all_products, ignore_index=True)
-            # Sample 40 items
-            sample_amazon = full_df.sample(40)
-            
-            for _, row in sample_amazon.iterrows():
-                name = str(row.get('name', 'Product'))
-                
-                # Pricing Logic
-                price = clean_price(row.get('discount_price'))
-                if not price:
-                    price = clean_price(row.get('actual_price'))
-                if not price:
-                    price = 999.0 # Fallback
-                
-                # Image
-                img_url = str(row.get('image', ''))
-                if not img_url.startswith('http'): continue
-                
-                products.append({
-                    "id": f"amz_{random.randint(10000,99999)}",
-                    "name": name[:60] + "..." if len(name) > 60 else name,
-                    "price": price,
-                    "description": str(row.get('description', f"High quality {row.get('main_category','item')} from Amazon.")),
-                    "image_url": img_url,
-                    "manual_text": f"User Guide for {name}: \nStandard Warranty applies. \nFeatures: {str(row.get('ratings', '4.5'))} Star Rating."
-                })
-
-    except Exception as e:
-        print(f"Error processing Amazon data: {e}")
+    products = chain(
+        _isolated(iter_fashion_products(fashion_path, static_img_dir, chunksize=chunksize,
+                                        sample=per_dataset, workers=workers), "Fashion"),
+        _isolated(iter_amazon_products(amazon_path, chunksize=chunksize, sample=per_dataset), "Amazon"),
+    )
+    count = write_products_json(products, os.path.join(output_dir, "products.json"))
 
-    # Save
-    with open("data/products.json", "w") as f:
-        json.dump(products, f, indent=4)
-    
-    print(f"✅ Created data/products.json with {len(products)} products (Realistic Prices applied).")
+    print(f"✅ Created data/products.json with {count} products (Realistic Prices applied).")
 
 if __name__ == "__main__":
-    process_data()
+    parser = argparse.ArgumentParser(description="Normalize the Kaggle datasets into data/products.json.")
+    parser.add_argument("--full", action="store_true", help="Process every row instead of a small sample")
+    parser.add_argument("--sample", type=int, default=40, help="Products sampled per dataset when not --full")
+    parser.add_argument("--chunksize", type=int, default=10000, help="CSV rows read per chunk")
+    parser.add_argument("--workers", type=int, default=16, help="Parallel image copies")
+    args = parser.parse_args()
+    process_data(full=args.full, chunksize=args.chunksize, sample=args.sample, workers=args.workers)
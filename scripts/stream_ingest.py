@@ -0,0 +1,159 @@
+import argparse
+import os
+import sys
+import time
+from itertools import chain
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+# Ensure backend imports work
+sys.path.append(os.getcwd())
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from backend.app.services.vector_db import get_collection
+from backend.app.services.catalog_store import get_catalog_store
+from backend.app.services.embeddings import get_embeddings_service
+from backend.app.services.ingestion import (
+    IngestDocument, IngestManifest, normalize_product, prefetch, product_documents, sync_documents
+)
+from backend.app.services.vector_index import NumpyVectorIndex
+from backend.app.services.keyword_index import KeywordIndex
+from backend.app.services.visual_index import VisualIndex, resolve_static_path
+from backend.app.core.config import settings
+
+
+def chunk_products(products: Iterable[dict], text_splitter) -> Iterator[Tuple[dict, List[IngestDocument]]]:
+    """Normalize each product and split it into Chroma documents (CPU-bound, fine on a prefetch thread)."""
+    for product in products:
+        product = normalize_product(product)
+        yield product, product_documents(product, text_splitter)
+
+
+def stream_documents(chunked: Iterable[Tuple[dict, List[IngestDocument]]],
+                     sinks: List[Callable[[dict], None]]) -> Iterator[IngestDocument]:
+    """
+    Hand each product to every sink (indexes, catalog store), then pass its documents on.
+    Runs on the consumer's thread, so the sinks never need to be thread-safe.
+    """
+    for product, documents in chunked:
+        for sink in sinks:
+            sink(product)
+        yield from documents
+
+
+def stream_ingest(full: bool = False, sample: int = 40, chunksize: int = 10000,
+                  batch_size: int = settings.INGEST_BATCH_SIZE, workers: int = settings.INGEST_WORKERS,
+                  queue_size: int = 1000, export: str = None, prune: bool = False,
+                  local_indexes: bool = True):
+    """
+    Kaggle CSV -> normalize -> chunk -> embed -> Chroma, as one generator chain.
+
+    The CSV reader and the chunker each run on their own thread behind a bounded
+    queue, and embedding keeps at most two batches per worker in flight, so memory
+    stays flat however large the catalog is. The sinks (catalog store, keyword and
+    visual indexes) run on the main thread as it feeds the embedder. Products land
+    in the catalog store; data/products.json is only written when `export` is given.
+    """
+    print("🚀 Starting streaming ingestion...")
+    # Only the Kaggle source needs kagglehub and pandas
+    import kagglehub
+    from scripts.process_data import iter_amazon_products, iter_fashion_products
+
+    try:
+        fashion_path = kagglehub.dataset_download("paramaggarwal/fashion-product-images-small")
+        amazon_path = kagglehub.dataset_download("lokeshparab/amazon-products-dataset")
+    except Exception as e:
+        print(f"Error getting paths: {e}")
+        return
+
+    per_dataset = None if full else sample
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500,
+        chunk_overlap=50
+    )
+
+    embedding_service = get_embeddings_service()
+    collection = get_collection()
+    manifest = IngestManifest(settings.INGEST_MANIFEST_PATH).load()
+
+    # Side outputs fed from the product stream as it passes through
+    sinks = []
+    keyword_index = KeywordIndex(settings.KEYWORD_INDEX_DIR)
+    visual_products = []
+    if local_indexes:
+        # A pruning run is authoritative, so the keyword index starts from scratch
+        if not prune:
+            keyword_index.load()
+
+        def collect_visual(product):
+            # Only products with a local image feed the visual index; manuals are not needed there
+            if resolve_static_path(product["image_url"]):
+                visual_products.append({k: v for k, v in product.items() if k != "manual_text"})
+
+        sinks.append(lambda product: keyword_index.add(product, persist=False))
+        sinks.append(collect_visual)
+
+    products = prefetch(chain(
+        iter_fashion_products(fashion_path, "backend/static/images", chunksize=chunksize, sample=per_dataset),
+        iter_amazon_products(amazon_path, chunksize=chunksize, sample=per_dataset),
+    ), maxsize=queue_size)
+
+    # Products are persisted to the catalog store in transactions of `batch_size`
+    catalog = get_catalog_store()
+    pending = []
+
+    def store_product(product):
+        pending.append(product)
+        if len(pending) >= batch_size:
+            catalog.put_many(pending, source="stream")
+            pending.clear()
+
+    sinks.append(store_product)
+
+    started = time.perf_counter()
+    documents = stream_documents(prefetch(chunk_products(products, text_splitter), maxsize=queue_size), sinks)
+
+    # Only an authoritative run may delete documents it did not see
+    stats = sync_documents(
+        collection, embedding_service, documents, manifest,
+        {"description", "manual"} if prune else set(),
+        batch_size=batch_size, workers=workers, max_retries=settings.INGEST_MAX_RETRIES
+    )
+    catalog.put_many(pending, source="stream")
+
+    if export:
+        print(f"📝 Exported {catalog.export_json(export)} products to {export}")
+
+    elapsed = time.perf_counter() - started
+    print(f"💾 {stats['total']} documents in {elapsed:.1f}s: upserted {stats['upserted']}, "
+          f"deleted {stats['deleted']}, unchanged {stats['unchanged']} ({stats['docs_per_sec']} docs/sec).")
+    if stats["failed"]:
+        print(f"⚠️ {stats['failed']} documents failed to embed; re-run to resume them.")
+
+    if local_indexes:
+        print("🧮 Rebuilding vector index snapshot...")
+        NumpyVectorIndex(settings.VECTOR_INDEX_DIR).rebuild_from_collection(collection)
+
+        print("🔤 Saving keyword index...")
+        keyword_index.save()
+
+        print("🖼️ Building visual index...")
+        VisualIndex(settings.VISUAL_INDEX_PATH).build(visual_products)
+
+    print(f"✅ Done. Collection now has {collection.count()} documents.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream the Kaggle datasets straight into ChromaDB and the local search indexes.")
+    parser.add_argument("--full", action="store_true", help="Process every row instead of a small sample")
+    parser.add_argument("--sample", type=int, default=40, help="Products sampled per dataset when not --full")
+    parser.add_argument("--chunksize", type=int, default=10000, help="CSV rows read per chunk")
+    parser.add_argument("--batch-size", type=int, default=settings.INGEST_BATCH_SIZE, help="Documents per embedding call")
+    parser.add_argument("--workers", type=int, default=settings.INGEST_WORKERS, help="Concurrent embedding calls")
+    parser.add_argument("--queue-size", type=int, default=1000, help="Items buffered between pipeline stages")
+    parser.add_argument("--export", metavar="PATH", help="Also write the normalized catalog as JSON (e.g. data/products.json)")
+    parser.add_argument("--prune", action="store_true", help="Delete indexed documents not present in this run")
+    parser.add_argument("--no-local-indexes", action="store_true", help="Skip the vector snapshot, keyword and visual indexes")
+    args = parser.parse_args()
+    stream_ingest(full=args.full, sample=args.sample, chunksize=args.chunksize, batch_size=args.batch_size,
+                  workers=args.workers, queue_size=args.queue_size, export=args.export, prune=args.prune,
+                  local_indexes=not args.no_local_indexes)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the app as `backend.app...`, like the scripts do when run from the repo root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,48 @@
+import pytest
+
+from backend.app.services.admin import AdminService
+from backend.app.services.catalog_store import CatalogStore
+
+
+class _CatalogIndex:
+    def __init__(self):
+        self.upserted = []
+
+    def upsert(self, product):
+        self.upserted.append(product["id"])
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = AdminService.__new__(AdminService)
+    service.catalog = CatalogStore(str(tmp_path / "catalog.sqlite3"))
+    service.catalog_index = _CatalogIndex()
+    return service
+
+
+def _product(product_id, **fields):
+    return {"id": product_id, "name": "Kettle", "description": "Electric kettle.", "price": 999, **fields}
+
+
+def test_a_failed_transaction_is_not_committed_later(service):
+    with pytest.raises(TypeError):
+        # Not JSON-serialisable, so the write fails after "a" was already written
+        service.catalog.put_many([_product("a"), _product("b", tags={"steel"})], source="admin")
+    service.catalog.put(_product("c"), source="admin")
+
+    assert service.catalog.get("a") is None
+    assert service.catalog.get("c") is not None
+
+
+def test_one_bad_product_does_not_lose_the_rest(service):
+    errors = service.save_products([_product("a"), _product("b", tags={"steel"}), _product("c")])
+
+    assert list(errors) == ["b"]
+    assert service.catalog.get("a")["name"] == "Kettle"
+    assert service.catalog.get("b") is None
+    assert service.catalog_index.upserted == ["a", "c"]
+
+
+def test_save_products_attaches_specs(service):
+    assert service.save_products([_product("a", description="1.5 L steel kettle")]) == {}
+    assert "specs" in service.catalog.get("a")
@@ -0,0 +1,43 @@
+import pytest
+from pydantic import ValidationError
+
+from backend.app.core.config import settings
+from backend.app.models.schema import BatchSearchRequest
+from backend.app.services.vector_index import NumpyVectorIndex
+
+
+@pytest.mark.parametrize("fields", [
+    {"queries": ["shoes"], "limit": 0},
+    {"queries": ["shoes"], "limit": -3},
+    {"queries": ["shoes"], "limit": 51},
+    {"queries": ["shoes"] * (settings.SEARCH_BATCH_MAX_QUERIES + 1)},
+])
+def test_batch_request_bounds(fields):
+    with pytest.raises(ValidationError):
+        BatchSearchRequest(**fields)
+
+
+def test_batch_request_defaults():
+    request = BatchSearchRequest(queries=["shoes", "wallet"])
+    assert request.limit == 5
+    assert request.mode is None
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NumpyVectorIndex(str(tmp_path / "vector_index"))
+    for i in range(4):
+        index.upsert(f"{i}_desc", [float(i), 0.0], {"product_id": str(i), "product_name": f"p{i}", "price": i}, f"doc {i}")
+    return index
+
+
+def test_query_many_returns_nearest_first(index):
+    hits = index.query_many([[2.2, 0.0], [0.0, 0.0]], k=2)
+    assert [[doc_id for doc_id, _, _, _ in row] for row in hits] == [["2_desc", "3_desc"], ["0_desc", "1_desc"]]
+    assert hits[0][0][2]["product_id"] == "2"
+    assert hits[0][0][3] == pytest.approx(0.04, abs=1e-5)
+
+
+def test_query_many_with_no_results_requested(index):
+    assert index.query_many([[1.0, 0.0]], k=0) == [[]]
+    assert index.query_many([[1.0, 0.0]], k=-1) == [[]]
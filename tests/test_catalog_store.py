@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from backend.app.services.catalog_store import CatalogStore
+
+
+def _write_json(path, products, mtime):
+    path.write_text(json.dumps(products))
+    # import_json skips unchanged files by mtime; make every rewrite count
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CatalogStore(str(tmp_path / "catalog.sqlite3"))
+
+
+def test_import_mirrors_the_file(store, tmp_path):
+    path = tmp_path / "products.json"
+    _write_json(path, [{"id": "a", "price": 1}, {"id": "b", "price": 2}], 1000)
+    store.import_json(str(path))
+
+    _write_json(path, [{"id": "b", "price": 3}, {"id": "c", "price": 4}], 2000)
+    store.import_json(str(path))
+
+    assert [p["id"] for p in store.iter_products()] == ["b", "c"]
+    assert store.get("b")["price"] == 3
+
+
+def test_unchanged_file_is_not_reimported(store, tmp_path):
+    path = tmp_path / "products.json"
+    _write_json(path, [{"id": "a"}], 1000)
+    assert store.import_json(str(path)) == 1
+    assert store.import_json(str(path)) == 0
+
+
+def test_admin_edits_survive_a_reimport(store, tmp_path):
+    path = tmp_path / "products.json"
+    _write_json(path, [{"id": "a", "name": "Shirt", "price": 999}, {"id": "b", "name": "Shoe", "price": 1999}], 1000)
+    store.import_json(str(path))
+
+    # Admin edits a product that came from the file, and adds a new one (as AdminService does)
+    store.put({"id": "a", "name": "Shirt (edited)", "price": 799}, source="admin")
+    store.put_many([{"id": "new_1", "name": "Bag", "price": 1499}], source="admin")
+
+    # The file is regenerated without the admin's changes and without "a" at all
+    _write_json(path, [{"id": "a", "name": "Shirt", "price": 999}, {"id": "b", "name": "Shoe", "price": 1899}], 2000)
+    store.import_json(str(path), force=True)
+    _write_json(path, [{"id": "b", "name": "Shoe", "price": 1899}], 3000)
+    store.import_json(str(path))
+
+    assert store.get("a") == {"id": "a", "name": "Shirt (edited)", "price": 799}
+    assert store.get("new_1")["name"] == "Bag"
+    assert store.get("b")["price"] == 1899
+
+
+def test_sourceless_writes_update_data_but_keep_the_source(store, tmp_path):
+    store.put({"id": "a", "name": "Shirt"}, source="admin")
+    # e.g. spec enrichment rewriting the row with specs attached
+    store.put({"id": "a", "name": "Shirt", "specs": {"version": 1}})
+
+    path = tmp_path / "products.json"
+    _write_json(path, [{"id": "a", "name": "Other"}], 1000)
+    store.import_json(str(path))
+
+    assert store.get("a") == {"id": "a", "name": "Shirt", "specs": {"version": 1}}
@@ -0,0 +1,72 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.app.services.concurrency import SingleFlight
+
+
+def test_concurrent_calls_for_one_key_share_a_single_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fetch(query):
+        calls.append(query)
+        release.wait(5)
+        return [query]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, "shoes", fetch, "shoes") for _ in range(8)]
+        # Let every caller reach do() before the leader finishes
+        deadline = time.monotonic() + 5
+        while flight.coalesced < 7 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert calls == ["shoes"]
+    assert results == [["shoes"]] * 8
+    assert flight.coalesced == 7
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.coalesced == 0
+
+
+def test_followers_receive_the_leader_exception_and_the_key_is_released():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("quota exhausted")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "q", failing)
+        started.wait(5)
+        follower = pool.submit(flight.do, "q", failing)
+        deadline = time.monotonic() + 5
+        while flight.coalesced < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError, match="quota exhausted"):
+                future.result()
+
+    # A failed call is not cached: the next caller runs again
+    assert flight.do("q", lambda: "ok") == "ok"
+
+
+def test_sequential_calls_run_each_time():
+    flight = SingleFlight()
+    calls = []
+    for _ in range(3):
+        flight.do("k", calls.append, 1)
+    assert len(calls) == 3
@@ -0,0 +1,20 @@
+from backend.app.services.eco_store import EcoScoreStore, eco_content_hash
+
+
+def test_replaced_image_behind_the_same_url_changes_the_hash():
+    inputs = ("Bottle", "Kitchen", "Steel bottle", "https://cdn.example/bottle.jpg")
+    before = eco_content_hash(*inputs, image=b"old jpeg")
+
+    assert eco_content_hash(*inputs, image=b"old jpeg") == before
+    assert eco_content_hash(*inputs, image=b"new jpeg") != before
+    # An image that could not be loaded is a different audit input too
+    assert eco_content_hash(*inputs) != before
+
+
+def test_a_product_keeps_only_its_current_score(tmp_path):
+    store = EcoScoreStore(str(tmp_path / "eco.sqlite3"))
+    store.put("1", "old", {"score": 40})
+    store.put("1", "new", {"score": 70})
+
+    assert not store.contains("1", "old")
+    assert store.get("1", "new") == {"score": 70}
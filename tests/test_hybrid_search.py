@@ -0,0 +1,101 @@
+import pytest
+
+from backend.app.core.config import settings
+from backend.app.models.schema import Product
+from backend.app.services.keyword_index import KeywordIndex, tokenize
+from backend.app.services.search import SearchService
+
+PRODUCTS = [
+    {"id": "1", "name": "Blue Running Shoes", "description": "Lightweight mesh running shoes.", "category": "Footwear", "price": 2499},
+    {"id": "2", "name": "Leather Wallet", "description": "Brown leather wallet with coin pocket.", "category": "Accessories", "price": 799},
+    {"id": "3", "name": "Cotton T-Shirt", "description": "Blue cotton tshirt for running and gym.", "category": "Apparel", "price": 499},
+    {"id": "4", "name": "SanDisk 32GB Pen Drive", "description": "USB 3.0 flash drive.", "category": "Electronics", "price": 399},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = KeywordIndex(str(tmp_path / "keyword_index"))
+    index.build(PRODUCTS)
+    return index
+
+
+def test_tokenize_keeps_skus_and_sizes():
+    assert tokenize("SanDisk 32GB, SKU-53872!") == ["sandisk", "32gb", "sku", "53872"]
+
+
+def test_search_ranks_title_matches_first(index):
+    hits = index.search("running shoes")
+    assert [product_id for product_id, _ in hits][:2] == ["1", "3"]
+    assert hits[0][1] > hits[1][1] > 0
+
+
+def test_search_unknown_terms_returns_nothing(index):
+    assert index.search("submarine") == []
+
+
+def test_rare_terms_outweigh_common_ones(index):
+    # "blue" is in two documents, "wallet" in one: idf favours the rarer term
+    scores = dict(index.search("blue wallet", limit=4))
+    assert scores["2"] > scores["3"]
+
+
+def test_add_replaces_existing_product(index):
+    index.add({"id": "2", "name": "Canvas Backpack", "description": "Roomy backpack.", "category": "Bags"}, persist=False)
+    assert index.search("wallet") == []
+    assert index.search("backpack")[0][0] == "2"
+    assert index.total_len == sum(index.doc_len.values())
+
+
+def test_snapshot_and_delta_log_survive_reload(index, tmp_path):
+    index.add({"id": "5", "name": "Steel Water Bottle", "description": "1l bottle.", "category": "Kitchen"})
+
+    reloaded = KeywordIndex(str(tmp_path / "keyword_index"))
+    assert reloaded.load()
+    assert len(reloaded) == 5
+    assert reloaded.search("bottle")[0][0] == "5"
+    assert reloaded.search("pen drive") == index.search("pen drive")
+
+
+class _Catalog:
+    def get(self, product_id):
+        return None
+
+
+def _service(index):
+    service = SearchService.__new__(SearchService)
+    service.keyword_index = index
+    service.catalog = _Catalog()
+    return service
+
+
+def _product(product_id, score):
+    return Product(id=product_id, name=product_id, description="", price=0.0, image_url="", score=score)
+
+
+def test_fuse_combines_both_rankings(index):
+    service = _service(index)
+    semantic = [_product("3", 0.2), _product("4", 0.5)]
+    keyword_hits = [("1", 7.0), ("3", 5.0)]
+
+    fused = service._fuse(semantic, keyword_hits, limit=3)
+
+    # "3" is ranked by both and wins; "1" (keyword only, rank 1) beats "4" (semantic only, rank 2)
+    assert [p.id for p in fused] == ["3", "1", "4"]
+    k = settings.RRF_K
+    assert fused[0].score == pytest.approx(1 / (k + 1) + 1 / (k + 2))
+    assert fused[1].score == pytest.approx(1 / (k + 1))
+    assert fused[2].score == pytest.approx(1 / (k + 2))
+
+
+def test_fuse_builds_keyword_only_products_from_the_index(index):
+    fused = _service(index)._fuse([], [("2", 3.0)], limit=5)
+    assert fused[0].name == "Leather Wallet"
+    assert fused[0].price == 799.0
+
+
+def test_fuse_ignores_duplicate_semantic_hits_and_respects_limit(index):
+    semantic = [_product("3", 0.1), _product("3", 0.3), _product("4", 0.4)]
+    fused = _service(index)._fuse(semantic, [], limit=1)
+    assert [p.id for p in fused] == ["3"]
+    assert fused[0].score == pytest.approx(1 / (settings.RRF_K + 1))
@@ -0,0 +1,78 @@
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from backend.app.services import search
+from backend.app.services.ingestion import IngestManifest
+from backend.app.services.keyword_index import KeywordIndex
+from backend.app.services.search import SearchService
+
+
+class _Collection:
+    def __init__(self):
+        self.docs = {}
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        self.docs.update({doc_id: metadata for doc_id, metadata in zip(ids, metadatas)})
+
+    def get(self, where, include):
+        wanted = where["product_id"]["$in"]
+        ids = [doc_id for doc_id, metadata in self.docs.items() if metadata["product_id"] in wanted]
+        return {"ids": ids, "metadatas": [self.docs[doc_id] for doc_id in ids]}
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self.docs.pop(doc_id, None)
+
+
+class _Embeddings:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+
+    def embed_documents(self, texts):
+        if self.fail_on and any(self.fail_on in text for text in texts):
+            raise RuntimeError("embedding failed")
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(search.settings, "INGEST_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(search.settings, "INGEST_BATCH_SIZE", 2)
+    service = SearchService.__new__(SearchService)
+    service.collection = _Collection()
+    service.embedding_service = _Embeddings()
+    service.keyword_index = KeywordIndex(str(tmp_path / "keyword_index"))
+    service.text_splitter = RecursiveCharacterTextSplitter(chunk_size=20, chunk_overlap=0)
+    service.vector_index = None
+    return service
+
+
+def _product(product_id, manual):
+    return {"id": product_id, "name": "Kettle", "description": "Electric kettle.", "price": 999, "manual_text": manual}
+
+
+LONG_MANUAL = "Fill with water. Close the lid. Press the switch. Wait for the click. Pour carefully."
+
+
+def test_reindexing_a_shorter_manual_deletes_leftover_chunks(service, tmp_path):
+    assert service.index_products([_product("k1", LONG_MANUAL), _product("k2", LONG_MANUAL)]) == {}
+    assert len([d for d in service.collection.docs if d.startswith("k1_manual_")]) > 2
+
+    assert service.index_products([_product("k1", "Fill with water.")]) == {}
+
+    assert sorted(d for d in service.collection.docs if d.startswith("k1_")) == ["k1_desc", "k1_manual_0"]
+    # Other products are untouched
+    assert len([d for d in service.collection.docs if d.startswith("k2_manual_")]) > 2
+    # The manifest agrees with the collection, so the next ingest run has nothing to do
+    assert set(IngestManifest(str(tmp_path / "manifest.json")).load().entries) == set(service.collection.docs)
+
+
+def test_failed_products_keep_their_previous_chunks(service):
+    service.index_products([_product("k1", LONG_MANUAL)])
+    before = set(service.collection.docs)
+
+    service.embedding_service = _Embeddings(fail_on="Fill")
+    errors = service.index_products([_product("k1", "Fill with water.")])
+
+    assert "k1" in errors
+    assert set(service.collection.docs) == before
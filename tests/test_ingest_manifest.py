@@ -0,0 +1,106 @@
+import json
+
+from backend.app.services.ingestion import IngestManifest, content_hash, embed_and_upsert
+
+
+def _doc(doc_id, text, kind="description"):
+    return (doc_id, text, {"product_id": doc_id.split("_")[0], "type": kind})
+
+
+class _Collection:
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.upserted = []
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        if self.fail_ids & set(ids):
+            raise RuntimeError("upsert failed")
+        self.upserted.extend(ids)
+
+
+class _Embeddings:
+    def embed_documents(self, texts):
+        return [[float(len(text))] for text in texts]
+
+
+def test_changed_yields_new_and_edited_documents_only(tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    kept, edited, new = _doc("1_desc", "same"), _doc("2_desc", "after"), _doc("3_desc", "new")
+    manifest.record(kept, content_hash(kept[1], kept[2]))
+    manifest.record(_doc("2_desc", "before"), content_hash("before", edited[2]))
+
+    seen = set()
+    changed = [document[0] for document, _ in manifest.changed([kept, edited, new], seen)]
+
+    assert changed == ["2_desc", "3_desc"]
+    assert seen == {"1_desc", "2_desc", "3_desc"}
+
+
+def test_removed_only_considers_requested_types(tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    for document in (_doc("1_desc", "a"), _doc("1_manual_0", "b", "manual"), _doc("2_desc", "c")):
+        manifest.record(document, "hash")
+
+    assert manifest.removed({"1_desc"}, {"description"}) == ["2_desc"]
+    assert sorted(manifest.removed(set(), {"description", "manual"})) == ["1_desc", "1_manual_0", "2_desc"]
+
+
+def test_checkpoints_are_replayed_after_an_interrupted_run(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = IngestManifest(path)
+    first, second = _doc("1_desc", "a"), _doc("2_desc", "b")
+    manifest.record(first, "h1")
+    manifest.checkpoint(["1_desc"])
+    manifest.record(second, "h2")
+    manifest.checkpoint(["2_desc"])
+
+    # No save(): the process died mid-run, only the journal is on disk
+    resumed = IngestManifest(path).load()
+    assert resumed.entries == {
+        "1_desc": {"hash": "h1", "type": "description"},
+        "2_desc": {"hash": "h2", "type": "description"},
+    }
+
+
+def test_save_folds_in_and_removes_the_journal(tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest = IngestManifest(str(path))
+    manifest.record(_doc("1_desc", "a"), "h1")
+    manifest.checkpoint(["1_desc"])
+    manifest.save()
+
+    assert not (tmp_path / "manifest.json.journal").exists()
+    assert json.loads(path.read_text()) == {"1_desc": {"hash": "h1", "type": "description"}}
+    assert IngestManifest(str(path)).load().entries == manifest.entries
+
+
+def test_failed_batches_are_left_out_of_the_manifest(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = IngestManifest(path)
+    documents = [_doc(f"{i}_desc", f"text {i}") for i in range(5)]
+    changed = [(document, content_hash(document[1], document[2])) for document in documents]
+
+    stats = embed_and_upsert(_Collection(fail_ids={"4_desc"}), _Embeddings(), changed, manifest,
+                             batch_size=2, workers=2, max_retries=0)
+
+    assert stats["upserted"] == 4
+    assert stats["failed"] == 1
+    # Only successful batches were journaled, so a resumed run retries just the failed one
+    resumed = IngestManifest(path).load()
+    assert sorted(resumed.entries) == ["0_desc", "1_desc", "2_desc", "3_desc"]
+
+
+def test_journal_records_outside_writes_without_loading(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = IngestManifest(path)
+    manifest.record(_doc("1_manual_0", "a", "manual"), "h0")
+    manifest.record(_doc("1_manual_1", "b", "manual"), "h1")
+    manifest.save()
+
+    # e.g. an admin import rewrote the product with a shorter manual
+    edited = _doc("1_manual_0", "new text", "manual")
+    IngestManifest(path).journal([edited], removed=["1_manual_1"])
+
+    assert IngestManifest(path).load().entries == {
+        "1_manual_0": {"hash": content_hash(edited[1], edited[2]), "type": "manual"},
+    }
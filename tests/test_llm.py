@@ -0,0 +1,133 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app.services import llm
+from backend.app.services.llm import TokenBucket
+
+_real_sleep = asyncio.sleep
+
+
+class _Clock:
+    """
+    Stands in for time.monotonic and both sleeps, so waits are measured exactly and never taken.
+    Rates below give binary-exact intervals, so the fake clock never lands a hair short of a token.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self.on_sleep = None
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+        if self.on_sleep is not None:
+            self.on_sleep()
+
+    async def async_sleep(self, seconds):
+        self.now += seconds
+        await _real_sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm, "time", SimpleNamespace(monotonic=clock.monotonic, perf_counter=clock.monotonic,
+                                                     sleep=clock.sleep))
+    monkeypatch.setattr(llm.asyncio, "sleep", clock.async_sleep)
+    return clock
+
+
+def test_burst_is_granted_immediately_then_refills_at_the_rate(clock):
+    bucket = TokenBucket(rate_per_minute=480, burst=3) # 8 tokens per second
+
+    for _ in range(3):
+        bucket.acquire_sync()
+    assert clock.sleeps == []
+
+    bucket.acquire_sync()
+    assert sum(clock.sleeps) == pytest.approx(0.125)
+
+
+def test_async_waiters_are_served_in_priority_order(clock):
+    async def scenario():
+        bucket = TokenBucket(rate_per_minute=960, burst=1) # one token every 62.5 ms
+        await bucket.acquire() # Drain the burst so everyone queues
+        order = []
+
+        async def call(name, priority):
+            await bucket.acquire(priority)
+            order.append(name)
+
+        # Background work queues first, interactive work after it
+        tasks = [asyncio.ensure_future(call("eco_batch", 3)), asyncio.ensure_future(call("video", 2))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(call("chat", 0)))
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["chat", "video", "eco_batch"]
+
+
+def test_cancelled_waiters_do_not_consume_tokens(clock):
+    async def scenario():
+        bucket = TokenBucket(rate_per_minute=960, burst=1)
+        await bucket.acquire()
+        abandoned = asyncio.ensure_future(bucket.acquire(0))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        started = clock.now
+        await bucket.acquire(1)
+        return clock.now - started
+
+    # One refill, not two: the abandoned caller's turn was skipped
+    assert asyncio.run(scenario()) == pytest.approx(0.0625)
+
+
+def test_sync_callers_wait_behind_queued_async_callers(clock, monkeypatch):
+    # Only the thread's sleeps move the clock here, so the queued caller cannot be served before it asks
+    monkeypatch.setattr(llm.asyncio, "sleep", lambda seconds: _real_sleep(0))
+    loop = asyncio.new_event_loop()
+    try:
+        bucket = TokenBucket(rate_per_minute=480, burst=1)
+        loop.run_until_complete(bucket.acquire())
+        queued = loop.create_task(bucket.acquire(0))
+        loop.run_until_complete(asyncio.sleep(0))
+        granted = bucket._waiters[0][2]
+
+        # A token refills before the drainer gets to run: it belongs to the queued caller
+        clock.now += 0.125
+        # The event loop keeps running while the thread waits
+        clock.on_sleep = lambda: loop.run_until_complete(asyncio.sleep(0))
+        bucket.acquire_sync()
+
+        assert granted.done()
+        assert bucket.stats()["queued"] == 0
+        loop.run_until_complete(queued)
+    finally:
+        loop.close()
+
+
+def test_pause_holds_every_grant(clock):
+    bucket = TokenBucket(rate_per_minute=480, burst=5)
+    bucket.pause(0.25)
+    assert bucket.stats()["paused_for_seconds"] == pytest.approx(0.25)
+
+    bucket.acquire_sync()
+    assert sum(clock.sleeps) == pytest.approx(0.25)
+
+
+def test_stats_report_budget_state(clock):
+    bucket = TokenBucket(rate_per_minute=60, burst=2)
+    bucket.acquire_sync()
+    stats = bucket.stats()
+
+    assert stats["rate_per_minute"] == 60
+    assert stats["burst"] == 2
+    assert stats["tokens"] == 1
+    assert stats["queued"] == 0
@@ -0,0 +1,146 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from backend.app.services.price_history import PriceHistory, analyze, daily_prices, name_key, parse_price, recommend
+
+TODAY = date(2026, 6, 15).toordinal()
+
+
+def _series(points):
+    """[(days_ago, price)] -> (days, prices) arrays as PriceHistory stores them."""
+    days = np.array([TODAY - ago for ago, _ in points], dtype=np.int32)
+    prices = np.array([price for _, price in points], dtype=np.float32)
+    return days, prices
+
+
+@pytest.mark.parametrize("value, expected", [
+    (1299, 1299.0),
+    (499.5, 499.5),
+    ("₹1,299.00", 1299.0),
+    ("Rs. 2,499", 2499.0),
+    ("", None),
+    (None, None),
+    ("Price unavailable", None),
+])
+def test_parse_price(value, expected):
+    assert parse_price(value) == expected
+
+
+def test_name_key_normalizes_punctuation_and_case():
+    assert name_key("  boAt Airdopes-141 (Black) ") == name_key("boat airdopes 141 black")
+
+
+def test_daily_prices_hold_each_price_until_the_next_change():
+    days, prices = _series([(4, 100.0), (2, 80.0)])
+    assert daily_prices(days, prices, TODAY).tolist() == [100.0, 100.0, 80.0, 80.0, 80.0]
+
+
+def test_analyze_stable_price():
+    days, prices = _series([(60, 1000.0)])
+    stats = analyze(days, prices, 1000.0, today=TODAY)
+
+    assert stats["history_days"] == 61
+    assert stats["median_30d"] == 1000.0
+    assert stats["vs_median_30d_pct"] == 0.0
+    assert stats["trend_pct_per_week"] == 0.0
+    assert stats["drops"] == 0
+    assert stats["days_since_drop"] is None
+    assert stats["next_month_vs_avg_pct"] is None
+
+
+def test_analyze_detects_drops_and_their_size():
+    days, prices = _series([(40, 1000.0), (20, 800.0), (15, 1000.0)])
+    stats = analyze(days, prices, 1000.0, today=TODAY)
+
+    assert stats["drops"] == 1
+    assert stats["avg_drop_pct"] == 20.0
+    assert stats["days_since_drop"] == 20
+    assert stats["min_90d"] == 800.0
+
+
+def test_analyze_falling_trend():
+    days = np.arange(TODAY - 29, TODAY + 1, dtype=np.int32)
+    prices = np.linspace(1300, 1000, 30).astype(np.float32)
+    stats = analyze(days, prices, 1000.0, today=TODAY)
+
+    assert stats["trend_pct_per_week"] < -1
+
+
+def test_analyze_seasonality_needs_about_a_year():
+    # A year of a flat price, with next month (July) 20% cheaper last year
+    days = np.array([TODAY - 400, date(2025, 7, 1).toordinal(), date(2025, 8, 1).toordinal()], dtype=np.int32)
+    prices = np.array([1000.0, 800.0, 1000.0], dtype=np.float32)
+    stats = analyze(days, prices, 1000.0, today=TODAY)
+
+    assert stats["next_month_vs_avg_pct"] < -5
+
+
+def _stats(**overrides):
+    stats = {
+        "history_days": 90, "current": 1000.0, "min_90d": 900.0, "max_90d": 1100.0,
+        "vs_median_30d_pct": 0.0, "next_month_vs_avg_pct": None, "trend_pct_per_week": 0.0,
+        "drops": 0, "avg_drop_pct": 0.0,
+    }
+    return {**stats, **overrides}
+
+
+@pytest.mark.parametrize("overrides, recommendation", [
+    ({"current": 900.0}, "BUY_NOW"), # At its 90-day low
+    ({"vs_median_30d_pct": -8.0}, "BUY_NOW"),
+    ({"next_month_vs_avg_pct": -12.0}, "WAIT"),
+    ({"trend_pct_per_week": -2.5}, "WAIT"),
+    ({"vs_median_30d_pct": 10.0, "drops": 3, "avg_drop_pct": 7.0}, "WAIT"),
+    ({}, "BUY_NOW"),
+])
+def test_recommend_rules(overrides, recommendation):
+    result = recommend(_stats(**overrides))
+    assert result["recommendation"] == recommendation
+    assert 20 <= result["confidence"] <= 95
+    assert result["reason"]
+
+
+def test_recommend_flat_history_is_not_a_90_day_low():
+    # min == max: "lowest in 90 days" would be meaningless
+    result = recommend(_stats(min_90d=1000.0, max_90d=1000.0))
+    assert result["reason"] == "Price is in line with its recent history."
+
+
+def test_recommend_confidence_grows_with_history():
+    short = recommend(_stats(history_days=9, vs_median_30d_pct=-8.0))
+    long = recommend(_stats(history_days=180, vs_median_30d_pct=-8.0))
+    assert short["confidence"] < long["confidence"]
+
+
+def test_price_history_stores_only_changes(tmp_path):
+    path = str(tmp_path / "prices.sqlite3")
+    history = PriceHistory(path)
+
+    assert history.record_many([("a", 100.0), ("b", 50.0)], "catalog", day=TODAY - 2) == 2
+    assert history.record_many([("a", 100.0), ("b", None), ("c", 0)], "catalog", day=TODAY - 1) == 0
+    assert history.record_many([("a", 90.0)], "serpapi", day=TODAY) == 1
+    # Same-day updates replace the day's price; late observations for superseded days are ignored
+    assert history.record_many([("a", 85.0)], "serpapi", day=TODAY) == 1
+    assert history.record_many([("a", 70.0)], "serpapi", day=TODAY - 5) == 0
+
+    days, prices = PriceHistory(path).series("a")
+    assert days.tolist() == [TODAY - 2, TODAY]
+    assert prices.tolist() == [100.0, 85.0]
+    assert history.series("missing") is None
+
+
+def test_cached_predictions_are_returned_as_copies():
+    from backend.app.services.cache import TTLCache
+    from backend.app.services.price_service import PriceService
+
+    service = PriceService.__new__(PriceService)
+    service.cache = TTLCache(10, 60)
+    service._predict = lambda *args: {"trend": "stable", "stats": {"mean": 100.0}}
+
+    first = service.predict_price_trend("Kettle", 100.0)
+    first["stats"]["mean"] = 0 # e.g. a caller decorating its response
+    again = service.predict_price_trend("Kettle", 100.0)
+    again["trend"] = "edited"
+
+    assert service.predict_price_trend("Kettle", 100.0) == {"trend": "stable", "stats": {"mean": 100.0}}
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+process_data = pytest.importorskip("process_data")
+
+COLUMNS = ["name", "main_category", "image", "ratings", "discount_price", "actual_price", "description"]
+ROWS = [
+    ["boAt Rockerz 450", "tv, audio & cameras", "https://m.media-amazon.com/a.jpg", "4.1", "₹1,499", "₹3,990", None],
+    ["Fire-Boltt Ninja Call Pro", "accessories", "https://m.media-amazon.com/b.jpg", "4.0", None, "₹ 7,999", "Smart watch."],
+    ["Redmi 9A Sport", "tv, audio & cameras", "https://m.media-amazon.com/c.jpg", "4.2", "bad", "n/a", None],
+    ["No image product", "appliances", "not-a-url", "3.9", "₹999", "₹1,999", None],
+]
+
+
+def _write_csv(path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+
+
+@pytest.fixture
+def amazon_dir(tmp_path):
+    # Amazon-Products.csv holds every row; the category CSVs repeat some of them (one twice)
+    _write_csv(tmp_path / "Amazon-Products.csv", ROWS)
+    _write_csv(tmp_path / "Headphones.csv", [ROWS[0], ROWS[0]])
+    _write_csv(tmp_path / "Smart Watches.csv", [ROWS[1]])
+    return str(tmp_path)
+
+
+def test_clean_prices():
+    prices = process_data.clean_prices(pd.Series(["₹1,299", "₹ 1,299", "1,299", None, "free"]))
+    assert prices.iloc[:3].tolist() == [1299.0, 1299.0, 1299.0]
+    assert prices.iloc[3:].isna().all()
+
+
+def test_amazon_products_have_stable_ids_and_fallbacks():
+    df = pd.DataFrame(ROWS, columns=COLUMNS)
+    first = list(process_data._amazon_frame_to_products(df, set()))
+    again = list(process_data._amazon_frame_to_products(df.iloc[::-1], set()))
+
+    assert len(first) == 3 # The row without an http image is dropped
+    assert {p["id"] for p in first} == {p["id"] for p in again}
+    assert all(p["id"].startswith("amz_") and len(p["id"]) == 20 for p in first)
+
+    by_name = {p["name"]: p for p in first}
+    assert by_name["boAt Rockerz 450"]["price"] == 1499.0 # Discount price first
+    assert by_name["Fire-Boltt Ninja Call Pro"]["price"] == 7999.0 # Then list price
+    assert by_name["Redmi 9A Sport"]["price"] == 999.0 # Then the fallback
+    assert by_name["boAt Rockerz 450"]["description"] == "High quality tv, audio & cameras from Amazon."
+
+
+def test_streaming_dedupes_rows_repeated_across_csvs(amazon_dir):
+    products = list(process_data.iter_amazon_products(amazon_dir, chunksize=2))
+    ids = [p["id"] for p in products]
+
+    assert len(ids) == len(set(ids)) == 3
+
+
+def test_sampling_dedupes_before_sampling(amazon_dir):
+    products = list(process_data.iter_amazon_products(amazon_dir, sample=10, seed=0))
+    ids = [p["id"] for p in products]
+
+    assert len(ids) == len(set(ids)) == 3
+
+
+def test_isolated_keeps_products_from_a_failing_dataset(capsys):
+    def failing():
+        yield {"id": "1"}
+        raise OSError("styles.csv is corrupt")
+
+    assert list(process_data._isolated(failing(), "Fashion")) == [{"id": "1"}]
+    assert "Error processing Fashion data" in capsys.readouterr().out
+
+
+def test_product_json_writer_replaces_the_file_atomically(tmp_path):
+    path = str(tmp_path / "products.json")
+    count = process_data.write_products_json(iter([{"id": "a"}, {"id": "b"}]), path)
+
+    assert count == 2
+    assert pd.read_json(path)["id"].tolist() == ["a", "b"]
+    assert not os.path.exists(path + ".tmp")
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from backend.app.services import serp_service
+from backend.app.services.cache import TTLCache
+from backend.app.services.serp_service import FixtureBackend, normalize_query
+
+
+class _CountingBackend:
+    name = "fixture"
+    live = False
+
+    def __init__(self):
+        self.queries = []
+
+    def search(self, query):
+        self.queries.append(query)
+        return [{"title": f"{query} {i}", "price": "₹1,299.00", "thumbnail": "", "link": f"#{i}", "source": "Test"}
+                for i in range(8)]
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = _CountingBackend()
+    monkeypatch.setattr(serp_service, "get_serp_backend", lambda: backend)
+    monkeypatch.setattr(serp_service.settings, "SERP_BACKEND", "fixture")
+    monkeypatch.setattr(serp_service, "_cache", TTLCache(100, 60))
+    return backend
+
+
+def test_results_are_cached_per_normalized_query(backend):
+    first = serp_service.search_products_online("Running  Shoes")
+    again = serp_service.search_products_online("running shoes ")
+
+    assert len(first) == 5
+    assert again == first
+    assert backend.queries == ["Running  Shoes"]
+
+
+def test_leader_rechecks_the_cache_before_calling_upstream(backend):
+    # A caller that missed the cache just before another call finished becomes the next leader
+    serp_service._cache.put(normalize_query("shoes"), [{"title": "cached"}])
+    assert serp_service._fetch("shoes") == [{"title": "cached"}]
+    assert backend.queries == []
+    # Served from the cache after all, so no upstream call and no miss
+    assert serp_service._cache.stats()["misses"] == 0
+
+
+def test_stats_count_one_miss_per_upstream_call(backend):
+    serp_service.search_products_online("shoes")
+    serp_service.search_products_online("Shoes")
+
+    stats = serp_service.serp_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_fixture_backend_matches_exact_then_overlapping_queries(tmp_path):
+    path = tmp_path / "serp.json"
+    path.write_text(json.dumps({
+        "Running Shoes": [{"title": "Nike Running Shoes"}],
+        "wallet": [{"title": "Leather Wallet"}],
+    }))
+    fixture = FixtureBackend(str(path))
+
+    assert fixture.search("running   SHOES") == [{"title": "Nike Running Shoes"}]
+    assert fixture.search("brown leather wallet") == [{"title": "Leather Wallet"}]
+    # Unknown queries still get a deterministic result
+    assert fixture.search("submarine") == fixture.search("submarine")
+    assert fixture.search("submarine")
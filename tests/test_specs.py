@@ -0,0 +1,70 @@
+from backend.app.services.specs import SPECS_VERSION, extract_specs, get_specs, needs_specs, with_specs
+
+FASHION = {
+    "id": "15970",
+    "name": "Turtle Check Men Navy Blue Shirt",
+    "price": 1299,
+    "description": "Men Apparel - Topwear (Shirts). Navy Blue color. Casual usage.",
+    "manual_text": "Care Instructions for Turtle Check Men Navy Blue Shirt: \n1. Check label. \n"
+                   "2. Wash with like colors. \nMaterial: Cotton/Polyester Blend.",
+}
+
+AMAZON = {
+    "id": "amz_0123456789abcdef",
+    "name": "SanDisk Ultra 64GB USB 3.0 Pen Drive (Pack of 2)",
+    "price": 749.0,
+    "description": "High quality tv, audio & cameras from Amazon.",
+    "manual_text": "User Guide for SanDisk Ultra: \nStandard Warranty applies. \nFeatures: 4.3 Star Rating.",
+}
+
+
+def test_fashion_specs_come_from_the_generated_description():
+    specs = extract_specs(FASHION)
+
+    assert specs["category"] == "Shirts"
+    assert specs["color"] == "Navy Blue"
+    assert specs["materials"][0] == "Cotton/Polyester Blend"
+    assert specs["key_features"] == ["Casual use", "Men", "Navy Blue"]
+    assert specs["price"] == 1299.0
+    assert specs["version"] == SPECS_VERSION
+
+
+def test_amazon_specs_parse_category_sizes_and_rating():
+    specs = extract_specs(AMAZON)
+
+    assert specs["category"] == "Tv, Audio & Cameras"
+    assert specs["rating"] == 4.3
+    assert "64GB" in specs["key_features"]
+    assert "Pack of 2" in specs["key_features"]
+
+
+def test_admin_fields_take_precedence():
+    specs = extract_specs({**FASHION, "category": "Formal Shirts", "material": "Linen", "features": ["Slim fit"]})
+
+    assert specs["category"] == "Formal Shirts"
+    assert specs["materials"][0] == "Linen"
+    assert specs["key_features"][0] == "Slim fit"
+
+
+def test_external_display_string_prices_are_parsed():
+    # SerpApi results carry the price as shown on the page
+    assert extract_specs({"title": "Boat Airdopes", "price": "₹1,299.00"})["price"] == 1299.0
+    assert extract_specs({"name": "Unknown", "price": "Price unavailable"})["price"] == 0.0
+    assert extract_specs({"name": "Missing"})["price"] == 0.0
+
+
+def test_stored_specs_are_reused_until_the_source_fields_change():
+    product = with_specs(AMAZON)
+    assert not needs_specs(product)
+    assert with_specs(product) is product
+    assert get_specs(product) is product["specs"]
+
+    edited = {**product, "price": 699.0}
+    assert needs_specs(edited)
+    assert get_specs(edited)["price"] == 699.0
+
+
+def test_outdated_spec_versions_are_re_extracted():
+    product = with_specs(FASHION)
+    stale = {**product, "specs": {**product["specs"], "version": SPECS_VERSION - 1}}
+    assert needs_specs(stale)
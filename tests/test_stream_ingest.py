@@ -0,0 +1,23 @@
+import threading
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from backend.app.services.ingestion import prefetch
+from scripts.stream_ingest import chunk_products, stream_documents
+
+
+def test_sinks_run_on_the_consuming_thread():
+    products = [{"id": str(i), "name": f"Kettle {i}", "description": "Electric kettle.", "price": 999,
+                 "manual_text": "Fill with water."} for i in range(5)]
+    splitter = RecursiveCharacterTextSplitter(chunk_size=50, chunk_overlap=0)
+    seen = []
+
+    def sink(product):
+        seen.append((product["id"], threading.current_thread()))
+
+    documents = list(stream_documents(prefetch(chunk_products(products, splitter), maxsize=2), [sink]))
+
+    assert [doc_id for doc_id, _, _ in documents][:2] == ["0_desc", "0_manual_0"]
+    assert len(documents) == 10
+    assert [product_id for product_id, _ in seen] == ["0", "1", "2", "3", "4"]
+    assert all(thread is threading.current_thread() for _, thread in seen)